@@ -1,11 +1,20 @@
-from .widgets.objects import make_hline, make_vline, message_box
-from .appli.start_app import start_app
+import importlib
+
 __all__ = [
     'make_hline',
     'make_vline',
     'message_box'
 ]
+# Imported at first use : the package is imported without Qt in batch mode (see appli/start_batch.py)
+_LAZY_ATTRIBUTES = {'make_hline': '.widgets.objects', 'make_vline': '.widgets.objects',
+                    'message_box': '.widgets.objects', 'start_app': '.appli.start_app'}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 version = '1.0.6'
 print('LEnsE Applications package (v.'+version+') / lensepy-app')
-
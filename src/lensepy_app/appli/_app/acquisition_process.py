@@ -0,0 +1,563 @@
+import time
+import queue
+import importlib
+import traceback
+import multiprocessing
+import numpy as np
+from PyQt6.QtCore import pyqtSignal, QObject, QTimer
+from lensepy_app.appli._app.module_finder import get_finder
+from lensepy_app.appli._app.shared_frames import SharedFrameRing, DEFAULT_RING_SLOTS
+from lensepy_app.appli._app.frame_store import FramePool
+
+POLL_INTERVAL = 5       # Interval (in ms) between two readings of the events of the processes
+PAUSE_TIMEOUT = 3       # Maximum time (in s) to wait for the camera to be released
+# Settings of the camera object (not parameters of the device) copied to the acquisition process :
+# setter method of the camera, attributes of the camera passed as arguments to the setter
+# (the trigger is added by get_camera_settings)
+CAMERA_SETTINGS = {'set_demosaic_mode': ('demosaic_mode',),
+                   'set_packed_transfer': ('packed_transfer',),
+                   'set_grab_strategy': ('grab_strategy', 'buffers_number')}
+# Accessors of the cameras without get_parameter / set_parameter (lensepy drivers), by parameter name
+PARAMETER_ACCESSORS = {'ExposureTime': ('get_exposure', 'set_exposure'),
+                       'BlackLevel': ('get_black_level', 'set_black_level'),
+                       'AcquisitionFrameRate': ('get_frame_rate', 'set_frame_rate')}
+# Parameters read by the acquisition process at the start of the acquisition (see read_camera_parameters)
+REPORTED_PARAMETERS = ['DeviceModelName', 'DeviceSerialNumber', 'SensorWidth', 'SensorHeight',
+                       'WidthMax', 'HeightMax', 'Width', 'Height', 'OffsetX', 'OffsetY',
+                       'PixelFormat', 'ExposureTime', 'BlackLevel', 'Gain', 'AcquisitionFrameRate',
+                       'BslResultingAcquisitionFrameRate']
+
+
+def get_function(function_path: str):
+    """
+    Get a function from its import path.
+    :param function_path:   Import path of the function (package.module.function).
+    :return:    Function.
+    """
+    module_path, _, function_name = function_path.rpartition('.')
+    return getattr(importlib.import_module(module_path), function_name)
+
+
+def create_camera(camera_class: tuple, params: dict = None):
+    """
+    Create and connect a camera in an acquisition process.
+    :param camera_class:    (module, class name) of the camera.
+    :param params:          Parameters of the camera in the GUI process (initial_params).
+    :return:    Camera object, None if no camera was found.
+    """
+    module_path, class_name = camera_class
+    camera = getattr(importlib.import_module(module_path), class_name)()
+    if params and hasattr(camera, 'initial_params'):
+        # Before find_first_camera : the parameters can select the device (recording of a replay camera)
+        camera.initial_params.update(params)
+    if hasattr(camera, 'find_first_camera') and not camera.find_first_camera():
+        return None
+    return camera
+
+
+def get_camera_settings(camera) -> dict:
+    """
+    Get the settings of a camera object (see CAMERA_SETTINGS).
+    :param camera:  Camera of the GUI process.
+    :return:    Dictionary of the arguments, by setter name (settings supported by the camera).
+    """
+    settings = {setter: [getattr(camera, name) for name in names] for setter, names in CAMERA_SETTINGS.items()
+                if hasattr(camera, setter) and all(hasattr(camera, name) for name in names)}
+    if hasattr(camera, 'set_trigger_mode') and hasattr(camera, 'trigger_mode'):
+        params = getattr(camera, 'trigger_params', {}) or {}
+        settings['set_trigger_mode'] = [camera.trigger_mode, params.get('TriggerSource', 'Line1'),
+                                        params.get('TriggerActivation', 'RisingEdge'),
+                                        params.get('TriggerDelay', 0.0)]
+    return settings
+
+
+def apply_camera_settings(camera, settings: dict):
+    """
+    Set the settings of a camera object (see get_camera_settings).
+    :param camera:      Camera object.
+    :param settings:    Dictionary of the arguments, by setter name.
+    """
+    for setter, args in (settings or {}).items():
+        if hasattr(camera, setter):
+            getattr(camera, setter)(*args)
+
+
+def apply_camera_parameters(camera, params: dict) -> bool:
+    """
+    Set parameters of a camera (in a single batch if the camera supports it).
+    :param camera:  Camera object.
+    :param params:  Dictionary of the values, by parameter name.
+    :return:    True if all the parameters were set.
+    """
+    if hasattr(camera, 'set_parameters'):
+        return camera.set_parameters(params)
+    done = True
+    for name, value in params.items():
+        setter = PARAMETER_ACCESSORS.get(name, (None, None))[1]
+        if hasattr(camera, 'set_parameter'):
+            done = camera.set_parameter(name, value) is not False and done
+        elif hasattr(camera, str(setter)):
+            done = getattr(camera, setter)(value) is not False and done
+        else:
+            print(f'Parameter {name} can not be set')
+            done = False
+            continue
+        if hasattr(camera, 'initial_params'):
+            camera.initial_params[name] = value
+    return done
+
+
+def read_camera_parameters(camera, names: list) -> dict:
+    """
+    Read parameters of a camera (in a single session if the camera supports it).
+    :param camera:  Camera object.
+    :param names:   Names of the parameters.
+    :return:    Dictionary of the values, by parameter name (parameters not available are skipped).
+    """
+    def read():
+        values = {}
+        for name in names:
+            getter = PARAMETER_ACCESSORS.get(name, (None, None))[0]
+            if hasattr(camera, 'get_parameter'):
+                value = camera.get_parameter(name)
+            elif hasattr(camera, str(getter)):
+                value = getattr(camera, getter)()
+            else:
+                value = None
+            if value is not None:
+                values[name] = value
+        return values
+    if hasattr(camera, 'session'):
+        with camera.session():
+            return read()
+    return read()
+
+
+def set_camera_parameters(camera, params: dict, restart: bool, events):
+    """
+    Set parameters of the camera in the acquisition process, and send their new values to the GUI process.
+    :param camera:  Camera object.
+    :param params:  Dictionary of the values, by parameter name.
+    :param restart: True to stop the stream while the parameters are set (PixelFormat, ROI size...).
+    :param events:  Queue of the events to the GUI process.
+    """
+    if restart:
+        camera.camera_acquiring = False
+    try:
+        apply_camera_parameters(camera, params)
+    except Exception as e:
+        events.put(('error', f'{type(e).__name__}: {e}'))
+    if restart:
+        camera.camera_acquiring = True
+    # Values set by the camera (ranges, increments), and parameters depending on the new values
+    events.put(('params', read_camera_parameters(camera, list(params) + REPORTED_PARAMETERS)))
+
+
+def run_acquisition_process(camera_class: tuple, params: dict, settings: dict, roots: dict,
+                            commands, events, slots: int = DEFAULT_RING_SLOTS):
+    """
+    Acquisition loop of the camera, executed in a separate process.
+    Frames are written in a shared ring buffer, only their slot and sequence number
+    are sent to the GUI process.
+    The parameters of the camera are read and set only by this process while it runs.
+    Commands : ('pause',) - the camera is released, ('resume', params, settings), ('set', params, restart) -
+    parameters changed during the acquisition (the stream is stopped while they are set if restart is True),
+    ('stop',).
+    Events : ('ring', ring info), ('frame', slot, sequence, time, camera timestamp), ('paused',),
+    ('params', values) - values of the parameters of the camera, ('error', message).
+    :param camera_class:    (module, class name) of the camera.
+    :param params:          Parameters of the camera in the GUI process.
+    :param settings:        Settings of the camera object in the GUI process (see get_camera_settings).
+    :param roots:           Root packages of the external modules (see ExternalModulesFinder).
+    :param commands:        Queue of the commands from the GUI process.
+    :param events:          Queue of the events to the GUI process.
+    :param slots:           Number of frames of the ring buffer.
+    """
+    for package, directory in (roots or {}).items():
+        get_finder().add_root(package, directory)
+    ring = None
+    try:
+        camera = create_camera(camera_class, params)
+        if camera is None:
+            events.put(('error', 'No camera found by the acquisition process'))
+            return
+        apply_camera_settings(camera, settings)
+        events.put(('params', read_camera_parameters(camera, REPORTED_PARAMETERS)))
+        camera.camera_acquiring = True
+        while True:
+            try:
+                command = commands.get_nowait()
+            except queue.Empty:
+                command = None
+            if command is not None and command[0] == 'pause':
+                camera.camera_acquiring = False
+                if getattr(camera, 'is_open', False):
+                    camera.close()
+                events.put(('paused',))
+                command = commands.get()
+                while command[0] == 'pause':
+                    events.put(('paused',))
+                    command = commands.get()
+                if command[0] == 'resume':
+                    if hasattr(camera, 'initial_params'):
+                        camera.initial_params.update(command[1] or {})
+                    apply_camera_settings(camera, command[2])
+                    events.put(('params', read_camera_parameters(camera, REPORTED_PARAMETERS)))
+                camera.camera_acquiring = True
+            if command is not None and command[0] == 'set':
+                set_camera_parameters(camera, command[1], command[2], events)
+            if command is not None and command[0] == 'stop':
+                break
+            image = camera.get_image()
+            if image is None:
+                time.sleep(0.001)
+                continue
+            if ring is None or not ring.accepts(image):
+                # New ring buffer (first frame, or shape / format changed)
+                if ring is not None:
+                    ring.close()
+                ring = SharedFrameRing(image.shape, image.dtype, slots)
+                events.put(('ring', ring.get_info()))
+            slot, sequence = ring.write(image)
+            events.put(('frame', slot, sequence, time.perf_counter(), getattr(camera, 'last_timestamp', 0)))
+        camera.camera_acquiring = False
+        if getattr(camera, 'is_open', False):
+            camera.close()
+    except Exception as e:
+        traceback.print_exc()
+        events.put(('error', f'{type(e).__name__}: {e}'))
+    finally:
+        if ring is not None:
+            ring.close()
+
+
+def run_analysis_process(name: str, function_path: str, kwargs: dict, roots: dict, tasks, results):
+    """
+    Analysis of the frames of the ring buffer, executed in a separate process.
+    The function is called as function(image, **kwargs) and must return a lightweight
+    result (values or a display-ready array).
+    Tasks : ('ring', ring info), ('config', kwargs), ('frame', slot, sequence), ('stop',).
+    Results : (name, sequence, done, result).
+    :param name:            Name of the analysis.
+    :param function_path:   Import path of the analysis function.
+    :param kwargs:          Keyword arguments of the function.
+    :param roots:           Root packages of the external modules (see ExternalModulesFinder).
+    :param tasks:           Queue of the tasks from the GUI process.
+    :param results:         Queue of the results to the GUI process.
+    """
+    for package, directory in (roots or {}).items():
+        get_finder().add_root(package, directory)
+    function = get_function(function_path)
+    ring = None
+    while True:
+        task = tasks.get()
+        if task[0] == 'stop':
+            break
+        elif task[0] == 'ring':
+            if ring is not None:
+                ring.close()
+            try:
+                ring = SharedFrameRing.attach(task[1])
+            except FileNotFoundError:
+                # Ring already replaced by the acquisition process : frames skipped until the next ring
+                ring = None
+        elif task[0] == 'config':
+            kwargs = task[1]
+        elif task[0] == 'frame':
+            _, slot, sequence = task
+            image = ring.read(slot, sequence) if ring is not None else None
+            if image is None:
+                results.put((name, sequence, False, None))
+                continue
+            try:
+                results.put((name, sequence, True, function(image, **(kwargs or {}))))
+            except Exception:
+                traceback.print_exc()
+                results.put((name, sequence, False, None))
+    if ring is not None:
+        ring.close()
+
+
+class ProcessAcquisition(QObject):
+    """
+    Acquisition and analysis in separate processes (GUI side).
+    The frames are read from the shared ring buffer of the acquisition process,
+    the results of the analysis processes are received through a queue.
+    While the acquisition process runs, the camera of the GUI process does not access the device
+    (remote attribute of the camera) : parameters are sent through the commands queue, and the values
+    read by the acquisition process are stored in the parameters of the camera (initial_params).
+    """
+
+    frame_ready = pyqtSignal(np.ndarray)
+    analysis_ready = pyqtSignal(str, object)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, slots: int = DEFAULT_RING_SLOTS):
+        """
+
+        :param slots:   Number of frames of the ring buffer.
+        """
+        super().__init__(None)
+        self.slots = slots
+        self.context = multiprocessing.get_context('spawn')
+        self.process = None
+        self.camera = None      # Camera of the GUI process
+        self.commands = None
+        self.events = None
+        self.pending_params = {}    # Parameters set during a pause, sent at the resume
+        self.results = self.context.Queue()
+        self.ring = None
+        self.ring_info = None
+        self.frame_pool = FramePool()   # Frames read from the ring buffer
+        self.paused = False
+        self.analyses = {}      # name : [process, tasks queue, busy]
+        self.frames_count = 0       # Frames received from the acquisition process
+        self.delivered_count = 0    # Frames sent to the GUI
+        self.recorder = None        # StreamRecorder receiving all the frames
+        # Events of the processes
+        self.timer = QTimer()
+        self.timer.setInterval(POLL_INTERVAL)
+        self.timer.timeout.connect(self.poll)
+
+    def is_running(self) -> bool:
+        """Return True if the acquisition process is running."""
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, camera):
+        """
+        Start the acquisition process. The camera is created again in the process (same class).
+        :param camera:  Camera of the GUI process.
+        """
+        if self.is_running():
+            self.resume(camera)
+            return
+        self.commands = self.context.Queue()
+        self.events = self.context.Queue()
+        self.camera = camera
+        self._set_remote(True)
+        camera_class = (type(camera).__module__, type(camera).__name__)
+        params = dict(getattr(camera, 'initial_params', {}) or {})
+        self.process = self.context.Process(
+            target=run_acquisition_process, daemon=True,
+            args=(camera_class, params, get_camera_settings(camera), dict(get_finder().roots),
+                  self.commands, self.events, self.slots))
+        self.process.start()
+        self.paused = False
+        self.timer.start()
+
+    def pause(self):
+        """Pause the acquisition : the camera is released by the acquisition process."""
+        if not self.is_running() or self.paused:
+            return
+        self.commands.put(('pause',))
+        t_end = time.perf_counter() + PAUSE_TIMEOUT
+        while time.perf_counter() < t_end:
+            try:
+                event = self.events.get(timeout=0.1)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    break
+                continue
+            if event[0] == 'paused':
+                break
+            if event[0] == 'frame' and self.recorder is not None and self.ring is not None:
+                self._record_frame(*event[1:])
+            self._process_event(event, emit=False)
+        self.paused = True
+        # The camera is released by the acquisition process
+        self._set_remote(False)
+
+    def resume(self, camera=None):
+        """
+        Resume the acquisition after a pause.
+        :param camera:  Camera of the GUI process (its parameters and settings are sent to the acquisition process).
+        """
+        if not self.is_running() or not self.paused:
+            return
+        if camera is not None:
+            self.camera = camera
+        params = dict(getattr(self.camera, 'initial_params', {}) or {})
+        self._set_remote(True)
+        self.commands.put(('resume', params, get_camera_settings(self.camera)))
+        if self.pending_params:
+            self.commands.put(('set', self.pending_params, True))
+            self.pending_params = {}
+        self.paused = False
+
+    def set_parameters(self, params: dict, restart: bool = False):
+        """
+        Set parameters of the camera by the acquisition process.
+        During a pause, the parameters are set at the resume of the acquisition.
+        :param params:  Dictionary of the values, by parameter name.
+        :param restart: True for parameters that can not be set while the camera is streaming.
+        """
+        if not self.is_running():
+            return
+        self._update_parameters(params)
+        if self.paused:
+            self.pending_params.update(params)
+        else:
+            self.commands.put(('set', dict(params), restart))
+
+    def stop(self):
+        """Stop the acquisition and the analysis processes."""
+        self.timer.stop()
+        for name in list(self.analyses):
+            self.remove_analysis(name)
+        if self.process is not None:
+            self.commands.put(('stop',))
+            self.process.join(PAUSE_TIMEOUT)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        self._set_remote(False)
+        self.pending_params = {}
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+            self.ring_info = None
+
+    def get_frame_stats(self) -> dict:
+        """
+        Get the counters of the frames (see AcquisitionService.get_frame_stats).
+        :return:    Dictionary : frames, delivered, dropped, depth.
+        """
+        depth = 0
+        if self.events is not None:
+            try:
+                depth = self.events.qsize()
+            except NotImplementedError:
+                pass
+        return {'frames': self.frames_count, 'delivered': self.delivered_count,
+                'dropped': self.frames_count - self.delivered_count, 'depth': depth}
+
+    def add_analysis(self, name: str, function_path: str, kwargs: dict = None):
+        """
+        Start an analysis process, or update its arguments if it is already running.
+        :param name:            Name of the analysis (analysis_ready signal).
+        :param function_path:   Import path of the analysis function.
+        :param kwargs:          Keyword arguments of the function.
+        """
+        if name in self.analyses:
+            self.analyses[name][1].put(('config', kwargs))
+            return
+        tasks = self.context.Queue()
+        process = self.context.Process(
+            target=run_analysis_process, daemon=True,
+            args=(name, function_path, kwargs, dict(get_finder().roots), tasks, self.results))
+        process.start()
+        if self.ring_info is not None:
+            tasks.put(('ring', self.ring_info))
+        self.analyses[name] = [process, tasks, False]
+
+    def remove_analysis(self, name: str):
+        """
+        Stop an analysis process.
+        :param name:    Name of the analysis.
+        """
+        analysis = self.analyses.pop(name, None)
+        if analysis is None:
+            return
+        process, tasks, _ = analysis
+        tasks.put(('stop',))
+        process.join(PAUSE_TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+
+    def poll(self):
+        """
+        Read the events of the processes (GUI thread). Only the latest frame is displayed.
+        With a recorder, all the frames are read from the ring buffer (frames already overwritten
+        are counted as dropped by the recorder).
+        """
+        latest = None
+        while self.events is not None:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == 'frame':
+                latest = event
+                self.frames_count += 1
+                if self.recorder is not None and self.ring is not None:
+                    self._record_frame(*event[1:])
+            else:
+                self._process_event(event)
+        if latest is not None and self.ring is not None:
+            _, slot, sequence = latest[:3]
+            buffer = self.frame_pool.acquire(self.ring.shape, self.ring.dtype)
+            if self.ring.read(slot, sequence, out=buffer) is not None:
+                image = self.frame_pool.borrow(buffer)
+                for analysis in self.analyses.values():
+                    if not analysis[2]:
+                        analysis[1].put(('frame', slot, sequence))
+                        analysis[2] = True
+                self.delivered_count += 1
+                self.frame_ready.emit(image)
+        while True:
+            try:
+                name, sequence, done, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if name in self.analyses:
+                self.analyses[name][2] = False
+                if done:
+                    self.analysis_ready.emit(name, result)
+
+    def _update_parameters(self, values: dict):
+        """
+        Store values of the parameters in the camera of the GUI process (sent again at the resume).
+        :param values:  Dictionary of the values, by parameter name.
+        """
+        if self.camera is not None and hasattr(self.camera, 'initial_params'):
+            self.camera.initial_params.update(values)
+
+    def _set_remote(self, value: bool):
+        """
+        Set the access to the device of the camera of the GUI process.
+        :param value:   True if the device is driven by the acquisition process.
+        """
+        if self.camera is not None and hasattr(self.camera, 'remote'):
+            self.camera.remote = value
+
+    def _record_frame(self, slot: int, sequence: int, timestamp: float, device_timestamp: int):
+        """
+        Send a frame of the ring buffer to the recorder.
+        :param slot:                Slot of the frame in the ring buffer.
+        :param sequence:            Sequence number of the frame.
+        :param timestamp:           Time of the frame in the acquisition process (time.perf_counter).
+        :param device_timestamp:    Timestamp of the camera.
+        """
+        buffer = self.recorder.acquire(self.ring.shape, self.ring.dtype)
+        if buffer is None:
+            return
+        if self.ring.read(slot, sequence, out=buffer) is None:
+            self.recorder.mark_dropped()
+            return
+        self.recorder.commit(buffer, timestamp, device_timestamp)
+
+    def _process_event(self, event: tuple, emit: bool = True):
+        """
+        Process an event of the acquisition process (other than a frame).
+        :param event:   Event.
+        :param emit:    False to not emit the error signal.
+        """
+        if event[0] == 'ring':
+            if self.ring is not None:
+                self.ring.close()
+                self.ring = None
+            self.ring_info = event[1]
+            try:
+                self.ring = SharedFrameRing.attach(self.ring_info)
+            except FileNotFoundError:
+                # Ring already replaced by the acquisition process : frames skipped until the next ring
+                self.ring_info = None
+                return
+            for analysis in self.analyses.values():
+                analysis[1].put(('ring', self.ring_info))
+        elif event[0] == 'params':
+            self._update_parameters(event[1])
+        elif event[0] == 'error':
+            print(f'Acquisition process error: {event[1]}')
+            if emit:
+                self.error_occurred.emit(event[1])
@@ -0,0 +1,933 @@
+import sys
+import numpy as np
+from PyQt6.QtCore import pyqtSignal, QObject, QThread, QTimer
+from lensepy_app.appli._app.template_controller import ImageLive, FrameMailbox, FrameProcessor, BurstCapture
+from lensepy_app.appli._app.shared_frames import DEFAULT_RING_SLOTS
+from lensepy_app.appli._app.frame_store import FramePool, FrameStack
+from lensepy_app.appli._app.stream_recorder import StreamRecorder, RECORD_QUEUE_SIZE
+from lensepy_app.appli._app.multi_acquisition import MultiCameraAcquisition, DEFAULT_SYNC_TOLERANCE
+
+DEFAULT_IDLE_TIME = 10      # Time (in s) before closing a camera without subscriber
+ACQUISITION_MODES = ['thread', 'process']
+DEFAULT_UPDATE_INTERVAL = 100   # Minimum time (in ms) between two updates of the camera parameters
+BURST_BUFFERS_NUMBER = 32       # Size of the buffer pool of the camera stream during a burst
+# Parameters requiring to stop the stream (when the camera can not tell if a parameter is writable)
+RESTART_PARAMETERS = ['PixelFormat', 'Width', 'Height', 'BinningHorizontal', 'BinningVertical',
+                      'DecimationHorizontal', 'DecimationVertical']
+ROI_PARAMETERS = ['Width', 'Height', 'OffsetX', 'OffsetY']    # Always set in the same batch
+ROI_AXES = [('OffsetX', 'Width', 'WidthMax'), ('OffsetY', 'Height', 'HeightMax')]
+DEFAULT_ROI_INCREMENT = 4       # Alignment of the ROI (in pixels) when the camera does not give it
+
+
+class AcquisitionService(QObject):
+    """
+    Live acquisition of the camera of the application (variables['camera']), shared by the modules.
+    The acquisition is owned by the service and keeps running across module switches :
+    modules only subscribe / unsubscribe to the frames (and to analysis results).
+    When no module is subscribed, the camera is closed after an idle time.
+    <acquisition>                   (in the application XML file)
+        <idle_time>10</idle_time>   (in s)
+        <mode>process</mode>        (optional, thread by default)
+        <slots>8</slots>            (optional, frames of the shared ring buffer - process mode)
+        <update_interval>100</update_interval>  (optional, in ms - see set_camera_parameters)
+    </acquisition>
+    In process mode, the acquisition and the analysis run in separate processes
+    (see ProcessAcquisition), frames are exchanged through a shared memory ring buffer.
+    In both modes, only the latest frame is delivered to the subscribers : frames acquired while
+    the GUI is busy are dropped (see get_frame_stats).
+    In thread mode, the raw frames of a camera with a process_frame method (demosaicing...)
+    are converted in a processing thread, after the frames dropped by the acquisition thread.
+    A burst acquisition (see start_burst) stops the live acquisition and stores N successive frames
+    in a preallocated stack, the live acquisition is restarted at the end of the burst.
+    A recording (see start_recording) writes all the frames of the live acquisition in a raw file,
+    before any frame is dropped for the display.
+    The ROI of the camera is set by set_roi : the frames are cropped in software (views) until the camera
+    delivers frames of the new size, or when the camera can not change its ROI.
+    Several cameras can be acquired at once (see start_multi), each one in its own thread : the modules
+    subscribe to the frames of one camera (subscribe_camera) or to the synchronized sets (subscribe_pair).
+    """
+
+    frame_ready = pyqtSignal(np.ndarray)
+
+    def __init__(self, parent=None, idle_time: float = DEFAULT_IDLE_TIME):
+        """
+
+        :param parent:      MainManager (variables of the application).
+        :param idle_time:   Time (in s) before closing the camera when no module is subscribed.
+        """
+        super().__init__(None)
+        self.parent = parent    # MainManager - read by the ImageLive worker
+        self.idle_time = idle_time
+        self.mode = 'thread'
+        self.slots = DEFAULT_RING_SLOTS
+        self.subscribers = {}   # Callback of each subscriber
+        self.suspended = {}     # Callback of each suspended subscriber (see pause)
+        self.analyses = {}      # Analysis of each subscriber : (function path, kwargs, callback, slot)
+        self.thread = None
+        self.worker = None
+        self.mailbox = FrameMailbox()   # Latest frame of the acquisition thread (or processing thread)
+        self.frame_pool = FramePool()   # Buffers of the frames (cameras with a frame_pool attribute)
+        # Processing stage (cameras with a process_frame method)
+        self.raw_mailbox = FrameMailbox()
+        self.processing_pool = FramePool()
+        self.processor = None
+        self.processor_thread = None
+        self.backend = None     # ProcessAcquisition (process mode)
+        self.camera = None      # Camera of the running acquisition
+        self.paused = False
+        self.burst = None           # BurstCapture worker of the running burst
+        self.burst_thread = None
+        self.burst_callback = None
+        self.burst_strategy = None  # Grab strategy of the camera before the burst
+        self.recorder = None        # StreamRecorder of the running recording - read by the ImageLive worker
+        self.record_strategy = None # Grab strategy of the camera before the recording
+        self.roi = None             # Requested ROI (x0, y0, width, height), in sensor coordinates
+        self.roi_crop = None        # Software ROI : (shape of the frames to crop or None, (rows, columns))
+        # Multi-camera acquisition (thread mode)
+        self.multi = MultiCameraAcquisition()
+        self.multi.frame_ready.connect(self._emit_camera_frame)
+        self.multi.pair_ready.connect(self._emit_pair)
+        self.multi_owned = []       # Cameras opened by start_multi, closed by stop_multi
+        self.main_name = None       # Name of the camera of the application in the multi-camera acquisition
+        self.camera_subscribers = {}    # (camera name, callback) of each subscriber to one camera
+        self.pair_subscribers = {}      # Callback of each subscriber to the synchronized sets
+        self.pending_params = {}        # Camera parameters waiting for the next update
+        self.pending_callback = None
+        # Update timer - camera parameters applied at most once per interval
+        self.update_timer = QTimer()
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(DEFAULT_UPDATE_INTERVAL)
+        self.update_timer.timeout.connect(self._apply_pending_parameters)
+        # Idle timer - camera closed when it expires
+        self.idle_timer = QTimer()
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self.close_camera)
+
+    def set_idle_time(self, idle_time: float):
+        """
+        Set the time before closing the camera when no module is subscribed.
+        :param idle_time:   Time in s.
+        """
+        self.idle_time = max(0.0, float(idle_time))
+
+    def set_update_interval(self, interval: int):
+        """
+        Set the minimum time between two updates of the camera parameters.
+        :param interval:    Time in ms.
+        """
+        self.update_timer.setInterval(max(0, int(interval)))
+
+    def set_mode(self, mode: str, slots: int = DEFAULT_RING_SLOTS):
+        """
+        Set the acquisition mode. The running acquisition is stopped if the mode changed.
+        :param mode:    'thread' (acquisition thread) or 'process' (separate processes).
+        :param slots:   Number of frames of the shared ring buffer (process mode).
+        """
+        if mode not in ACQUISITION_MODES:
+            print(f'Unknown acquisition mode {mode}')
+            return
+        if mode != self.mode:
+            self.stop_live()
+            if self.backend is not None:
+                self.backend.stop()
+                self.backend = None
+        self.mode = mode
+        self.slots = int(slots)
+
+    def is_running(self) -> bool:
+        """Return True if the acquisition is running."""
+        if self.backend is not None:
+            return self.backend.is_running() and not self.backend.paused
+        return self.worker is not None
+
+    def subscribe(self, owner, callback):
+        """
+        Subscribe to the frames of the camera. The acquisition is started (or resumed) if necessary.
+        :param owner:       Subscriber (a controller), used to unsubscribe.
+        :param callback:    Function called in the GUI thread with each new frame.
+        """
+        self._remove_callback(owner)
+        self.suspended.pop(owner, None)
+        self.subscribers[owner] = callback
+        self.frame_ready.connect(callback)
+        self.idle_timer.stop()
+        self.paused = False
+        self.start_live()
+
+    def subscribe_analysis(self, owner, function_path: str, callback, **kwargs):
+        """
+        Subscribe to the result of an analysis of the frames, called as function(image, **kwargs).
+        In process mode, the function runs in a separate process and only its result
+        (values or a display-ready array) is sent to the GUI. Frames may be skipped
+        if the analysis is slower than the acquisition.
+        Subscribing again updates the arguments of the analysis.
+        :param owner:           Subscriber (a controller).
+        :param function_path:   Import path of the function (package.module.function), or the function.
+        :param callback:        Function called in the GUI thread with each result.
+        :param kwargs:          Keyword arguments of the function.
+        """
+        if callable(function_path):
+            function_path = f'{function_path.__module__}.{function_path.__qualname__}'
+        analysis = self.analyses.get(owner)
+        if analysis is not None and analysis[0] == function_path:
+            self.analyses[owner] = (function_path, kwargs, callback, analysis[3])
+            if self.backend is not None:
+                self.backend.add_analysis(self._get_analysis_name(owner), function_path, kwargs)
+            return
+        self._remove_analysis(owner)
+        slot = None
+        if self.mode == 'thread':
+            from lensepy_app.appli._app.acquisition_process import get_function
+            function = get_function(function_path)
+            slot = lambda image: self._run_analysis(owner, function, image)
+            self.frame_ready.connect(slot)
+        self.analyses[owner] = (function_path, kwargs, callback, slot)
+        if self.backend is not None:
+            self.backend.add_analysis(self._get_analysis_name(owner), function_path, kwargs)
+
+    def subscribe_camera(self, owner, name: str, callback):
+        """
+        Subscribe to the frames of one camera of the multi-camera acquisition (see start_multi).
+        :param owner:       Subscriber (a controller), used to unsubscribe.
+        :param name:        Name of the camera.
+        :param callback:    Function called in the GUI thread with each new frame of the camera.
+        """
+        self.camera_subscribers[owner] = (name, callback)
+        self.idle_timer.stop()
+
+    def subscribe_pair(self, owner, callback):
+        """
+        Subscribe to the synchronized sets of frames of the multi-camera acquisition (see start_multi).
+        :param owner:       Subscriber (a controller), used to unsubscribe.
+        :param callback:    Function called in the GUI thread with each new set : dictionary
+            frames ({camera name: frame}), keys ({camera name: timestamp or trigger ID}), skew.
+        """
+        self.pair_subscribers[owner] = callback
+        self.idle_timer.stop()
+
+    def unsubscribe(self, owner, keep_alive: bool = False):
+        """
+        Unsubscribe from the frames. The acquisition keeps running during the idle time,
+        then the camera is closed if no other module subscribed.
+        :param owner:       Subscriber.
+        :param keep_alive:  True to not start the idle timer.
+        """
+        self._remove_callback(owner)
+        self._remove_analysis(owner)
+        self.suspended.pop(owner, None)
+        self.camera_subscribers.pop(owner, None)
+        self.pair_subscribers.pop(owner, None)
+        if not self._has_subscribers() and not keep_alive:
+            if self.idle_time > 0 and self.is_running():
+                self.idle_timer.start(int(self.idle_time * 1000))
+            else:
+                self.close_camera()
+
+    def pause(self, owner=None):
+        """
+        Suspend the subscription of a module : its callback does not receive the frames anymore,
+        the frames of the other modules are not affected. The acquisition is stopped when no
+        module receives the frames (the camera is kept open).
+        Without owner, the acquisition is stopped for all the subscribers, which are kept.
+        Parameters of the camera are changed by set_camera_parameters, not during a pause.
+        The acquisition is restarted by resume or by a new subscription.
+        :param owner:   Subscriber, None to stop the acquisition.
+        """
+        if owner is not None:
+            callback = self.subscribers.get(owner)
+            if callback is not None:
+                self._remove_callback(owner)
+                self.suspended[owner] = callback
+            if self.subscribers or self.analyses:
+                return
+        self.paused = True
+        self.stop_live()
+
+    def resume(self, owner=None):
+        """
+        Resume a suspended subscription, or restart the acquisition after a pause.
+        :param owner:   Subscriber, None to restart the acquisition.
+        """
+        callback = self.suspended.pop(owner, None)
+        if callback is not None:
+            self.subscribe(owner, callback)
+            return
+        self.paused = False
+        if self.subscribers:
+            self.start_live()
+
+    def set_camera_parameters(self, params: dict, callback=None):
+        """
+        Set parameters of the camera without stopping the acquisition when possible.
+        Successive requests are coalesced : the latest values are applied at most once per
+        update interval (slider events). Parameters that can not be changed while the camera
+        is streaming (PixelFormat, ROI size...) are set after stopping the acquisition,
+        which is restarted afterward.
+        :param params:      Dictionary of the values, by parameter name.
+        :param callback:    Function called with the applied parameters (GUI update).
+        """
+        self.pending_params.update(params)
+        self.pending_callback = callback
+        if not self.update_timer.isActive():
+            self._apply_pending_parameters()
+
+    def start_burst(self, count: int, callback) -> bool:
+        """
+        Acquire N successive frames at the maximum rate of the camera in a preallocated stack.
+        The live acquisition is stopped during the burst : no frame is sent to the subscribers
+        and no processing is done per frame. The camera keeps all the frames of its stream
+        (grab strategy one_by_one, if the camera supports it).
+        :param count:       Number of frames.
+        :param callback:    Function called in the GUI thread with the FrameStack at the end of the burst.
+        :return:    False if no camera is available or a burst is running.
+        """
+        camera = self.parent.variables.get('camera')
+        if camera is None or self.burst is not None:
+            return False
+        self.idle_timer.stop()
+        self.stop_live()
+        if hasattr(camera, 'set_grab_strategy'):
+            self.burst_strategy = (camera.grab_strategy, camera.buffers_number)
+            camera.set_grab_strategy('one_by_one', max(camera.buffers_number, BURST_BUFFERS_NUMBER))
+        self.camera = camera
+        self.burst_callback = callback
+        self.burst_thread = QThread()
+        self.burst = BurstCapture(camera, FrameStack(count))
+        self.burst.moveToThread(self.burst_thread)
+
+        self.burst_thread.started.connect(self.burst.run)
+        self.burst.burst_ready.connect(self._handle_burst_ready)
+        self.burst.finished.connect(self.burst_thread.quit)
+        self.burst.finished.connect(self.burst.deleteLater)
+        self.burst.finished.connect(self.burst_thread.deleteLater)
+        self.burst_thread.start()
+        return True
+
+    def stop_burst(self):
+        """Stop the running burst, the frames already acquired are sent to the callback."""
+        if self.burst is not None:
+            self.burst.stop()
+
+    def is_bursting(self) -> bool:
+        """Return True if a burst acquisition is running."""
+        return self.burst is not None
+
+    def set_roi(self, x0: int, y0: int, width: int, height: int, callback=None) -> list:
+        """
+        Set the region of interest of the camera, in sensor coordinates.
+        The ROI is aligned on the increments of the camera (offsets rounded down, sizes rounded up)
+        and its four parameters are set in a single batch (see set_camera_parameters) : the stream is
+        restarted once if the size changed, the offsets alone are changed while streaming when possible.
+        The frames of the previous size are cropped in software (views, no copy) until the frames of the new
+        size are delivered. The ROI stays a software crop if the camera has no ROI parameters, if it refused
+        the new ROI, or during a recording (frames of a recording keep the same size) : a ROI that can not be
+        cropped from the current frames is not applied during a recording.
+        :param x0:          Horizontal offset.
+        :param y0:          Vertical offset.
+        :param width:       Width of the ROI.
+        :param height:      Height of the ROI.
+        :param callback:    Function called with the applied parameters (GUI update).
+        :return:    Aligned ROI [x0, y0, x1, y1], None if no camera is available or if the ROI was not applied.
+        """
+        camera = self.parent.variables.get('camera')
+        if camera is None:
+            return None
+        x0, y0, width, height = max(int(x0), 0), max(int(y0), 0), int(width), int(height)
+        if hasattr(camera, 'get_parameter_info'):
+            hardware = camera.get_parameter_info('Width') is not None
+        else:
+            hardware = hasattr(camera, 'set_parameter')
+        if not hardware:
+            # Frames of the sensor cropped
+            self.roi = (x0, y0, width, height)
+            self.roi_crop = (None, (slice(y0, y0 + height), slice(x0, x0 + width)))
+            return [x0, y0, x0 + width, y0 + height]
+        x0, y0, width, height = self._align_roi(camera, x0, y0, width, height)
+        current = [self._read_parameter(camera, name) for name in ['OffsetX', 'OffsetY', 'Width', 'Height']]
+        params = {'Width': width, 'Height': height, 'OffsetX': x0, 'OffsetY': y0}
+        roi_crop = None
+        if None not in current:
+            # Frames of the current ROI cropped until the frames of the new ROI are delivered
+            cur_x0, cur_y0, cur_width, cur_height = [int(value) for value in current]
+            inside = (cur_x0 <= x0 and cur_y0 <= y0 and x0 + width <= cur_x0 + cur_width
+                      and y0 + height <= cur_y0 + cur_height)
+            if inside and (width, height) != (cur_width, cur_height):
+                roi_crop = ((cur_height, cur_width), (slice(y0 - cur_y0, y0 - cur_y0 + height),
+                                                      slice(x0 - cur_x0, x0 - cur_x0 + width)))
+            if (width, height) == (cur_width, cur_height):
+                # Offsets only : set while streaming if the camera allows it
+                del params['Width'], params['Height']
+        if self.recorder is not None:
+            # No hardware change during a recording : only a crop of the current frames (or the current ROI)
+            unchanged = None not in current and [int(value) for value in current] == [x0, y0, width, height]
+            if roi_crop is None and not unchanged:
+                print('ROI not applied during the recording')
+                return None
+        else:
+            self.set_camera_parameters(params, callback)
+        self.roi = (x0, y0, width, height)
+        self.roi_crop = roi_crop
+        return [x0, y0, x0 + width, y0 + height]
+
+    def get_camera_parameters(self, names: list, camera=None) -> dict:
+        """
+        Read parameters of the camera. In process mode, the camera is driven by the acquisition
+        process : the values are the last ones sent by the acquisition process (initial_params).
+        :param names:   Names of the parameters.
+        :param camera:  Camera, the camera of the application by default.
+        :return:    Dictionary of the values, by parameter name (parameters not available are skipped).
+        """
+        from lensepy_app.appli._app.acquisition_process import read_camera_parameters
+        camera = camera or self.parent.variables.get('camera')
+        if camera is None:
+            return {}
+        if self.backend is not None:
+            params = getattr(camera, 'initial_params', None) or {}
+            return {name: params[name] for name in names if params.get(name) is not None}
+        return read_camera_parameters(camera, names)
+
+    def get_roi(self):
+        """
+        Get the ROI requested by set_roi.
+        :return:    (x0, y0, width, height), None if no ROI was set.
+        """
+        return self.roi
+
+    def start_recording(self, filepath: str, queue_size: int = RECORD_QUEUE_SIZE, metadata: dict = None) -> bool:
+        """
+        Record all the frames of the live acquisition and their timestamps in a raw file (see StreamRecorder).
+        The frames are written by a dedicated thread : when the disk is too slow, frames are dropped
+        from the recording (see get_recording_stats), the live acquisition is never slowed down.
+        The camera keeps all the frames of its stream during the recording (grab strategy one_by_one,
+        thread mode only).
+        :param filepath:    Name of the recording file (see open_recording to read it).
+        :param queue_size:  Maximum number of frames waiting to be written.
+        :param metadata:    Additional information stored in the file (parameters of the camera by default).
+        :return:    False if a recording is running or if the recording can not start (metadata too large).
+        """
+        if self.recorder is not None:
+            return False
+        camera = self.parent.variables.get('camera')
+        if metadata is None and camera is not None:
+            metadata = {'camera': type(camera).__name__,
+                        'parameters': dict(getattr(camera, 'initial_params', {}) or {})}
+        recorder = StreamRecorder(filepath, queue_size, metadata)
+        if not recorder.start():
+            return False
+        self.recorder = recorder
+        if self.backend is not None:
+            self.backend.recorder = self.recorder
+        elif hasattr(camera, 'set_grab_strategy') and camera.grab_strategy != 'one_by_one':
+            self.record_strategy = (camera.grab_strategy, camera.buffers_number)
+            camera.set_grab_strategy('one_by_one', max(camera.buffers_number, BURST_BUFFERS_NUMBER))
+            self._restart_stream(camera)
+        return True
+
+    def stop_recording(self) -> dict:
+        """
+        Stop the recording : the frames waiting to be written are written, then the file is closed.
+        :return:    Statistics of the recording (see StreamRecorder.get_stats), None if no recording.
+        """
+        recorder = self.recorder
+        if recorder is None:
+            return None
+        self.recorder = None
+        if self.backend is not None:
+            self.backend.recorder = None
+        stats = recorder.stop()
+        camera = self.camera or self.parent.variables.get('camera')
+        if self.record_strategy is not None and camera is not None:
+            camera.set_grab_strategy(*self.record_strategy)
+            self._restart_stream(camera)
+        self.record_strategy = None
+        return stats
+
+    def is_recording(self) -> bool:
+        """Return True if a recording is running."""
+        return self.recorder is not None
+
+    def get_recording_stats(self) -> dict:
+        """
+        Get the statistics of the running recording.
+        :return:    Dictionary : frames (written), dropped, queued, bytes, rate, error - None if no recording.
+        """
+        if self.recorder is None:
+            return None
+        return self.recorder.get_stats()
+
+    def enumerate_cameras(self) -> list:
+        """
+        List the cameras connected to the computer, of the type of the camera of the application
+        (enumerate_cameras function of the module of the camera).
+        :return:    List of dictionaries : index, serial, model, name - empty if the cameras can not be listed.
+        """
+        camera = self.parent.variables.get('camera')
+        module = None if camera is None else sys.modules.get(type(camera).__module__)
+        function = getattr(module, 'enumerate_cameras', None)
+        return [] if function is None else function()
+
+    def start_multi(self, cameras: dict, sync: str = 'timestamp', tolerance: float = DEFAULT_SYNC_TOLERANCE) -> bool:
+        """
+        Start the acquisition of several cameras, each one in its own thread (thread mode only).
+        The frames are paired by the timestamp of the cameras (shared time base required), by the time
+        of reception (host) or by trigger ID (see FrameSynchronizer). The frames of the camera of the application
+        are still sent to the subscribers of subscribe. The other cameras are configured by the caller.
+        :param cameras:     Dictionary {name: camera or serial number} - a serial number opens a camera
+            of the type of the camera of the application (see enumerate_cameras).
+        :param sync:        Pairing of the frames : 'timestamp', 'host', 'trigger' or None.
+        :param tolerance:   Maximum difference (in ns) between the timestamps of a pair.
+        :return:    True if the acquisition was started.
+        """
+        if self.mode != 'thread' or self.burst is not None or self.recorder is not None:
+            print('Multi-camera acquisition: only in thread mode, without burst nor recording')
+            return False
+        self.stop_multi()
+        main = self.parent.variables.get('camera')
+        devices = {}
+        for name, camera in cameras.items():
+            if isinstance(camera, str):
+                camera = self._open_camera(camera)
+                if camera is None:
+                    print(f'Multi-camera acquisition: camera {cameras[name]} not found')
+                    self._release_cameras()
+                    return False
+            devices[name] = camera
+        self.main_name = next((name for name, camera in devices.items() if camera is main), None)
+        if self.main_name is not None:
+            self.stop_live()
+            self.camera = main
+        self.idle_timer.stop()
+        return self.multi.start(devices, sync, tolerance)
+
+    def stop_multi(self):
+        """
+        Stop the multi-camera acquisition, the cameras opened by start_multi are closed.
+        The acquisition of the camera of the application is restarted for its subscribers.
+        """
+        self.multi.stop()
+        self._release_cameras()
+        if self.main_name is None:
+            return
+        self.main_name = None
+        if self.subscribers:
+            self.start_live()
+
+    def is_multi_running(self) -> bool:
+        """Return True if the multi-camera acquisition is running."""
+        return self.multi.is_running()
+
+    def get_multi_cameras(self) -> dict:
+        """
+        Get the cameras of the multi-camera acquisition (to set their parameters).
+        :return:    Dictionary {name: camera}.
+        """
+        return dict(self.multi.cameras) if self.multi.is_running() else {}
+
+    def get_multi_stats(self) -> dict:
+        """
+        Get the counters of the frames of the multi-camera acquisition (see MultiCameraAcquisition.get_frame_stats).
+        """
+        return self.multi.get_frame_stats()
+
+    def start_live(self):
+        """Start the acquisition on the camera of the application."""
+        camera = self.parent.variables.get('camera')
+        if camera is None or self.paused or self.burst is not None or self.main_name is not None:
+            return
+        if self.mode == 'process':
+            self._start_process(camera)
+            return
+        if self.is_running():
+            if camera is self.camera:
+                return
+            # The camera of the application changed
+            self.stop_live()
+        if hasattr(camera, 'start_acquisition'):
+            camera.start_acquisition()
+        if hasattr(camera, 'frame_pool'):
+            camera.frame_pool = self.frame_pool
+        self.camera = camera
+        processing = hasattr(camera, 'process_frame')
+        if processing:
+            self._start_processor(camera)
+        self.thread = QThread()
+        self.worker = ImageLive(self, self.raw_mailbox if processing else self.mailbox)
+        self.worker.moveToThread(self.thread)
+
+        self.thread.started.connect(self.worker.run)
+        if not processing:
+            self.worker.frame_available.connect(self._deliver_frame)
+        self.worker.finished.connect(self.thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker.finished.connect(self.thread.deleteLater)
+        self.thread.start()
+
+    def stop_live(self):
+        """Stop the acquisition (the camera is not closed)."""
+        if self.backend is not None:
+            self.backend.pause()
+        if self.worker is not None:
+            self.worker.stop()
+            if self.thread is not None:
+                self.thread.quit()
+                self.thread.wait()
+            self.worker = None
+            self.thread = None
+        if self.processor is not None:
+            self.processor.stop()
+            if self.processor_thread is not None:
+                self.processor_thread.quit()
+                self.processor_thread.wait()
+            self.processor = None
+            self.processor_thread = None
+            self.raw_mailbox.take()
+            if self.camera is not None:
+                # Frames of get_image processed by the camera again
+                self.camera.deferred_processing = False
+
+    def get_frame_stats(self) -> dict:
+        """
+        Get the counters of the frames of the acquisition.
+        :return:    Dictionary : frames (acquired), delivered (to the subscribers),
+            dropped (replaced by a newer frame), depth (frames waiting for the GUI).
+        """
+        if self.backend is not None:
+            return self.backend.get_frame_stats()
+        stats = self.mailbox.get_stats()
+        if self.raw_mailbox.frames_count > 0:
+            # Frames dropped before and after the processing stage
+            raw_stats = self.raw_mailbox.get_stats()
+            stats['frames'] = raw_stats['frames']
+            stats['dropped'] += raw_stats['dropped']
+            stats['depth'] += raw_stats['depth']
+        return stats
+
+    def close_camera(self):
+        """
+        Stop the acquisition and close the camera, if no module is subscribed.
+        A camera without close method is disconnected and removed from the variables.
+        """
+        if self._has_subscribers():
+            return
+        self.idle_timer.stop()
+        self.stop_multi()
+        if self.burst is not None:
+            # The camera is closed at the end of the burst
+            self.stop_burst()
+            return
+        if self.backend is not None:
+            self.backend.stop()
+            self.backend = None
+        self.stop_live()
+        camera = self.camera or self.parent.variables.get('camera')
+        self.camera = None
+        if camera is None:
+            return
+        camera.camera_acquiring = False
+        if hasattr(camera, 'close'):
+            if getattr(camera, 'is_open', False):
+                camera.close()
+        elif hasattr(camera, 'disconnect'):
+            camera.disconnect()
+            if self.parent.variables.get('camera') is camera:
+                self.parent.variables['camera'] = None
+
+    def stop(self):
+        """Stop the acquisition and close the camera (end of the application)."""
+        self.stop_recording()
+        owners = (list(self.subscribers) + list(self.suspended) + list(self.analyses)
+                  + list(self.camera_subscribers))
+        for owner in owners + list(self.pair_subscribers):
+            self.unsubscribe(owner, keep_alive=True)
+        self.close_camera()
+
+    def _start_processor(self, camera):
+        """
+        Start the processing thread of the raw frames of the camera.
+        :param camera:  Camera with a process_frame method.
+        """
+        camera.deferred_processing = True
+        self.processor_thread = QThread()
+        self.processor = FrameProcessor(lambda raw: camera.process_frame(raw, self.processing_pool),
+                                        self.raw_mailbox, self.mailbox)
+        self.processor.moveToThread(self.processor_thread)
+
+        self.processor_thread.started.connect(self.processor.run)
+        self.processor.frame_available.connect(self._deliver_frame)
+        self.processor.finished.connect(self.processor_thread.quit)
+        self.processor.finished.connect(self.processor.deleteLater)
+        self.processor.finished.connect(self.processor_thread.deleteLater)
+        self.processor_thread.start()
+
+    def _restart_stream(self, camera):
+        """
+        Restart the stream of the camera of the running acquisition (new grab strategy).
+        :param camera:  Camera of the application.
+        """
+        if self.backend is not None or self.worker is None:
+            return
+        self.stop_live()
+        if hasattr(camera, 'stop_streaming'):
+            camera.stop_streaming()
+        self.start_live()
+
+    def _handle_burst_ready(self, stack: FrameStack):
+        """
+        Action performed at the end of a burst : the live acquisition is restarted.
+        :param stack:   Frames of the burst.
+        """
+        if self.burst_thread is not None:
+            self.burst_thread.quit()
+            self.burst_thread.wait()
+        camera, callback = self.camera, self.burst_callback
+        self.burst, self.burst_thread, self.burst_callback = None, None, None
+        if self.burst_strategy is not None and camera is not None:
+            camera.set_grab_strategy(*self.burst_strategy)
+            self.burst_strategy = None
+        if callback is not None:
+            callback(stack)
+        if self.burst is not None:
+            return
+        if self.subscribers:
+            self.start_live()
+        elif self.idle_time > 0:
+            self.idle_timer.start(int(self.idle_time * 1000))
+        else:
+            self.close_camera()
+
+    def _deliver_frame(self):
+        """Send the latest frame of the acquisition thread to the subscribers (GUI thread)."""
+        image = self.mailbox.take()
+        if image is not None:
+            self._emit_frame(image)
+
+    def _emit_frame(self, image: np.ndarray):
+        """
+        Send a frame to the subscribers, cropped to the software ROI (see set_roi).
+        :param image:   New frame.
+        """
+        if self.roi_crop is not None:
+            shape, (rows, columns) = self.roi_crop
+            if shape is None or image.shape[:2] == shape:
+                image = image[rows, columns]
+            else:
+                # Frames of the hardware ROI
+                self.roi_crop = None
+        self.frame_ready.emit(image)
+
+    def _emit_camera_frame(self, name: str, image: np.ndarray):
+        """
+        Send a frame of the multi-camera acquisition to the subscribers of the camera.
+        :param name:    Name of the camera.
+        :param image:   New frame.
+        """
+        if name == self.main_name:
+            self._emit_frame(image)
+        for camera_name, callback in list(self.camera_subscribers.values()):
+            if camera_name == name:
+                callback(image)
+
+    def _emit_pair(self, pair: dict):
+        """
+        Send a synchronized set of frames to the subscribers.
+        :param pair:    Set of frames (see FrameSynchronizer.match).
+        """
+        for callback in list(self.pair_subscribers.values()):
+            callback(pair)
+
+    def _has_subscribers(self) -> bool:
+        """Return True if a module is subscribed to the frames of a camera."""
+        return bool(self.subscribers or self.suspended or self.camera_subscribers or self.pair_subscribers)
+
+    def _open_camera(self, serial: str):
+        """
+        Get a camera of the type of the camera of the application, by its serial number.
+        :param serial:  Serial number of the camera.
+        :return:    Camera (the camera of the application if it has this serial number), None if not found.
+        """
+        main = self.parent.variables.get('camera')
+        if main is None:
+            return None
+        if str((getattr(main, 'initial_params', None) or {}).get('DeviceSerialNumber')) == serial:
+            return main
+        if not hasattr(main, 'find_camera'):
+            return None
+        camera = type(main)()
+        if not camera.find_camera(serial):
+            return None
+        self.multi_owned.append(camera)
+        return camera
+
+    def _release_cameras(self):
+        """Close the cameras opened by start_multi."""
+        for camera in self.multi_owned:
+            camera.camera_acquiring = False
+            if hasattr(camera, 'close') and getattr(camera, 'is_open', False):
+                camera.close()
+            if hasattr(camera, 'disconnect'):
+                camera.disconnect()
+        self.multi_owned = []
+
+    def _apply_pending_parameters(self):
+        """Apply the camera parameters requested since the last update."""
+        from lensepy_app.appli._app.acquisition_process import apply_camera_parameters
+        camera = self.parent.variables.get('camera')
+        params, callback = self.pending_params, self.pending_callback
+        self.pending_params, self.pending_callback = {}, None
+        if not params or camera is None:
+            return
+        running = self.is_running()
+        live_params = {}
+        restart_params = {}
+        for name, value in params.items():
+            if running and self._is_live_parameter(camera, name):
+                live_params[name] = value
+            else:
+                restart_params[name] = value
+        if any(name in restart_params for name in ROI_PARAMETERS):
+            # Offsets and size set together, after stopping the stream
+            for name in ROI_PARAMETERS:
+                if name in live_params:
+                    restart_params[name] = live_params.pop(name)
+        if self.backend is not None:
+            # The camera is driven by the acquisition process : the device is not accessed by the GUI process
+            if live_params:
+                self.backend.set_parameters(live_params)
+            if restart_params:
+                self.backend.set_parameters(restart_params, restart=True)
+            live_params, restart_params = {}, {}
+        if live_params:
+            apply_camera_parameters(camera, live_params)
+        if restart_params:
+            if running:
+                self.stop_live()
+            apply_camera_parameters(camera, restart_params)
+            if running:
+                self.start_live()
+        if callback is not None:
+            callback(params)
+        self.update_timer.start()
+
+    def _is_live_parameter(self, camera, name: str) -> bool:
+        """
+        Check if a parameter can be set while the camera is streaming.
+        :param camera:  Camera of the running acquisition.
+        :param name:    Name of the parameter.
+        :return:    True if the parameter can be set without stopping the acquisition.
+        """
+        if name in RESTART_PARAMETERS:
+            return False
+        if self.backend is None and hasattr(camera, 'is_writable'):
+            return camera.is_writable(name)
+        return True
+
+    def _read_parameter(self, camera, name: str):
+        """
+        Read a parameter of the camera (see get_camera_parameters).
+        :param camera:  Camera of the application.
+        :param name:    Name of the parameter.
+        :return:    Value of the parameter, None if it is not available.
+        """
+        return self.get_camera_parameters([name], camera).get(name)
+
+    def _align_roi(self, camera, x0: int, y0: int, width: int, height: int) -> tuple:
+        """
+        Align a ROI on the increments of the camera and keep it in the sensor.
+        :param camera:  Camera of the application.
+        :return:    (x0, y0, width, height) aligned.
+        """
+        def get_info(name):
+            info = camera.get_parameter_info(name) if hasattr(camera, 'get_parameter_info') else None
+            return info or {}
+
+        aligned = []
+        for offset, size, (offset_name, size_name, max_name) in zip([x0, y0], [width, height], ROI_AXES):
+            offset_inc = int(get_info(offset_name).get('inc') or DEFAULT_ROI_INCREMENT)
+            size_inc = int(get_info(size_name).get('inc') or DEFAULT_ROI_INCREMENT)
+            size_min = int(get_info(size_name).get('min') or size_inc)
+            size_max = self._read_parameter(camera, max_name)
+            offset = max(offset - offset % offset_inc, 0)
+            size = max(-(-size // size_inc) * size_inc, size_min)
+            if size_max is not None:
+                size_max = int(size_max)
+                size = min(size, size_max - size_max % size_inc)
+                offset = min(offset, size_max - size)
+                offset -= offset % offset_inc
+            aligned += [offset, size]
+        return aligned[0], aligned[2], aligned[1], aligned[3]
+
+    def _start_process(self, camera):
+        """
+        Start (or resume) the acquisition process and the analysis processes.
+        :param camera:  Camera of the application.
+        """
+        from lensepy_app.appli._app.acquisition_process import ProcessAcquisition
+        if self.backend is not None and camera is not self.camera:
+            # The camera of the application changed
+            self.backend.stop()
+            self.backend = None
+        if self.backend is None:
+            if getattr(camera, 'is_open', False):
+                camera.close()      # The camera is opened by the acquisition process
+            self.backend = ProcessAcquisition(self.slots)
+            self.backend.recorder = self.recorder
+            self.backend.frame_ready.connect(self._emit_frame)
+            self.backend.analysis_ready.connect(self._handle_analysis_ready)
+            for owner, (function_path, kwargs, _, _) in self.analyses.items():
+                self.backend.add_analysis(self._get_analysis_name(owner), function_path, kwargs)
+        self.camera = camera
+        self.backend.start(camera)
+
+    def _remove_callback(self, owner):
+        """
+        Disconnect the frames callback of a subscriber.
+        :param owner:   Subscriber.
+        """
+        callback = self.subscribers.pop(owner, None)
+        if callback is not None:
+            try:
+                self.frame_ready.disconnect(callback)
+            except TypeError:
+                pass
+
+    def _remove_analysis(self, owner):
+        """
+        Remove the analysis of a subscriber.
+        :param owner:   Subscriber.
+        """
+        analysis = self.analyses.pop(owner, None)
+        if analysis is None:
+            return
+        if analysis[3] is not None:
+            try:
+                self.frame_ready.disconnect(analysis[3])
+            except TypeError:
+                pass
+        if self.backend is not None:
+            self.backend.remove_analysis(self._get_analysis_name(owner))
+
+    def _get_analysis_name(self, owner) -> str:
+        """Name of the analysis of a subscriber."""
+        return f'{type(owner).__name__}_{id(owner)}'
+
+    def _run_analysis(self, owner, function, image: np.ndarray):
+        """
+        Run an analysis in the GUI thread (thread mode).
+        :param owner:       Subscriber.
+        :param function:    Analysis function.
+        :param image:       New frame.
+        """
+        analysis = self.analyses.get(owner)
+        if analysis is not None:
+            analysis[2](function(image, **analysis[1]))
+
+    def _handle_analysis_ready(self, name: str, result):
+        """
+        Action performed when an analysis process sent a result (process mode).
+        :param name:    Name of the analysis.
+        :param result:  Result of the analysis.
+        """
+        for owner, analysis in self.analyses.items():
+            if self._get_analysis_name(owner) == name:
+                analysis[2](result)
+                return
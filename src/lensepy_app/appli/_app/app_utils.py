@@ -1,5 +1,85 @@
 import sys, os
+import json
+import hashlib
+import importlib.util
+from importlib import metadata
+from pathlib import Path
 import xml.etree.ElementTree as ET
+from lensepy_app.appli._app.module_finder import register_location, get_entry_point_modules, ENTRY_POINTS_GROUP
+
+CACHE_DIR = os.path.join(Path.home(), '.lensepy_app', 'cache')
+MANIFEST_VERSION = 3
+MANIFEST_PACKAGES = ['lensepy', 'lensepy-app']  # Packages of the modules (version and location in the cache key)
+
+_xml_trees = {}     # Parsed XML files, by absolute path : (mtime, root)
+
+
+def parse_xml_file(xml_file: str):
+    """
+    Parse an XML file. The file is parsed again only if it was modified.
+    :param xml_file:    File path of the XML file.
+    :return:    Root element of the XML file, None if the file does not exist.
+    """
+    path = os.path.abspath(xml_file)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        _xml_trees.pop(path, None)
+        return None
+    cached = _xml_trees.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    xml_root = ET.parse(path).getroot()
+    _xml_trees[path] = (mtime, xml_root)
+    return xml_root
+
+
+def get_environment_key() -> str:
+    """
+    Describe the Python environment used to find the modules : interpreter prefix, import path,
+    version and location of the lensepy packages and of the packages declaring modules (entry points).
+    :return:    Description of the environment.
+    """
+    packages = set(MANIFEST_PACKAGES)
+    try:
+        packages.update(ep.dist.name for ep in metadata.entry_points(group=ENTRY_POINTS_GROUP)
+                        if getattr(ep, 'dist', None) is not None)
+    except Exception:
+        pass
+    versions = []
+    for package in sorted(packages):
+        try:
+            dist = metadata.distribution(package)
+            versions.append(f'{package}={dist.version}@{dist.locate_file("")}')
+        except metadata.PackageNotFoundError:
+            versions.append(f'{package}=None')
+    return '|'.join([sys.prefix, os.pathsep.join(sys.path)] + versions)
+
+
+def get_appli_root(app_name, standalone=False):
+    """
+    Get the directory of an application.
+    :param app_name:    Name of the application (in applis_dir) or its path (standalone).
+    :param standalone:  True if the application is outside the package.
+    :return:    Path of the directory, None if no application.
+    """
+    if not standalone:
+        appli_root = Path(__file__).resolve().parents[2]
+        return f'{appli_root}/applis_dir/{app_name}'
+    elif app_name is not None:
+        return f'{app_name}'
+    return None
+
+
+def get_cache_dir(sub_dir: str = '') -> str:
+    """
+    Get (and create if necessary) the cache directory of the package.
+    :param sub_dir:     Name of a sub-directory of the cache directory.
+    :return:    Path of the cache directory.
+    """
+    cache_dir = os.path.join(CACHE_DIR, sub_dir) if sub_dir else CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
 
 
 class XMLFileConfig:
@@ -13,6 +93,34 @@ class XMLFileConfig:
             self.xml_file = xml_file
         else:
             self.xml_file = None
+        self._xml_root = None
+        self._modules = {}      # Module nodes, indexed by name
+
+    def _get_root(self):
+        """
+        Get the root of the XML file. Modules are indexed again if the file changed.
+        :return:    Root element of the XML file.
+        """
+        if self.xml_file is None:
+            return None
+        xml_root = parse_xml_file(self.xml_file)
+        if xml_root is not self._xml_root:
+            self._xml_root = xml_root
+            self._modules = {}
+            if xml_root is not None:
+                for module in xml_root.findall('module'):
+                    self._modules[module.find('name').text] = module
+        return xml_root
+
+    def _get_module(self, module_name: str):
+        """
+        Get the node of a module.
+        :param module_name: Name of the module.
+        :return:    XML node of the module, None if the module is not in the file.
+        """
+        if self._get_root() is None:
+            return None
+        return self._modules.get(module_name)
 
     def get_parameter_xml(self, parameter):
         """
@@ -20,19 +128,16 @@ class XMLFileConfig:
         :param parameter:   Name of the node inside the XML file.
         :return:        Value of the parameter.
         """
-        if self.xml_file is not None:
-            tree = ET.parse(self.xml_file)
-            xml_root = tree.getroot()
+        xml_root = self._get_root()
+        if xml_root is not None:
             param_value = xml_root.find(parameter)
             if param_value is not None:
                 return param_value.text
         return None
 
     def get_contributors_by_type(self):
-        if self.xml_file is not None:
-            # Charger le fichier XML
-            tree = ET.parse(self.xml_file)
-            root = tree.getroot()
+        root = self._get_root()
+        if root is not None:
             contributors_by_type = {}   # Empty dictionary
             # Get contributors in XML file
             for contributor in root.findall("./contributors/contributor"):
@@ -78,14 +183,9 @@ class XMLFileConfig:
 
         :return:
         """
-        modules_list = []
-        if self.xml_file is not None:
-            tree = ET.parse(self.xml_file)
-            xml_root = tree.getroot()
-            modules = xml_root.findall('module')
-            for module in modules:
-                modules_list.append(module.find('name').text)
-        return modules_list
+        if self._get_root() is not None:
+            return list(self._modules)
+        return []
 
     def get_variables(self):
         """
@@ -93,9 +193,8 @@ class XMLFileConfig:
         :return:
         """
         variables_list = {}
-        if self.xml_file is not None:
-            tree = ET.parse(self.xml_file)
-            xml_root = tree.getroot()
+        xml_root = self._get_root()
+        if xml_root is not None:
             variables = xml_root.findall('variable')
             for var_ in variables:
                 name = var_.get("name")
@@ -103,21 +202,28 @@ class XMLFileConfig:
                 variables_list[name] = value if value is not None else None
         return variables_list
 
+    def get_variables_types(self):
+        """
+        Get the declared types of the variables (attribute type of a variable).
+        :return:    Dictionary of type names, by variable name.
+        """
+        types_list = {}
+        xml_root = self._get_root()
+        if xml_root is not None:
+            for var_ in xml_root.findall('variable'):
+                if var_.get('type') is not None:
+                    types_list[var_.get('name')] = var_.get('type')
+        return types_list
+
     def get_module_path(self, module_name: str):
         """
 
         :param module_name: Name of the module
-        :return:
+        :return:    Location of the module, None if the module has no location (entry point of another package).
         """
-        modules_list = []
-        if self.xml_file is not None:
-            tree = ET.parse(self.xml_file)
-            xml_root = tree.getroot()
-            modules = xml_root.findall('module')
-            for module in modules:
-                if module.find('name').text == module_name:
-                    module_path = module.find('location').text
-                    return module_path
+        module = self._get_module(module_name)
+        if module is not None and module.find('location') is not None:
+            return module.find('location').text
         return None
 
     def get_module_parameter(self, module_name: str, parameter: str):
@@ -127,15 +233,10 @@ class XMLFileConfig:
         :param parameter: Name of the parameter to get.
         :return:
         """
-        modules_list = []
-        if self.xml_file is not None:
-            tree = ET.parse(self.xml_file)
-            xml_root = tree.getroot()
-            modules = xml_root.findall('module')
-            for module in modules:
-                if module.find('name').text == module_name:
-                    if module.find(parameter) is not None:
-                        return module.find(parameter).text
+        module = self._get_module(module_name)
+        if module is not None:
+            if module.find(parameter) is not None:
+                return module.find(parameter).text
         return None
 
     def get_sub_parameter(self, parameter: str, sub_parameter: str):
@@ -145,16 +246,14 @@ class XMLFileConfig:
         :param sub_parameter:    Name of the sub paramter to get.
         :return:    Value of the sub parameter.
         """
-        if self.xml_file is not None:
-            tree = ET.parse(self.xml_file)
-            xml_root = tree.getroot()
+        xml_root = self._get_root()
+        if xml_root is not None:
             module = xml_root.find(parameter)
             if module is not None:
-                t = module.find(sub_parameter).text
-                print(t)
-                return module.find(sub_parameter).text
-            else:
-                return None
+                sub_module = module.find(sub_parameter)
+                if sub_module is not None:
+                    return sub_module.text
+            return None
         return None
 
     def get_xml_file(self):
@@ -184,13 +283,181 @@ class XMLFileModule:
         :return:        Value of the parameter.
         """
         if self.xml_file is not None:
-            tree = ET.parse(self.xml_file)
-            xml_root = tree.getroot()
-            param_value = xml_root.find(parameter)
-            if param_value is not None:
-                return param_value.text
+            xml_root = parse_xml_file(self.xml_file)
+            if xml_root is not None:
+                param_value = xml_root.find(parameter)
+                if param_value is not None:
+                    return param_value.text
         return None
 
 
+class ModulesManifest:
+    """
+    Resolved information about the modules of an application.
+    For each module : import path, directory, XML file, requirements and required variables.
+    The manifest is stored in the cache directory. It is reused as long as the XML
+    files are not modified, so no XML parsing and no module lookup is done at restart.
+    A manifest is kept per Python environment (see get_environment_key), and only if all
+    the modules were resolved.
+    """
+
+    def __init__(self, xml_app: XMLFileConfig, use_cache: bool = True):
+        """
+
+        :param xml_app:     XML file of the application.
+        :param use_cache:   True to load / store the manifest in the cache directory.
+        """
+        self.xml_app = xml_app
+        self.use_cache = use_cache
+        self.modules = {}       # Module information, by module name
+        self.xml_mtimes = {}    # Modification time of the XML files used to build the manifest
+        self.from_cache = False
+        if not self.load():
+            self.build()
+            self.save()
+        self.register_locations()
+
+    def get_cache_file(self) -> str:
+        """
+        Get the cache file of the manifest.
+        The key depends on the XML file, the working directory (for './' modules) and the Python
+        environment (reinstalled packages, other virtual environment...).
+        :return:    Path of the cache file.
+        """
+        key = f'{os.path.abspath(self.xml_app.get_xml_file())}|{os.getcwd()}|{get_environment_key()}'
+        key = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(CACHE_DIR, f'manifest_{key}.json')
+
+    def load(self) -> bool:
+        """
+        Load the manifest from the cache file, if the XML files were not modified.
+        :return:    True if the manifest was loaded.
+        """
+        if not self.use_cache or self.xml_app.get_xml_file() is None:
+            return False
+        try:
+            with open(self.get_cache_file(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != MANIFEST_VERSION:
+            return False
+        for path, mtime in data.get('xml_mtimes', {}).items():
+            if mtime is None:
+                if os.path.exists(path):
+                    return False
+            elif not os.path.exists(path) or os.path.getmtime(path) != mtime:
+                return False
+        # Missing modules are searched again (a package may have been installed)
+        if any(info['status'] != 'ok' for info in data.get('modules', {}).values()):
+            return False
+        self.modules = data.get('modules', {})
+        self.xml_mtimes = data.get('xml_mtimes', {})
+        self.from_cache = True
+        return True
+
+    def register_locations(self):
+        """Register the external locations ('./') of the modules in the import finder."""
+        for module, info in self.modules.items():
+            if './' in info['location']:
+                register_location(info['location'], [module], info.get('root_dir'))
+
+    def save(self):
+        """Store the manifest in the cache file."""
+        if not self.use_cache or self.xml_app.get_xml_file() is None:
+            return
+        if any(info['status'] != 'ok' for info in self.modules.values()):
+            # Failed resolutions are not stored : searched again at the next start
+            return
+        data = {'version': MANIFEST_VERSION, 'xml_mtimes': self.xml_mtimes,
+                'modules': self.modules}
+        try:
+            get_cache_dir()
+            with open(self.get_cache_file(), 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1)
+        except OSError as e:
+            print(f'Manifest cache error: {e}')
+
+    def build(self):
+        """Resolve all the modules listed in the XML file of the application."""
+        self.modules = {}
+        self.xml_mtimes = {}
+        xml_file = self.xml_app.get_xml_file()
+        if xml_file is None:
+            return
+        self.xml_mtimes[os.path.abspath(xml_file)] = os.path.getmtime(xml_file)
+        for module in self.xml_app.get_list_modules():
+            self.modules[module] = self._resolve_module(module)
+            xml_path = self.modules[module]['xml_path']
+            if xml_path is not None:
+                xml_path = os.path.abspath(xml_path)
+                self.xml_mtimes[xml_path] = os.path.getmtime(xml_path) if os.path.exists(xml_path) else None
+
+    def _resolve_module(self, module: str) -> dict:
+        """
+        Find the location of a module and read its XML file.
+        :param module:  Name of the module.
+        :return:    Dictionary containing the information about the module.
+        """
+        location = self.xml_app.get_module_path(module) or ''
+        info = {'name': module, 'location': location, 'status': 'ok',
+                'import_path': None, 'module_dir': None, 'xml_path': None,
+                'requirements': self.xml_app.get_module_parameter(module, 'requirements'),
+                'module_requirements': None, 'req_var': None,
+                'controller': None, 'display': None, 'batch': None, 'root_dir': None}
+        if './' in location:
+            # External module - found by the import finder, sys.path is not modified
+            info['root_dir'] = os.getcwd()
+            location_n = register_location(location, [module], info['root_dir'])
+            info['import_path'] = f'{location_n}.{module}'
+            info['module_dir'] = os.path.abspath(f'{location}/{module}')
+        elif location == '':
+            # Module of another package (entry point)
+            info['import_path'] = get_entry_point_modules().get(module)
+            if info['import_path'] is None:
+                info['status'] = 'missing'
+                return info
+        else:
+            # lensepy module
+            info['import_path'] = f'{location}.{module}'
+        try:
+            spec = importlib.util.find_spec(info['import_path'])
+            if spec is None:
+                info['status'] = 'missing'
+            elif spec.origin is not None and info['module_dir'] is None:
+                info['module_dir'] = os.path.dirname(spec.origin)
+            elif spec.submodule_search_locations and info['module_dir'] is None:
+                info['module_dir'] = list(spec.submodule_search_locations)[0]
+        except (ImportError, ValueError):
+            info['status'] = 'error'
+        if info['module_dir'] is not None:
+            info['xml_path'] = f'{info["module_dir"]}/{module}.xml'
+            xml_module = XMLFileModule(info['xml_path'])
+            for param in ['requirements', 'req_var', 'controller', 'display', 'batch']:
+                key = 'module_requirements' if param == 'requirements' else param
+                info[key] = xml_module.get_parameter_xml(param)
+        return info
+
+    def get_module(self, module: str):
+        """
+        Get the information about a module.
+        :param module:  Name of the module.
+        :return:    Dictionary containing the information, None if the module is unknown.
+        """
+        return self.modules.get(module)
+
+    def get_parameter(self, module: str, parameter: str):
+        """
+        Get a resolved parameter of a module.
+        :param module:      Name of the module.
+        :param parameter:   Name of the parameter (import_path, xml_path, req_var...).
+        :return:    Value of the parameter, None if the module is unknown.
+        """
+        info = self.modules.get(module)
+        if info is None:
+            return None
+        return info.get(parameter)
+
+
 if __name__ == "__main__":
     pass
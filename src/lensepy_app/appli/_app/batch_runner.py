@@ -0,0 +1,255 @@
+import os
+import csv
+import glob
+import time
+import importlib
+import traceback
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from lensepy_app.appli._app.app_utils import XMLFileConfig, ModulesManifest, parse_xml_file
+from lensepy_app.appli._app.module_finder import get_finder
+
+BATCH_OPTION = '--batch'
+BATCH_RESULTS_FILE = 'batch_results.csv'
+
+
+def get_batch_option(argv: list):
+    """
+    Extract the batch option from a list of arguments (the option is removed from the list).
+    --batch=batch_file.xml or --batch batch_file.xml
+    :param argv:    List of arguments (modified).
+    :return:    Path of the batch file, None if the option is not set.
+    """
+    for k, arg in enumerate(list(argv)):
+        if arg == BATCH_OPTION and k + 1 < len(argv):
+            batch_file = argv[k + 1]
+            del argv[k:k + 2]
+            return batch_file
+        elif arg.startswith(f'{BATCH_OPTION}='):
+            argv.remove(arg)
+            return arg.split('=', 1)[1]
+    return None
+
+
+def expand_path(file_path: str) -> str:
+    """
+    Replace the %USER% tag of a path by the home directory of the user.
+    :param file_path:   Path to expand.
+    :return:    Expanded path.
+    """
+    if '%USER' in file_path:
+        return f'{Path.home()}/{file_path.split("%")[2].lstrip("/")}'
+    return os.path.expanduser(file_path)
+
+
+class BatchContext:
+    """
+    Data of one input file processed by a chain of modules, without any window.
+    Processing functions read and write the variables, as the controllers do with
+    the variables of the main manager, and store their results in the output directory.
+    """
+
+    def __init__(self, input_file: str, output_dir: str, variables: dict = None):
+        """
+
+        :param input_file:  Path of the file to process.
+        :param output_dir:  Directory of the results.
+        :param variables:   Initial variables (from the batch file).
+        """
+        self.input_file = input_file
+        self.output_dir = output_dir
+        self.basename = os.path.splitext(os.path.basename(input_file))[0]
+        self.variables = dict(variables or {})
+        self.results = {}       # Scalar results, written in the summary file
+
+    def get_variable(self, name: str, default=None):
+        """
+        Get a variable.
+        :param name:        Name of the variable.
+        :param default:     Value if the variable is not set.
+        :return:    Value of the variable.
+        """
+        value = self.variables.get(name)
+        return default if value is None else value
+
+    def add_result(self, name: str, value):
+        """
+        Add a scalar result to the summary file.
+        :param name:    Name of the result (column of the summary file).
+        :param value:   Value of the result.
+        """
+        self.results[name] = value
+
+    def get_output_path(self, suffix: str) -> str:
+        """
+        Get the path of a result file of the input file.
+        :param suffix:  Suffix of the file, with its extension (ex. 'surface.npy').
+        :return:    Path of the file.
+        """
+        return os.path.join(self.output_dir, f'{self.basename}_{suffix}')
+
+    def save_array(self, name: str, array: np.ndarray) -> str:
+        """
+        Save an array in a .npy file of the output directory (masked values are set to NaN).
+        :param name:    Name of the array.
+        :param array:   Array to save.
+        :return:    Path of the file.
+        """
+        if isinstance(array, np.ma.MaskedArray):
+            array = array.astype(float).filled(np.nan)
+        file_path = self.get_output_path(f'{name}.npy')
+        np.save(file_path, array)
+        return file_path
+
+
+def run_batch_item(steps: list, input_file: str, output_dir: str, variables: dict,
+                   roots: dict = None) -> dict:
+    """
+    Process one input file by a chain of modules (function executed in the worker processes).
+    :param steps:       List of (module name, import path, function name).
+    :param input_file:  Path of the file to process.
+    :param output_dir:  Directory of the results.
+    :param variables:   Initial variables.
+    :param roots:       Root packages of the external modules (see ExternalModulesFinder).
+    :return:    Dictionary of the results (input, status, error, duration and module results).
+    """
+    for package, directory in (roots or {}).items():
+        get_finder().add_root(package, directory)
+    context = BatchContext(input_file, output_dir, variables)
+    result = {'input': input_file, 'status': 'ok', 'error': ''}
+    t_start = time.perf_counter()
+    for module, import_path, function_name in steps:
+        try:
+            function = getattr(importlib.import_module(import_path), function_name)
+            function(context)
+        except Exception as e:
+            result['status'] = f'error ({module})'
+            result['error'] = f'{type(e).__name__}: {e}'
+            traceback.print_exc()
+            break
+    result['duration'] = round(time.perf_counter() - t_start, 3)
+    result.update(context.results)
+    return result
+
+
+class BatchRunner:
+    """
+    Headless execution of a chain of modules on a list of files.
+    The processing function of each module is declared in its XML file :
+    <batch>module_models.process_batch</batch> (file of the module package and function).
+    Batch file :
+        <batch>
+            <config>appli.xml</config>          (optional, file in the config directory of the application)
+            <modules>images,masks,interfer_control,aberrations</modules>
+            <input>%USER%/data/*.mat</input>    (glob patterns, separated by ',')
+            <output>./results</output>
+            <workers>4</workers>                (optional, number of processes)
+            <variable name="wedge">1</variable> (optional, initial variables)
+        </batch>
+    """
+
+    def __init__(self, appli_root: str, batch_file: str):
+        """
+
+        :param appli_root:  Directory of the application.
+        :param batch_file:  Path of the XML batch file.
+        """
+        self.appli_root = appli_root
+        self.batch_file = batch_file
+        self.config_name = f'{appli_root}/config/appli.xml'
+        self.modules = []
+        self.inputs = []
+        self.output_dir = './results'
+        self.workers = 1
+        self.variables = {}
+        self.steps = []         # (module name, import path, function name)
+        self.results = []
+
+    def load(self) -> bool:
+        """
+        Read the batch file and find the processing function of each module.
+        :return:    True if the batch is ready.
+        """
+        root = parse_xml_file(self.batch_file)
+        if root is None:
+            print(f'Batch file {self.batch_file} not found')
+            return False
+        config = root.findtext('config')
+        if config:
+            self.config_name = config if os.path.isabs(config) else f'{self.appli_root}/config/{config}'
+        self.modules = [m.strip() for m in (root.findtext('modules') or '').split(',') if m.strip()]
+        for pattern in (root.findtext('input') or '').split(','):
+            if pattern.strip():
+                self.inputs.extend(sorted(glob.glob(expand_path(pattern.strip()))))
+        self.output_dir = expand_path(root.findtext('output') or self.output_dir)
+        self.workers = int(root.findtext('workers') or 1)
+        for var_ in root.findall('variable'):
+            self.variables[var_.get('name')] = var_.text
+        return self.init_steps()
+
+    def init_steps(self) -> bool:
+        """
+        Find the processing function of each module of the chain.
+        :return:    True if all the modules have a processing function.
+        """
+        if not os.path.exists(self.config_name):
+            print(f'Application file {self.config_name} not found')
+            return False
+        xml_app = XMLFileConfig(self.config_name)
+        manifest = ModulesManifest(xml_app)
+        # Variables of the application, updated by the batch file
+        self.variables = {**xml_app.get_variables(), **self.variables}
+        self.steps = []
+        for module in self.modules:
+            info = manifest.get_module(module)
+            if info is None or info['status'] != 'ok':
+                print(f'Module {module} is not available in {self.config_name}')
+                return False
+            if info.get('batch') is None:
+                print(f'Module {module} has no batch processing')
+                return False
+            file_name, _, function_name = info['batch'].rpartition('.')
+            self.steps.append((module, f'{info["import_path"]}.{file_name}', function_name))
+        return len(self.steps) != 0
+
+    def run(self) -> list:
+        """
+        Process all the input files. The files are processed in parallel if workers > 1.
+        :return:    List of the results of each file.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        print(f'Batch: {len(self.inputs)} files / {" > ".join(self.modules)}')
+        t_start = time.perf_counter()
+        roots = dict(get_finder().roots)
+        args = [(self.steps, input_file, self.output_dir, self.variables, roots) for input_file in self.inputs]
+        if self.workers > 1 and len(self.inputs) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(run_batch_item, *arg) for arg in args]
+                self.results = [future.result() for future in futures]
+        else:
+            self.results = [run_batch_item(*arg) for arg in args]
+        for result in self.results:
+            print(f' - {result["input"]}: {result["status"]} {result["error"]}')
+        print(f'Batch done in {time.perf_counter() - t_start:.1f} s / '
+              f'results in {self.save_results()}')
+        return self.results
+
+    def save_results(self) -> str:
+        """
+        Write the summary of the results in a CSV file of the output directory.
+        :return:    Path of the file.
+        """
+        file_path = os.path.join(self.output_dir, BATCH_RESULTS_FILE)
+        columns = []
+        for result in self.results:
+            columns.extend([key for key in result if key not in columns])
+        with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, delimiter=';')
+            writer.writeheader()
+            writer.writerows(self.results)
+        return file_path
+
+    def get_errors_number(self) -> int:
+        """Return the number of files that were not processed."""
+        return len([result for result in self.results if result['status'] != 'ok'])
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from PyQt6 import sip
+
+DEFAULT_POOL_SIZE = 3       # Maximum number of suspended controllers
+DEFAULT_POOL_MEMORY = 512   # Maximum memory of the suspended controllers, in MB
+
+
+class ControllerPool:
+    """
+    Bounded LRU pool of suspended controllers.
+    When a module is selected again, its controller (and its widgets) is resumed
+    from the pool instead of being rebuilt.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_POOL_SIZE, max_memory: float = DEFAULT_POOL_MEMORY):
+        """
+
+        :param max_size:    Maximum number of suspended controllers. 0 to disable the pool.
+        :param max_memory:  Maximum memory used by the suspended controllers, in MB.
+        """
+        self.max_size = max_size
+        self.max_memory = max_memory
+        self.controllers = OrderedDict()    # Suspended controllers, by module name (LRU first)
+
+    def __contains__(self, module: str) -> bool:
+        return module in self.controllers
+
+    def __len__(self) -> int:
+        return len(self.controllers)
+
+    def is_enabled(self) -> bool:
+        """Return True if controllers can be stored in the pool."""
+        return self.max_size > 0
+
+    def put(self, module: str, controller) -> bool:
+        """
+        Store a suspended controller in the pool.
+        The least recently used controllers are released if the pool is full.
+        :param module:      Name of the module.
+        :param controller:  Suspended controller.
+        :return:    True if the controller is stored in the pool.
+        """
+        if not self.is_enabled():
+            return False
+        if module in self.controllers and self.controllers[module] is not controller:
+            self.release(module)
+        self.controllers[module] = controller
+        self.controllers.move_to_end(module)
+        self._check_limits(keep=module)
+        return module in self.controllers
+
+    def take(self, module: str):
+        """
+        Remove a controller from the pool.
+        :param module:  Name of the module.
+        :return:    Suspended controller, None if the module is not in the pool.
+        """
+        return self.controllers.pop(module, None)
+
+    def release(self, module: str):
+        """
+        Definitively delete a controller of the pool and its widgets.
+        :param module:  Name of the module.
+        """
+        controller = self.controllers.pop(module, None)
+        if controller is None:
+            return
+        if hasattr(controller, "cleanup"):
+            controller.cleanup()
+        for widget in get_controller_widgets(controller):
+            if not sip.isdeleted(widget):
+                widget.deleteLater()
+
+    def clear(self):
+        """Release all the controllers of the pool."""
+        for module in list(self.controllers):
+            self.release(module)
+
+    def get_widgets(self) -> list:
+        """
+        Get the containers of all the suspended controllers.
+        :return:    List of widgets that must not be deleted.
+        """
+        widgets = []
+        for controller in self.controllers.values():
+            widgets.extend(get_controller_widgets(controller))
+        return widgets
+
+    def get_memory_usage(self) -> float:
+        """
+        Get the estimated memory used by the suspended controllers.
+        :return:    Memory in MB.
+        """
+        total = 0
+        for controller in self.controllers.values():
+            if hasattr(controller, 'get_memory_usage'):
+                total += controller.get_memory_usage()
+        return total / 2**20
+
+    def _check_limits(self, keep: str = ''):
+        """
+        Release the least recently used controllers while the limits are exceeded.
+        :param keep:    Name of a module to keep, if possible.
+        """
+        while len(self.controllers) > self.max_size:
+            self.release(next(iter(self.controllers)))
+        while self.controllers and self.get_memory_usage() > self.max_memory:
+            modules = [m for m in self.controllers if m != keep] or [keep]
+            self.release(modules[0])
+
+
+def get_controller_widgets(controller) -> list:
+    """
+    Get the four containers of a controller.
+    :param controller:  Controller (TemplateController).
+    :return:    List of widgets.
+    """
+    widgets = []
+    for name in ['top_left', 'top_right', 'bot_left', 'bot_right']:
+        widget = getattr(controller, name, None)
+        if widget is not None:
+            widgets.append(widget)
+    return widgets
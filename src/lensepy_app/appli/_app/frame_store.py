@@ -0,0 +1,352 @@
+import sys
+import time
+import threading
+import numpy as np
+
+DEFAULT_POOL_SIZE = 6   # Number of preallocated buffers of a frame pool
+MAX_STACK_MEMORY = 2 * 1024 ** 3    # Maximum size (in bytes) of a stack of frames
+
+
+class Frame:
+    """
+    Read-only image shared between modules, with a sequence number and a timestamp.
+    The pixels are never copied : the frame holds a read-only view of the image (the array of the producer
+    is not modified), a module that needs to modify the image must work on a copy (see get_writable_copy).
+    The references can be acquired and released from any thread.
+    """
+
+    __slots__ = ('array', 'sequence', 'timestamp', 'source', 'metadata', '_refs', '_on_release', '_lock')
+
+    def __init__(self, array: np.ndarray, sequence: int, timestamp: float = None,
+                 source: str = '', metadata: dict = None, on_release=None):
+        """
+
+        :param array:       Numpy array containing the image (a read-only view is kept).
+        :param sequence:    Sequence number of the frame.
+        :param timestamp:   Time of the frame (time.perf_counter), now if None.
+        :param source:      Name of the source of the frame (camera, file...).
+        :param metadata:    Dictionary of additional information.
+        :param on_release:  Function called with the frame when its last reference is released.
+        """
+        view = array.view()
+        view.flags.writeable = False
+        self.array = view
+        self.sequence = sequence
+        self.timestamp = time.perf_counter() if timestamp is None else timestamp
+        self.source = source
+        self.metadata = metadata or {}
+        self._refs = 1
+        self._on_release = on_release
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    @property
+    def dtype(self):
+        return self.array.dtype
+
+    def acquire(self):
+        """
+        Add a reference to the frame (the frame is kept alive until released).
+        :return:    The frame.
+        """
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        """Release a reference to the frame."""
+        with self._lock:
+            self._refs -= 1
+            released = self._refs == 0
+        if released and self._on_release is not None:
+            self._on_release(self)
+
+    def get_writable_copy(self) -> np.ndarray:
+        """
+        Get a copy of the image that can be modified.
+        :return:    Numpy array.
+        """
+        return self.array.copy()
+
+
+class FrameStore:
+    """
+    Store of the latest frame of the application, owned by the main manager.
+    The latest image is also available as variables['image'] (read-only array) : with a VariableStore,
+    the variable is bound to the store (see VariableStore.bind), the frames are not written in the
+    observed variables and no signal is emitted at each frame, only when an image becomes available
+    or is removed (definition_changed). The frames are delivered to the modules by the acquisition
+    service (mailbox and frame_ready signal).
+    """
+
+    def __init__(self, variables: dict = None, variable_name: str = 'image'):
+        """
+
+        :param variables:       Dictionary of the application variables to update.
+        :param variable_name:   Name of the variable containing the latest image.
+        """
+        self.variables = variables
+        self.variable_name = variable_name
+        self.sequence = 0
+        self._latest: Frame = None
+        self._lock = threading.Lock()
+        self._bound = hasattr(variables, 'bind')
+        if self._bound:
+            variables.bind(variable_name, self.get_image, self._set_image)
+
+    def publish(self, image: np.ndarray, source: str = '', timestamp: float = None,
+                metadata: dict = None, on_release=None) -> Frame:
+        """
+        Publish a new image. The image is not copied : the producer must not modify it afterwards.
+        :param image:       Numpy array containing the new image.
+        :param source:      Name of the source of the image.
+        :param timestamp:   Time of the image (time.perf_counter), now if None.
+        :param metadata:    Dictionary of additional information.
+        :param on_release:  Function called when the frame is no longer used.
+        :return:    New frame.
+        """
+        frame = self._publish(image, source, timestamp, metadata, on_release)
+        if frame is None:
+            return None
+        if self._bound:
+            self.variables.notify_definition(self.variable_name)
+        elif self.variables is not None:
+            self.variables[self.variable_name] = frame.array
+        return frame
+
+    def _publish(self, image: np.ndarray, source: str = '', timestamp: float = None,
+                 metadata: dict = None, on_release=None) -> Frame:
+        """Replace the latest frame (see publish), without updating the variables."""
+        if image is None:
+            return None
+        with self._lock:
+            self.sequence += 1
+            frame = Frame(image, self.sequence, timestamp, source, metadata, on_release)
+            old_frame, self._latest = self._latest, frame
+        if old_frame is not None:
+            old_frame.release()
+        return frame
+
+    def _set_image(self, image: np.ndarray):
+        """
+        Set the latest image from the variables (variables['image'] = image), None to remove it.
+        :param image:   Numpy array containing the new image.
+        """
+        if image is None:
+            self._clear()
+        else:
+            self._publish(image, source='variables')
+
+    def latest(self) -> Frame:
+        """
+        Get the latest frame.
+        :return:    Latest frame, None if no image was published.
+        """
+        return self._latest
+
+    def get_image(self) -> np.ndarray:
+        """
+        Get the latest image (read-only, zero-copy).
+        :return:    Numpy array, None if no image was published.
+        """
+        frame = self._latest
+        return frame.array if frame is not None else None
+
+    def get_writable_image(self) -> np.ndarray:
+        """
+        Get a copy of the latest image that can be modified.
+        :return:    Numpy array, None if no image was published.
+        """
+        frame = self._latest
+        return frame.get_writable_copy() if frame is not None else None
+
+    def is_newer(self, sequence: int) -> bool:
+        """
+        Check if a newer frame than the specified sequence number is available.
+        :param sequence:    Sequence number of the last frame processed by a module.
+        :return:    True if a newer frame is available.
+        """
+        frame = self._latest
+        return frame is not None and frame.sequence > sequence
+
+    def clear(self):
+        """Remove the latest frame."""
+        self._clear()
+        if self._bound:
+            self.variables.notify_definition(self.variable_name)
+
+    def _clear(self):
+        """Remove the latest frame (see clear), without updating the variables."""
+        with self._lock:
+            old_frame, self._latest = self._latest, None
+        if old_frame is not None:
+            old_frame.release()
+
+
+class FramePool:
+    """
+    Pool of preallocated frame buffers, sized to the current format of the frames (shape and dtype).
+    The producer (acquisition) writes the frames into buffers of the pool, and the consumers
+    borrow read-only views of the buffers. A buffer is released when the last view on it is deleted
+    (reference count of the buffer) : it is then reused for a next frame, so the live acquisition
+    does not allocate memory per frame. A frame kept by a consumer (list of images...)
+    keeps its buffer : when all the buffers are borrowed, a new array is allocated.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE):
+        """
+
+        :param size:    Number of buffers of the pool.
+        """
+        self.size = size
+        self.shape = None
+        self.dtype = None
+        self.buffers = []
+        self.allocations = 0        # Arrays allocated (pool buffers and overflow)
+        self._lock = threading.Lock()
+
+    def configure(self, shape: tuple, dtype):
+        """
+        Set the format of the frames. The buffers are allocated again if the format changed.
+        :param shape:   Shape of the frames.
+        :param dtype:   Data type of the frames.
+        """
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        with self._lock:
+            if shape == self.shape and dtype == self.dtype:
+                return
+            self.shape = shape
+            self.dtype = dtype
+            self.buffers = []
+
+    def acquire(self, shape: tuple, dtype) -> np.ndarray:
+        """
+        Get a free buffer to write a new frame.
+        :param shape:   Shape of the frame.
+        :param dtype:   Data type of the frame.
+        :return:    Writable buffer (to pass to borrow once written).
+        """
+        self.configure(shape, dtype)
+        with self._lock:
+            for index in range(len(self.buffers)):
+                # No reference other than the pool (and the argument of getrefcount)
+                if sys.getrefcount(self.buffers[index]) <= 2:
+                    return self.buffers[index]
+            self.allocations += 1
+            buffer = np.empty(self.shape, dtype=self.dtype)
+            if len(self.buffers) < self.size:
+                self.buffers.append(buffer)
+            return buffer
+
+    @staticmethod
+    def borrow(buffer: np.ndarray) -> np.ndarray:
+        """
+        Get a read-only view of a buffer, for the consumers of the frame.
+        :param buffer:  Buffer of the pool.
+        :return:    Read-only numpy array.
+        """
+        view = buffer.view()
+        view.flags.writeable = False
+        return view
+
+    def get_stats(self) -> dict:
+        """
+        Get the state of the pool.
+        :return:    Dictionary : size, buffers (allocated), free, allocations.
+        """
+        with self._lock:
+            free = sum(1 for index in range(len(self.buffers))
+                       if sys.getrefcount(self.buffers[index]) <= 2)
+            return {'size': self.size, 'buffers': len(self.buffers), 'free': free,
+                    'allocations': self.allocations}
+
+
+class FrameStack:
+    """
+    Preallocated stack of frames (N, H, W) filled by a burst acquisition, with the timestamp of each frame.
+    The stack can be used as the frame pool of a camera (acquire / borrow) : the camera writes
+    each frame directly in the next slot of the stack, without intermediate buffer.
+    The stack is allocated at the first frame (shape and dtype of the frames), the number of frames
+    is reduced if the stack exceeds the maximum memory.
+    """
+
+    def __init__(self, count: int, max_memory: int = MAX_STACK_MEMORY):
+        """
+
+        :param count:       Number of frames of the stack.
+        :param max_memory:  Maximum size of the stack in bytes.
+        """
+        self.count = int(count)
+        self.max_memory = max_memory
+        self.frames = None
+        self.timestamps = np.zeros(self.count)          # Time of each frame (time.perf_counter), in s
+        self.device_timestamps = np.zeros(self.count, dtype=np.int64)   # Timestamps of the camera (ticks)
+        self.size = 0           # Number of frames in the stack
+        self.allocations = 0    # Frames not written in the stack by the camera (different format)
+
+    @property
+    def full(self) -> bool:
+        """True if the stack contains all its frames."""
+        return self.size >= self.count
+
+    def acquire(self, shape: tuple, dtype) -> np.ndarray:
+        """
+        Get the next slot of the stack to write a new frame.
+        :param shape:   Shape of the frame.
+        :param dtype:   Data type of the frame.
+        :return:    Writable buffer, a new array if the format differs from the stack.
+        """
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        if self.frames is None:
+            frame_size = max(1, int(np.prod(shape)) * dtype.itemsize)
+            if self.count * frame_size > self.max_memory:
+                self.count = max(1, self.max_memory // frame_size)
+                print(f'Stack of frames limited to {self.count} frames')
+            self.frames = np.empty((self.count, *shape), dtype=dtype)
+        if self.full or self.frames.shape[1:] != shape or self.frames.dtype != dtype:
+            self.allocations += 1
+            return np.empty(shape, dtype=dtype)
+        return self.frames[self.size]
+
+    borrow = staticmethod(FramePool.borrow)
+
+    def add(self, image: np.ndarray, timestamp: float = None, device_timestamp: int = 0) -> bool:
+        """
+        Add a frame to the stack. The frame is copied if it was not written in the next slot.
+        :param image:               New frame.
+        :param timestamp:           Time of the frame (time.perf_counter), now if None.
+        :param device_timestamp:    Timestamp of the camera.
+        :return:    True if the frame was added, False if the stack is full or the format differs.
+        """
+        if self.full:
+            return False
+        if self.frames is None:
+            self.acquire(image.shape, image.dtype)
+        slot = self.frames[self.size]
+        if slot.shape != image.shape or slot.dtype != image.dtype:
+            return False
+        if not np.shares_memory(slot, image):
+            np.copyto(slot, image)
+        self.timestamps[self.size] = time.perf_counter() if timestamp is None else timestamp
+        self.device_timestamps[self.size] = device_timestamp or 0
+        self.size += 1
+        return True
+
+    def get_frames(self) -> np.ndarray:
+        """
+        Get the frames of the stack.
+        :return:    Array (size, H, W...) of the acquired frames, None if no frame was acquired.
+        """
+        if self.frames is None:
+            return None
+        return self.frames[:self.size]
+
+    def get_intervals(self) -> np.ndarray:
+        """
+        Get the time between successive frames.
+        :return:    Array of the intervals in s.
+        """
+        return np.diff(self.timestamps[:self.size])
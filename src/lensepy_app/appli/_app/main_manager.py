@@ -1,10 +1,15 @@
-import sys, os, copy
+import os, copy
 import lensepy_app
-from pathlib import Path
+from PyQt6.QtCore import QTimer
 from lensepy import translate, load_dictionary
-from lensepy_app.appli._app.app_utils import XMLFileConfig, XMLFileModule
+from lensepy_app.appli._app.app_utils import XMLFileConfig, XMLFileModule, ModulesManifest
 from lensepy_app.appli._app.main_view import MainWindow
-import importlib
+from lensepy_app.appli._app.module_registry import ModuleRegistry
+from lensepy_app.appli._app.controller_pool import ControllerPool, DEFAULT_POOL_SIZE, DEFAULT_POOL_MEMORY
+from lensepy_app.appli._app.frame_store import FrameStore
+from lensepy_app.appli._app.variable_store import VariableStore
+from lensepy_app.appli._app.acquisition_service import AcquisitionService, DEFAULT_IDLE_TIME
+from lensepy_app.appli._app.shared_frames import DEFAULT_RING_SLOTS
 from lensepy_app.modules.default.default_controller import DefaultController
 
 
@@ -19,14 +24,20 @@ class MainManager:
         self.controller = None
         self.xml_app: XMLFileConfig = None     # XML file containing application parameters
         self.xml_module: XMLFileModule = None
-        self.list_modules = {}
+        self.manifest: ModulesManifest = None  # Resolved modules of the application
+        self.controller_pool: ControllerPool = None  # Suspended controllers (LRU)
+        self.list_modules: ModuleRegistry = None     # Modules, imported on demand
         self.list_modules_name = []      # List of the required modules
         self.actual_module = 'default'
         self.old_module = 'default'
         self.app_title = ''         # Title of the application
         self.app_logo = ''          # Logo (filepath) to display of the application
-        self.variables = {}         # Application variables
+        self.variables = VariableStore()    # Application variables (observable)
+        self.variables.definition_changed.connect(self.main_window.handle_variable_defined)
         self.req_variables = {}     # Required variables for each module (separated by ',')
+        self.variables_index = {}   # Modules requiring each variable
+        self.frame_store = FrameStore(self.variables)   # Latest image, shared by the modules
+        self.acquisition = AcquisitionService(self)     # Live acquisition, shared by the modules
 
     def set_xml_app(self, xml_app):
         """
@@ -36,6 +47,9 @@ class MainManager:
         """
         if os.path.exists(xml_app):
             self.xml_app = XMLFileConfig(xml_app)
+            self.manifest = ModulesManifest(self.xml_app)
+            self.init_controller_pool()
+            self.init_acquisition()
             self.app_logo = self.xml_app.get_parameter_xml('logo') or ''
             if './' not in self.app_logo:
                 root_path = os.path.dirname(lensepy_app.__file__)
@@ -44,6 +58,7 @@ class MainManager:
             if self.init_variables():
                 self.list_modules_name = self.xml_app.get_list_modules()
                 self.req_variables = self.get_module_required_variables()
+                self.variables_index = self.get_variables_index()
                 return self.init_main_menu()
             return False
         else:
@@ -52,13 +67,45 @@ class MainManager:
     def get_xml_contributors(self):
         return self.xml_app.get_contributors_by_type()
 
+    def init_controller_pool(self):
+        """
+        Initialize the pool of suspended controllers from the application XML file.
+        <controller_cache><size>3</size><memory>512</memory></controller_cache> (memory in MB)
+        """
+        pool_size = self.xml_app.get_sub_parameter('controller_cache', 'size')
+        pool_memory = self.xml_app.get_sub_parameter('controller_cache', 'memory')
+        pool_size = int(pool_size) if pool_size is not None else DEFAULT_POOL_SIZE
+        pool_memory = float(pool_memory) if pool_memory is not None else DEFAULT_POOL_MEMORY
+        if self.controller_pool is not None:
+            self.controller_pool.clear()
+        self.controller_pool = ControllerPool(pool_size, pool_memory)
+
+    def init_acquisition(self):
+        """
+        Initialize the acquisition service from the application XML file.
+        <acquisition>
+            <idle_time>10</idle_time>   (in s, 0 to close the camera at once)
+            <mode>process</mode>        (optional, acquisition and analysis in separate processes)
+            <slots>8</slots>            (optional, frames of the shared ring buffer)
+            <update_interval>100</update_interval>  (optional, in ms between two parameter updates)
+        </acquisition>
+        """
+        idle_time = self.xml_app.get_sub_parameter('acquisition', 'idle_time')
+        self.acquisition.set_idle_time(float(idle_time) if idle_time is not None else DEFAULT_IDLE_TIME)
+        mode = self.xml_app.get_sub_parameter('acquisition', 'mode') or 'thread'
+        slots = self.xml_app.get_sub_parameter('acquisition', 'slots')
+        self.acquisition.set_mode(mode.strip(), int(slots) if slots is not None else DEFAULT_RING_SLOTS)
+        update_interval = self.xml_app.get_sub_parameter('acquisition', 'update_interval')
+        if update_interval is not None:
+            self.acquisition.set_update_interval(int(update_interval))
+
     def init_variables(self) -> bool:
         """
         Initialize variables from application XML file.
         :return:
         """
         if self.xml_app is not None:
-            self.variables = self.xml_app.get_variables()
+            self.variables.reset(self.xml_app.get_variables(), self.xml_app.get_variables_types())
             return True
         return False
 
@@ -80,51 +127,85 @@ class MainManager:
         self.main_window.update_menu()
 
     def init_controller(self):
-        package_root = os.path.dirname(lensepy_app.__file__)
         if self.actual_module == 'default':
             lensepy_path = (os.path.dirname(lensepy_app.__file__))
             xml_path = lensepy_path +'/modules/default/default.xml'
             self.xml_module = XMLFileModule(xml_path)
             self.controller = DefaultController(self)
         else:
-            # Delete old controller
-            if self.controller is not None:
-                if hasattr(self.controller, "cleanup"):
-                    self.controller.cleanup()
-            # Find controller for actual module
-            module_path = self.xml_app.get_module_path(self.actual_module)
-            if module_path.startswith('./'):
-                path_name = str(module_path)
-                sys.path.append(path_name)
-                module_path = ''
-            else:
-                module_path += '.'
-            module_path += f'{self.actual_module}'
-            module = importlib.import_module(module_path, package=__package__)
-            module_real_path = os.path.dirname(module.__file__)
-            xml_path = module_real_path + f'/{self.actual_module}.xml'
-            self.xml_module = XMLFileModule(xml_path)
-            controller_name = self.xml_module.get_parameter_xml('controller')
-            controller_class = getattr(self.list_modules[self.actual_module], controller_name)
+            # Suspend (or delete) old controller
+            self.release_controller()
+            # Find controller for actual module (paths resolved in the manifest)
+            if self.list_modules is None:
+                self.init_list_modules()
+            module_dir = self.list_modules.get_module_dir(self.actual_module)
+            self.xml_module = XMLFileModule(f'{module_dir}/{self.actual_module}.xml')
             def_lang = self.parent.config['default_lang']
-            load_dictionary(f'{module_real_path}/lang/{def_lang}.txt')
+            load_dictionary(f'{module_dir}/lang/{def_lang}.txt')
+            # Resume a suspended controller if available
+            controller = self.controller_pool.take(self.actual_module) if self.controller_pool else None
+            if controller is not None:
+                self.controller = controller
+                self.controller.resume()
+                self.old_module = copy.copy(self.actual_module)
+                return
+            controller_class = self.list_modules.get_controller_class(self.actual_module)
             self.controller = controller_class(self)
-        self.controller.init_view()
+        profiler = getattr(self.parent, 'profiler', None)
+        if profiler is not None:
+            with profiler.first_view(f'init_view ({self.actual_module})'):
+                self.controller.init_view()
+        else:
+            self.controller.init_view()
         self.old_module = copy.copy(self.actual_module)
 
+    def release_controller(self):
+        """
+        Release the actual controller.
+        A cacheable controller is suspended and stored in the controllers pool,
+        other controllers are cleaned up (their widgets are deleted by the next view).
+        """
+        if self.controller is None:
+            return
+        cacheable = getattr(self.controller, 'cacheable', False)
+        if cacheable and self.controller_pool is not None and self.controller_pool.is_enabled():
+            self.controller.suspend()
+            self.controller_pool.put(self.old_module, self.controller)
+        elif hasattr(self.controller, "cleanup"):
+            self.controller.cleanup()
+
     def init_list_modules(self):
         """
         Get a list of modules to include in the application.
+        Modules are not imported here : a module is imported when it is selected
+        in the menu, or by the pre-warming (see prewarm_modules).
         :return:
         """
-        # Importation of modules
-        for module in self.list_modules_name:
-            module_path = self.xml_app.get_module_path(module)
-            if './' in module_path:
-                module_path_n = module_path.lstrip("./").replace("/", ".")
-                self.list_modules[module] = importlib.import_module(f'{module_path_n}.{module}')
-            else:
-                self.list_modules[module] = importlib.import_module(f'{module_path}.{module}')
+        self.list_modules = ModuleRegistry(self.manifest, self.list_modules_name)
+
+    def prewarm_modules(self, report: bool = True):
+        """
+        Import the modules that are not yet imported, if enabled in the application XML file
+        (<prewarm>True</prewarm>). The modules are imported one by one in the GUI thread,
+        when no other event is waiting.
+        :param report:  True to print the import report (time or error of each module) at the end.
+        """
+        prewarm = self.xml_app.get_parameter_xml('prewarm') if self.xml_app is not None else None
+        if prewarm is None or prewarm.strip() != 'True':
+            return
+        if self.list_modules is None:
+            self.init_list_modules()
+        QTimer.singleShot(0, lambda: self._prewarm_next(report))
+
+    def _prewarm_next(self, report: bool):
+        """
+        Import the next module of the pre-warming (see prewarm_modules).
+        :param report:  True to print the import report at the end.
+        """
+        if self.list_modules.prewarm_next():
+            QTimer.singleShot(0, lambda: self._prewarm_next(report))
+        elif report:
+            print(self.list_modules.get_import_report())
 
     def get_module_required_variables(self):
         """
@@ -133,43 +214,32 @@ class MainManager:
         """
         var_list = {}
         for module in self.list_modules_name:
-            module_path = self.xml_app.get_module_path(module)
-            if './' in module_path:
-                # external module
-                module_path_n = module_path.lstrip("./").replace("/", ".")
-                xml_path = f'{module_path}/{module}/{module}.xml'
-            else:
-                # lensepy module
-                module_path = f'{module_path}.{module}'
-                module_i = importlib.import_module(module_path)
-                xml_path = f'{os.path.dirname(module_i.__file__)}/{module}.xml'
-            xml_module = XMLFileModule(xml_path)
-            var_module_list = xml_module.get_parameter_xml('req_var')
-            var_list[module] = var_module_list
+            var_list[module] = self.manifest.get_parameter(module, 'req_var')
         return var_list
 
+    def get_variables_index(self):
+        """
+        Collect the modules depending on each required variable.
+        :return:    Dictionary of modules names, by variable name.
+        """
+        index = {}
+        for module, var_module_list in self.req_variables.items():
+            if var_module_list is None:
+                continue
+            for var_m in var_module_list.split(','):
+                index.setdefault(var_m, []).append(module)
+        return index
+
     def check_module_requirements(self, module):
         """
         Check if the module parameter 'requirements' is set.
         :param module:      Name of the module.
         :return:            True if module parameter 'requirements' is set, else False.
         """
-        module_path = self.xml_app.get_module_path(module)
-        if './' in module_path:
-            module_path_n = module_path.lstrip("./").replace("/", ".")
-            xml_path = f'{module_path}/{module}/{module}.xml'
-            xml_module = XMLFileModule(xml_path)
-            req_module = xml_module.get_parameter_xml('requirements')
-            return req_module is None
-        elif module_path != '':
-            # lensepy module
-            module_path = f'{module_path}.{module}'
-            module_i = importlib.import_module(module_path)
-            xml_path = f'{os.path.dirname(module_i.__file__)}/{module}.xml'
-            xml_module = XMLFileModule(xml_path)
-            req_module = xml_module.get_parameter_xml('requirements')
-            return req_module is None
-        return False
+        info = self.manifest.get_module(module)
+        if info is None or info['xml_path'] is None:
+            return False
+        return info['module_requirements'] is None
 
     def get_variable(self, name):
         """
@@ -7,6 +7,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QPixmap
 from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6 import sip
 from lensepy_app.appli._app.app_utils import XMLFileModule
 
 from typing import TYPE_CHECKING
@@ -89,25 +90,52 @@ class MainWindow(QMainWindow):
         for k, element in enumerate(self.menu_button_list):
             b_title = translate(f'{self.menu_button_name_list[k]}_menu')
             element.setText(b_title)
-            if element == self.actual_button:
-                element.setStyleSheet(actived_button)
+            self.update_menu_button(k)
+            self.menu_layout.addWidget(element)
+
+    def update_menu_entries(self, modules: list):
+        """
+        Update only the menu buttons of the specified modules.
+        :param modules:     List of modules names.
+        """
+        for k, module_name in enumerate(self.menu_button_name_list):
+            if module_name in modules and k < len(self.menu_button_list):
+                self.update_menu_button(k)
+
+    def update_menu_button(self, k: int):
+        """
+        Update the state of a button of the main menu.
+        :param k:   Index of the button.
+        """
+        element = self.menu_button_list[k]
+        if element == self.actual_button:
+            element.setStyleSheet(actived_button)
+            element.setEnabled(True)
+        else:
+            # CHECK IF REQUIRED VARIABLES ARE NOT NONE then UPDATE Menu
+            module_name = self.menu_button_name_list[k]
+            if self.check_variables(module_name):
+                element.setStyleSheet(unactived_button)
                 element.setEnabled(True)
             else:
-                # CHECK IF REQUIRED VARIABLES ARE NOT NONE then UPDATE Menu
-                module_name = self.menu_button_name_list[self.menu_button_list.index(element)]
-                if self.check_variables(module_name):
+                # Check if the module has requirements (other module)
+                if self.parent.check_module_requirements(module_name):
                     element.setStyleSheet(unactived_button)
                     element.setEnabled(True)
                 else:
-                    # Check if the module has requirements (other module)
-                    if self.parent.check_module_requirements(module_name):
-                        element.setStyleSheet(unactived_button)
-                        element.setEnabled(True)
-                    else:
-                        element.setStyleSheet(disabled_button)
-                        element.setEnabled(False)
-            self.menu_layout.addWidget(element)
+                    element.setStyleSheet(disabled_button)
+                    element.setEnabled(False)
 
+    def handle_variable_defined(self, name: str, defined: bool):
+        """
+        Action performed when a variable is set or reset to None.
+        Only the buttons of the modules requiring this variable are updated.
+        :param name:        Name of the variable.
+        :param defined:     True if the variable is not None.
+        """
+        modules = self.parent.variables_index.get(name)
+        if modules:
+            self.update_menu_entries(modules)
 
     def check_variables(self, module) -> bool:
         """Check required variables for the specified module from the module XML file.
@@ -133,6 +161,32 @@ class MainWindow(QMainWindow):
         self.menu_changed.emit(self.menu_button_name_list[indice])
         self.update_menu()
 
+    def set_containers(self, top_left, top_right, bot_left, bot_right, retained: list = None):
+        """
+        Replace the four containers of the main window.
+        Old containers are deleted, except the retained ones (widgets of suspended controllers),
+        which are only removed from the layout.
+        :param retained:    List of widgets to keep.
+        """
+        retained = retained or []
+        new_containers = [top_left, top_right, bot_left, bot_right]
+        for container in [self.top_left_container, self.top_right_container,
+                          self.bot_left_container, self.bot_right_container]:
+            if container is None or sip.isdeleted(container):
+                continue
+            if any(container is widget for widget in new_containers):
+                continue
+            if any(container is widget for widget in retained):
+                self.right_layout.removeWidget(container)
+                container.hide()
+                container.setParent(None)
+            else:
+                container.deleteLater()
+        self.top_left_container = top_left
+        self.top_right_container = top_right
+        self.bot_left_container = bot_left
+        self.bot_right_container = bot_right
+
     def update_containers(self):
         """Ajoute les widgets aux positions correctes du layout"""
         if self.top_left_container:
@@ -170,6 +224,9 @@ class MainWindow(QMainWindow):
             print('Controller closed')
             if hasattr(self.parent.controller, "cleanup"):
                 self.parent.controller.cleanup()
+        if self.parent.controller_pool is not None:
+            self.parent.controller_pool.clear()
+        self.parent.acquisition.stop()
         print('End of application')
         event.accept()  # ou event.ignore()
 
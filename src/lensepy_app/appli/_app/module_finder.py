@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+from importlib.abc import MetaPathFinder
+from importlib.machinery import PathFinder
+from importlib.metadata import entry_points
+
+ENTRY_POINTS_GROUP = 'lensepy_app.modules'   # Entry points of the modules of other packages
+
+_entry_points = None
+
+
+class ExternalModulesFinder(MetaPathFinder):
+    """
+    Import finder of the external modules (<location>./path</location>).
+    The root package of each location is found in its directory,
+    sys.path is not modified.
+    """
+
+    def __init__(self):
+        self.roots = {}     # Directory containing each root package, by name
+        self._lock = threading.Lock()
+
+    def add_root(self, package: str, directory: str):
+        """
+        Add a root package of external modules.
+        :param package:     Name of the root package.
+        :param directory:   Directory containing the package.
+        """
+        with self._lock:
+            self.roots.setdefault(package, directory)
+
+    def find_spec(self, fullname, path=None, target=None):
+        directory = self.roots.get(fullname)
+        if directory is None:
+            return None
+        return PathFinder.find_spec(fullname, [directory])
+
+
+_finder = ExternalModulesFinder()
+
+
+def get_finder() -> ExternalModulesFinder:
+    """
+    Get the finder of the external modules, installed in sys.meta_path the first time.
+    :return:    Finder of the external modules.
+    """
+    if _finder not in sys.meta_path:
+        sys.meta_path.append(_finder)
+    return _finder
+
+
+def register_location(location: str, modules: list = None, root_dir: str = None) -> str:
+    """
+    Register the root package of an external location (./path/to/modules).
+    The modules of the location can also be imported by their name only
+    (as when the location was appended to sys.path).
+    :param location:    Location of the modules, relative to the root directory.
+    :param modules:     Names of the modules of the location.
+    :param root_dir:    Directory of the location. Default : current directory.
+    :return:    Import path of the location (path.to.modules).
+    """
+    root_dir = os.path.abspath(root_dir or '.')
+    import_path = location.lstrip("./").replace("/", ".")
+    root_package = import_path.split('.')[0]
+    finder = get_finder()
+    if root_package != '':
+        finder.add_root(root_package, root_dir)
+    for module in modules or []:
+        finder.add_root(module, os.path.normpath(os.path.join(root_dir, location)))
+    return import_path
+
+
+def get_entry_point_modules() -> dict:
+    """
+    Get the modules declared by the installed packages, in the lensepy_app.modules entry points group.
+    [project.entry-points."lensepy_app.modules"]
+    module_name = "package.path.module_name"
+    The entry points are read once.
+    :return:    Dictionary of import paths, by module name.
+    """
+    global _entry_points
+    if _entry_points is None:
+        try:
+            _entry_points = {ep.name: ep.value for ep in entry_points(group=ENTRY_POINTS_GROUP)}
+        except Exception as e:
+            print(f'Entry points error: {e}')
+            _entry_points = {}
+    return _entry_points
@@ -0,0 +1,116 @@
+import os
+import time
+import importlib
+from lensepy_app.appli._app.app_utils import ModulesManifest
+
+
+class ModuleRegistry:
+    """
+    Lazy registry of the modules of an application.
+    A module is imported the first time it is required (menu selection),
+    the other ones can be imported one by one when the application is idle (pre-warming, see prewarm_next).
+    Modules are imported in the GUI thread : they can create Qt objects at import.
+    """
+
+    def __init__(self, manifest: ModulesManifest, modules_name: list):
+        """
+
+        :param manifest:        Resolved modules of the application.
+        :param modules_name:    List of the modules of the application.
+        """
+        self.manifest = manifest
+        self.modules_name = list(modules_name)
+        self.modules = {}           # Imported modules, by name
+        self.import_times = {}      # Import time (in seconds) of each module
+        self.import_errors = {}     # Exception raised during the import of a module
+        self.controllers = {}       # Controller classes, by module name
+
+    def __contains__(self, module: str) -> bool:
+        return module in self.modules_name
+
+    def __getitem__(self, module: str):
+        return self.get_module(module)
+
+    def is_imported(self, module: str) -> bool:
+        """
+        Check if a module was already imported.
+        :param module:  Name of the module.
+        :return:    True if the module is imported.
+        """
+        return module in self.modules
+
+    def get_module(self, module: str):
+        """
+        Get a module. The module is imported if necessary.
+        :param module:  Name of the module.
+        :return:    Python module.
+        """
+        if module in self.modules:
+            return self.modules[module]
+        import_path = self.manifest.get_parameter(module, 'import_path')
+        if import_path is None:
+            raise KeyError(f'Module {module} is not in the application')
+        t_start = time.perf_counter()
+        try:
+            python_module = importlib.import_module(import_path)
+        except Exception as e:
+            self.import_errors[module] = e
+            raise
+        self.import_errors.pop(module, None)
+        self.modules[module] = python_module
+        self.import_times[module] = time.perf_counter() - t_start
+        return python_module
+
+    def get_controller_class(self, module: str):
+        """
+        Get the controller class of a module (controller parameter of the module XML file).
+        :param module:  Name of the module.
+        :return:    Controller class.
+        """
+        if module not in self.controllers:
+            controller_name = self.manifest.get_parameter(module, 'controller')
+            self.controllers[module] = getattr(self.get_module(module), controller_name)
+        return self.controllers[module]
+
+    def get_module_dir(self, module: str) -> str:
+        """
+        Get the directory of a module (containing its XML file and its lang directory).
+        :param module:  Name of the module.
+        :return:    Path of the directory.
+        """
+        module_dir = self.manifest.get_parameter(module, 'module_dir')
+        if module_dir is None:
+            module_dir = os.path.dirname(self.get_module(module).__file__)
+        return module_dir
+
+    def prewarm_next(self) -> bool:
+        """
+        Import the next module that is not yet imported (pre-warming, one module per call).
+        An import error is stored and reported by get_import_report.
+        :return:    True if other modules remain to import.
+        """
+        pending = [module for module in self.modules_name
+                   if module not in self.modules and module not in self.import_errors]
+        if pending:
+            try:
+                self.get_module(pending[0])
+            except Exception:
+                pass    # Stored in import_errors
+        return len(pending) > 1
+
+    def get_import_report(self) -> str:
+        """
+        Get a report of the import time of each module.
+        :return:    Text of the report.
+        """
+        lines = ['Modules import time:']
+        for module in self.modules_name:
+            if module in self.import_errors:
+                lines.append(f' - {module}: error ({self.import_errors[module]})')
+            elif module in self.import_times:
+                lines.append(f' - {module}: {self.import_times[module] * 1000:.1f} ms')
+            else:
+                lines.append(f' - {module}: not imported')
+        total = sum(self.import_times.values())
+        lines.append(f' Total: {total * 1000:.1f} ms')
+        return '\n'.join(lines)
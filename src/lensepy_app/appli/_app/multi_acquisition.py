@@ -0,0 +1,267 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+from PyQt6 import sip
+from PyQt6.QtCore import pyqtSignal, QObject, QThread
+from lensepy_app.appli._app.template_controller import FrameMailbox
+from lensepy_app.appli._app.frame_store import FramePool
+
+SYNC_MODES = ['timestamp',  # Timestamp of the cameras (shared time base : PTP, synchronized free-run...)
+              'host',       # Time of reception of the frames by the computer
+              'trigger']    # Trigger ID of the frames (hardware or software trigger, see set_trigger_mode)
+DEFAULT_SYNC_TOLERANCE = 2_000_000  # Maximum difference (in ns) between the timestamps of a pair
+SYNC_QUEUE_SIZE = 16        # Maximum number of frames of a camera waiting for the other cameras
+
+
+class FrameSynchronizer:
+    """
+    Pairing of the frames of several cameras by a key : timestamp (ns) or trigger ID.
+    The frames of each camera are queued in the order of acquisition. A set is complete when the
+    oldest frame of each camera has a key within the tolerance of the others. Frames older than
+    the newest oldest frame (minus the tolerance) can not be paired anymore : they are dropped.
+    The put method is called by the acquisition threads of the cameras.
+    """
+
+    def __init__(self, names: list, tolerance: float = DEFAULT_SYNC_TOLERANCE, queue_size: int = SYNC_QUEUE_SIZE):
+        """
+
+        :param names:       Names of the cameras.
+        :param tolerance:   Maximum difference between the keys of the frames of a set (0 for trigger IDs).
+        :param queue_size:  Maximum number of frames of a camera waiting for the other cameras.
+        """
+        self.names = list(names)
+        self.tolerance = tolerance
+        self.queues = {name: deque(maxlen=queue_size) for name in self.names}
+        self.pairs_count = 0        # Complete sets
+        self.dropped_count = 0      # Frames without a matching frame of the other cameras
+        self._lock = threading.Lock()
+
+    def put(self, name: str, frame: np.ndarray, key) -> list:
+        """
+        Add a frame of a camera.
+        :param name:    Name of the camera.
+        :param frame:   New frame.
+        :param key:     Timestamp or trigger ID of the frame.
+        :return:    List of the sets completed by the frame (oldest first), see FrameSynchronizer.match.
+        """
+        with self._lock:
+            frames = self.queues[name]
+            if len(frames) == frames.maxlen:
+                # Oldest frame removed by the deque
+                self.dropped_count += 1
+            frames.append((key, frame))
+            return self.match()
+
+    def match(self) -> list:
+        """
+        Extract the complete sets of the queued frames (called with the lock held).
+        :return:    List of dictionaries : frames ({camera: frame}), keys ({camera: key}),
+            skew (difference between the keys of the set).
+        """
+        pairs = []
+        while all(self.queues.values()):
+            keys = {name: frames[0][0] for name, frames in self.queues.items()}
+            newest = max(keys.values())
+            skew = newest - min(keys.values())
+            if skew <= self.tolerance:
+                pairs.append({'frames': {name: frames.popleft()[1] for name, frames in self.queues.items()},
+                              'keys': keys, 'skew': skew})
+                self.pairs_count += 1
+                continue
+            for frames in self.queues.values():
+                while frames and frames[0][0] < newest - self.tolerance:
+                    frames.popleft()
+                    self.dropped_count += 1
+        return pairs
+
+    def clear(self):
+        """Remove the queued frames."""
+        with self._lock:
+            for frames in self.queues.values():
+                frames.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Get the counters of the synchronization.
+        :return:    Dictionary : pairs (complete sets), dropped (frames not paired), queued (frames of each camera).
+        """
+        with self._lock:
+            return {'pairs': self.pairs_count, 'dropped': self.dropped_count,
+                    'queued': {name: len(frames) for name, frames in self.queues.items()}}
+
+
+class CameraGrabber(QObject):
+    """
+    Worker of the acquisition of one camera of a multi-camera acquisition (one thread per camera).
+    Each frame is put in the mailbox of the camera, and in the synchronizer with its key.
+    frame_available (or pair_available) is emitted only when the mailbox was empty.
+    """
+    frame_available = pyqtSignal(str)
+    pair_available = pyqtSignal()
+    finished = pyqtSignal()
+
+    def __init__(self, name: str, camera, mailbox: FrameMailbox, sync: str = 'timestamp',
+                 synchronizer: FrameSynchronizer = None, pair_mailbox: FrameMailbox = None):
+        """
+
+        :param name:            Name of the camera.
+        :param camera:          Camera (not used by another thread).
+        :param mailbox:         Mailbox of the frames of the camera.
+        :param sync:            Key of the frames (see SYNC_MODES).
+        :param synchronizer:    Synchronizer of the cameras, None without synchronization.
+        :param pair_mailbox:    Mailbox of the synchronized sets.
+        """
+        super().__init__()
+        self.name = name
+        self.camera = camera
+        self.mailbox = mailbox
+        self.sync = sync
+        self.synchronizer = synchronizer
+        self.pair_mailbox = pair_mailbox
+        self._running = False
+
+    def run(self):
+        camera = self.camera
+        self._running = True
+        camera.camera_acquiring = True
+        blocking = getattr(camera, 'get_image_blocks', False)
+
+        while self._running:
+            image = camera.get_image()
+            t_host = time.perf_counter_ns()
+            if image is not None and not sip.isdeleted(self):
+                if self.mailbox.put(image):
+                    self.frame_available.emit(self.name)
+                key = self._get_key(t_host)
+                if self.synchronizer is not None and key is not None:
+                    for pair in self.synchronizer.put(self.name, image, key):
+                        if self.pair_mailbox.put(pair):
+                            self.pair_available.emit()
+            if not blocking or image is None:
+                time.sleep(0.01)
+
+        camera.camera_acquiring = False
+        self.finished.emit()
+
+    def _get_key(self, t_host: int):
+        """
+        Key of the last frame of the camera, for the synchronization.
+        :param t_host:  Time of reception of the frame (ns).
+        :return:    Timestamp (the time of reception if the camera gives no timestamp),
+            trigger ID (None in free-run).
+        """
+        if self.sync == 'trigger':
+            return getattr(self.camera, 'last_event_id', None)
+        if self.sync == 'timestamp':
+            return getattr(self.camera, 'last_timestamp', 0) or t_host
+        return t_host
+
+    def stop(self):
+        self._running = False
+
+
+class MultiCameraAcquisition(QObject):
+    """
+    Live acquisition of several cameras, each one in its own thread, with the synchronization of their frames.
+    frame_ready sends the latest frame of a camera, pair_ready the latest complete set of frames
+    (one frame per camera, paired by timestamp or trigger ID - see FrameSynchronizer).
+    As for the single camera acquisition, frames acquired while the GUI is busy are dropped.
+    """
+
+    frame_ready = pyqtSignal(str, np.ndarray)
+    pair_ready = pyqtSignal(dict)
+
+    def __init__(self):
+        super().__init__(None)
+        self.cameras = {}
+        self.workers = {}       # (thread, CameraGrabber) of each camera
+        self.mailboxes = {}     # Latest frame of each camera
+        self.pools = {}         # Buffers of the frames of each camera (cameras with a frame_pool attribute)
+        self.pair_mailbox = FrameMailbox()  # Latest complete set
+        self.synchronizer = None
+        self.sync = None
+
+    def is_running(self) -> bool:
+        """Return True if the acquisition is running."""
+        return bool(self.workers)
+
+    def start(self, cameras: dict, sync: str = 'timestamp', tolerance: float = DEFAULT_SYNC_TOLERANCE) -> bool:
+        """
+        Start the acquisition of the cameras.
+        :param cameras:     Dictionary of the cameras {name: camera}.
+        :param sync:        Key of the pairing of the frames (see SYNC_MODES), None to not pair the frames.
+        :param tolerance:   Maximum difference (in ns) between the timestamps of a pair (timestamp and host modes).
+        :return:    True if the acquisition was started.
+        """
+        if sync is not None and sync not in SYNC_MODES:
+            print(f'Unknown synchronization mode {sync}')
+            return False
+        self.stop()
+        self.cameras = dict(cameras)
+        self.sync = sync
+        self.synchronizer = None
+        if sync is not None and len(self.cameras) > 1:
+            self.synchronizer = FrameSynchronizer(self.cameras, 0 if sync == 'trigger' else tolerance)
+        self.mailboxes = {}
+        self.pair_mailbox = FrameMailbox()
+        for name, camera in self.cameras.items():
+            self.mailboxes[name] = FrameMailbox()
+            if hasattr(camera, 'frame_pool'):
+                # Frames kept by the synchronizer
+                self.pools.setdefault(name, FramePool(SYNC_QUEUE_SIZE + 4))
+                camera.frame_pool = self.pools[name]
+            thread = QThread()
+            worker = CameraGrabber(name, camera, self.mailboxes[name], sync or 'host',
+                                   self.synchronizer, self.pair_mailbox)
+            worker.moveToThread(thread)
+
+            thread.started.connect(worker.run)
+            worker.frame_available.connect(self._deliver_frame)
+            worker.pair_available.connect(self._deliver_pair)
+            worker.finished.connect(thread.quit)
+            worker.finished.connect(worker.deleteLater)
+            worker.finished.connect(thread.deleteLater)
+            self.workers[name] = (thread, worker)
+            thread.start()
+        return True
+
+    def stop(self):
+        """Stop the acquisition of all the cameras (the cameras are not closed)."""
+        for thread, worker in self.workers.values():
+            worker.stop()
+        for thread, worker in self.workers.values():
+            thread.quit()
+            thread.wait()
+        self.workers = {}
+        for mailbox in self.mailboxes.values():
+            mailbox.take()
+        self.pair_mailbox.take()
+        if self.synchronizer is not None:
+            self.synchronizer.clear()
+
+    def get_frame_stats(self) -> dict:
+        """
+        Get the counters of the frames of the acquisition.
+        :return:    Dictionary : cameras ({camera: counters of the frames, see FrameMailbox.get_stats}),
+            pairs (counters of the delivered sets), sync (counters of the synchronization, None without pairing).
+        """
+        return {'cameras': {name: mailbox.get_stats() for name, mailbox in self.mailboxes.items()},
+                'pairs': self.pair_mailbox.get_stats(),
+                'sync': None if self.synchronizer is None else self.synchronizer.get_stats()}
+
+    def _deliver_frame(self, name: str):
+        """
+        Send the latest frame of a camera (GUI thread).
+        :param name:    Name of the camera.
+        """
+        mailbox = self.mailboxes.get(name)
+        image = None if mailbox is None else mailbox.take()
+        if image is not None:
+            self.frame_ready.emit(name, image)
+
+    def _deliver_pair(self):
+        """Send the latest complete set of frames (GUI thread)."""
+        pair = self.pair_mailbox.take()
+        if pair is not None:
+            self.pair_ready.emit(pair)
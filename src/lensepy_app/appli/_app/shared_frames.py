@@ -0,0 +1,123 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+DEFAULT_RING_SLOTS = 8      # Number of frames in a ring buffer
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach an existing shared memory block, without tracking it in this process
+    (the block is unlinked by the process that created it only).
+    Before Python 3.13, attached blocks are registered in the resource tracker : the processes
+    of the acquisition share the tracker of the GUI process, so the registration has no effect.
+    :param name:    Name of the shared memory block.
+    :return:    SharedMemory object.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameRing:
+    """
+    Ring buffer of frames in a shared memory block, written by one process (acquisition)
+    and read by others (GUI, analysis workers) without copying the frames through pipes.
+    All the frames of a ring have the same shape and dtype.
+    The sequence number of each slot is stored in a header : it is set to -1 while
+    the slot is written, so a reader detects a frame overwritten during its copy.
+    """
+
+    def __init__(self, shape: tuple, dtype, slots: int = DEFAULT_RING_SLOTS, name: str = None):
+        """
+
+        :param shape:   Shape of the frames.
+        :param dtype:   Data type of the frames.
+        :param slots:   Number of frames in the ring.
+        :param name:    Name of an existing ring (reader). None to create a new ring (writer).
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = int(slots)
+        self.frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        header_size = self.slots * 8
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_size + self.slots * self.frame_size)
+        else:
+            self.shm = attach_shared_memory(name)
+        self.header = np.ndarray((self.slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((self.slots, *self.shape), dtype=self.dtype,
+                                 buffer=self.shm.buf, offset=header_size)
+        if self.owner:
+            self.header[:] = -1
+        self.sequence = 0
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self.shm.name
+
+    def get_info(self) -> tuple:
+        """
+        Get the information required to attach the ring in another process.
+        :return:    (name, shape, dtype string, slots).
+        """
+        return self.name, self.shape, self.dtype.str, self.slots
+
+    @classmethod
+    def attach(cls, info: tuple):
+        """
+        Attach a ring created in another process.
+        :param info:    Information of the ring (see get_info).
+        :return:    SharedFrameRing object.
+        """
+        name, shape, dtype, slots = info
+        return cls(shape, dtype, slots, name=name)
+
+    def accepts(self, image: np.ndarray) -> bool:
+        """Return True if the image has the shape and dtype of the ring."""
+        return image.shape == self.shape and image.dtype == self.dtype
+
+    def write(self, image: np.ndarray) -> tuple:
+        """
+        Write a frame in the next slot of the ring.
+        :param image:   Frame to write (same shape and dtype as the ring).
+        :return:    (slot, sequence number) of the frame.
+        """
+        self.sequence += 1
+        slot = self.sequence % self.slots
+        self.header[slot] = -1
+        self.frames[slot] = image
+        self.header[slot] = self.sequence
+        return slot, self.sequence
+
+    def read(self, slot: int, sequence: int, out: np.ndarray = None):
+        """
+        Copy a frame of the ring.
+        :param slot:        Slot of the frame.
+        :param sequence:    Sequence number of the frame.
+        :param out:         Array to copy the frame into (same shape and dtype), None to allocate a new array.
+        :return:    Copy of the frame, None if the frame was overwritten.
+        """
+        if self.header[slot] != sequence:
+            return None
+        if out is None:
+            image = self.frames[slot].copy()
+        else:
+            np.copyto(out, self.frames[slot])
+            image = out
+        if self.header[slot] != sequence:
+            return None
+        return image
+
+    def close(self):
+        """Release the ring (the shared memory block is removed by its creator)."""
+        self.header = None
+        self.frames = None
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except (BufferError, FileNotFoundError):
+            pass
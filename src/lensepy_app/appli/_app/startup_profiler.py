@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import builtins
+import threading
+from contextlib import contextmanager
+from PyQt6.QtCore import QObject, QEvent
+
+PROFILE_OPTION = '--profile-startup'
+# Third-party packages whose first import is recorded
+HEAVY_MODULES = ['numpy', 'cv2', 'pypylon', 'nidaqmx', 'skimage', 'scipy', 'matplotlib',
+                 'pyqtgraph', 'pyqtgraph.opengl', 'colour', 'serial', 'ids_peak',
+                 'PyQt6.QtWebEngineWidgets', 'PyQt6.QtOpenGLWidgets']
+
+
+def get_profile_option(argv: list):
+    """
+    Extract the startup profiling option from a list of arguments.
+    The option is removed from the list (so applications parsing sys.argv ignore it).
+    --profile-startup or --profile-startup=output_file.json
+    :param argv:    List of arguments (modified).
+    :return:    Output file path ('' for the default file), None if the option is not set.
+    """
+    for arg in list(argv):
+        if arg == PROFILE_OPTION:
+            argv.remove(arg)
+            return ''
+        elif arg.startswith(f'{PROFILE_OPTION}='):
+            argv.remove(arg)
+            return arg.split('=', 1)[1]
+    return None
+
+
+class StartupProfiler:
+    """
+    Timeline of the startup of an application : phases and heavy imports.
+    The timeline is saved as a Chrome trace file (chrome://tracing or https://ui.perfetto.dev).
+    All the methods do nothing if the profiler is not enabled.
+    """
+
+    def __init__(self, enabled: bool = False, output_file: str = ''):
+        """
+
+        :param enabled:     True to record the startup timeline.
+        :param output_file: Path of the JSON file to write.
+        """
+        self.enabled = enabled
+        self.output_file = output_file
+        self.events = []
+        self.t_origin = time.perf_counter()
+        self.preloaded = []         # Heavy modules imported before the profiler started
+        self._import_func = None
+        self._lock = threading.Lock()
+        self._first_view = True
+
+    def start(self):
+        """Start recording : heavy imports are timed from now."""
+        if not self.enabled:
+            return
+        self.t_origin = time.perf_counter()
+        self.preloaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        self._import_func = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def stop(self):
+        """Stop recording heavy imports."""
+        if self._import_func is not None:
+            builtins.__import__ = self._import_func
+            self._import_func = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        import_func = self._import_func or builtins.__import__
+        if level == 0:
+            module = name if name in HEAVY_MODULES else name.partition('.')[0]
+            if module in HEAVY_MODULES and module not in sys.modules:
+                t_start = time.perf_counter()
+                try:
+                    return import_func(name, globals, locals, fromlist, level)
+                finally:
+                    self.add_event(f'import {module}', t_start, time.perf_counter(), 'import')
+        return import_func(name, globals, locals, fromlist, level)
+
+    def add_event(self, name: str, t_start: float, t_end: float, category: str = 'phase'):
+        """
+        Add a complete event to the timeline.
+        :param name:        Name of the event.
+        :param t_start:     Start time (time.perf_counter).
+        :param t_end:       End time (time.perf_counter).
+        :param category:    Category of the event ('phase', 'import'...).
+        """
+        if not self.enabled:
+            return
+        event = {'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(),
+                 'tid': threading.get_ident(),
+                 'ts': round((t_start - self.t_origin) * 1e6, 1),
+                 'dur': round((t_end - t_start) * 1e6, 1)}
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time a phase of the startup.
+        :param name:    Name of the phase.
+        """
+        if not self.enabled:
+            yield
+            return
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_event(name, t_start, time.perf_counter())
+
+    @contextmanager
+    def first_view(self, name: str):
+        """
+        Time the first view initialization of a controller only.
+        :param name:    Name of the phase.
+        """
+        if not self.enabled or not self._first_view:
+            yield
+            return
+        self._first_view = False
+        with self.phase(name):
+            yield
+
+    def mark(self, name: str):
+        """
+        Add an instant event to the timeline.
+        :param name:    Name of the event.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.events.append({'name': name, 'cat': 'mark', 'ph': 'i', 's': 'g',
+                                'pid': os.getpid(), 'tid': threading.get_ident(),
+                                'ts': round((time.perf_counter() - self.t_origin) * 1e6, 1)})
+
+    def save(self, output_file: str = ''):
+        """
+        Write the timeline in a Chrome trace JSON file.
+        :param output_file: Path of the file. Default : startup_profile_<time>.json.
+        :return:    Path of the written file.
+        """
+        if not self.enabled:
+            return None
+        output_file = output_file or self.output_file
+        if output_file == '':
+            output_file = f'startup_profile_{time.strftime("%Y%m%d_%H%M%S")}.json'
+            self.output_file = output_file
+        with self._lock:
+            data = {'traceEvents': list(self.events), 'displayTimeUnit': 'ms',
+                    'otherData': {'preloaded_modules': self.preloaded,
+                                  'python': sys.version.split()[0]}}
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        return output_file
+
+    def get_report(self) -> str:
+        """
+        Get a text summary of the timeline.
+        :return:    Text of the summary.
+        """
+        lines = ['Startup profile:']
+        with self._lock:
+            events = sorted([e for e in self.events if e['ph'] == 'X'], key=lambda e: e['ts'])
+        for event in events:
+            lines.append(f' {event["ts"] / 1000:9.1f} ms  {event["dur"] / 1000:9.1f} ms  '
+                         f'[{event["cat"]}] {event["name"]}')
+        if self.preloaded:
+            lines.append(f' Imported before start : {", ".join(self.preloaded)}')
+        return '\n'.join(lines)
+
+
+class FirstPaintFilter(QObject):
+    """
+    Event filter detecting the first paint event of a widget.
+    """
+
+    def __init__(self, callback):
+        """
+
+        :param callback:    Function called at the first paint event.
+        """
+        super().__init__()
+        self.callback = callback
+        self.done = False
+
+    def eventFilter(self, obj, event):
+        if not self.done and event.type() == QEvent.Type.Paint:
+            self.done = True
+            self.callback()
+        return False
@@ -0,0 +1,280 @@
+import json
+import time
+import queue
+import threading
+import numpy as np
+from lensepy_app.appli._app.frame_store import FramePool
+
+RECORD_FORMAT = 'lensepy-raw'   # Identifier of the raw recording files
+RECORD_VERSION = 1
+RECORD_EXTENSION = '.lraw'
+HEADER_SIZE = 4096              # Size (in bytes) of the JSON header of a recording file
+RECORD_QUEUE_SIZE = 32          # Maximum number of frames waiting to be written
+HEADER_UPDATE_INTERVAL = 1.0    # Time (in s) between two updates of the header during the recording
+
+
+def _write_header(file, header: dict):
+    """
+    Write the JSON header at the beginning of a recording file.
+    :param file:    File opened in binary mode.
+    :param header:  Dictionary of the header.
+    """
+    data = json.dumps(header, default=str).encode('utf-8')
+    if len(data) > HEADER_SIZE:
+        raise ValueError('Header of the recording too large')
+    position = file.tell()
+    file.seek(0)
+    file.write(data.ljust(HEADER_SIZE, b' '))
+    file.seek(position)
+
+
+def read_recording_header(filepath: str) -> dict:
+    """
+    Read the header of a recording file.
+    :param filepath:    Name of the recording file.
+    :return:    Dictionary of the header.
+    """
+    with open(filepath, 'rb') as file:
+        header = json.loads(file.read(HEADER_SIZE).decode('utf-8'))
+    if header.get('format') != RECORD_FORMAT:
+        raise ValueError(f'{filepath} is not a raw recording file')
+    return header
+
+
+def open_recording(filepath: str, mode: str = 'r'):
+    """
+    Open a recording file without loading the frames.
+    The number of frames of a recording that was not closed is deduced from the size of the file
+    (the timestamps are not available).
+    :param filepath:    Name of the recording file.
+    :param mode:        Mode of the memmap ('r' read-only, 'c' copy-on-write, 'r+' read-write).
+    :return:    (frames, timestamps, header) : frames is a (N, H, W...) numpy memmap, timestamps a (N, 2)
+        array of the host time (s) and the camera timestamp of each frame (None if not available).
+    """
+    header = read_recording_header(filepath)
+    shape = tuple(header['shape'])
+    dtype = np.dtype(header['dtype'])
+    frame_size = int(np.prod(shape)) * dtype.itemsize
+    count = header.get('count', 0)
+    timestamps = None
+    if header.get('timestamps_offset') is None:
+        with open(filepath, 'rb') as file:
+            file.seek(0, 2)
+            count = (file.tell() - HEADER_SIZE) // frame_size
+    elif count > 0:
+        timestamps = np.memmap(filepath, dtype=np.float64, mode='r',
+                               offset=header['timestamps_offset'], shape=(count, 2))
+    if count == 0:
+        return np.empty((0, *shape), dtype=dtype), timestamps, header
+    frames = np.memmap(filepath, dtype=dtype, mode=mode, offset=HEADER_SIZE, shape=(count, *shape))
+    return frames, timestamps, header
+
+
+class StreamRecorder:
+    """
+    Recorder of a stream of frames in a raw file, written by a dedicated thread.
+    The producer (acquisition) copies each frame in a preallocated buffer, queued for the writer thread.
+    When the queue is full (disk slower than the camera), the frame is dropped and counted :
+    the acquisition is never blocked.
+    File : JSON header (HEADER_SIZE bytes), frames (contiguous, same shape and dtype),
+    then the timestamps of the frames (host time in s, camera timestamp), written at the end.
+    The frames can be mapped as a (N, H, W) array without loading them (see open_recording).
+    """
+
+    def __init__(self, filepath: str, queue_size: int = RECORD_QUEUE_SIZE, metadata: dict = None):
+        """
+
+        :param filepath:    Name of the recording file.
+        :param queue_size:  Maximum number of frames waiting to be written.
+        :param metadata:    Dictionary of additional information (camera parameters...), stored in the header.
+        """
+        self.filepath = filepath
+        self.metadata = metadata or {}
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.pool = FramePool(queue_size + 2)   # Buffers of the queued frames
+        self.shape = None
+        self.dtype = None
+        self.timestamps = []
+        self.frames_count = 0       # Frames written
+        self.dropped_count = 0      # Frames not recorded (queue full, other format)
+        self.bytes_count = 0
+        self.error = None
+        self.thread = None
+        self._running = False
+        self._start_time = None
+        self._stop_time = None
+
+    def start(self) -> bool:
+        """
+        Start the writer thread.
+        :return:    False if the recording can not start (header too large), see error.
+        """
+        if self.thread is not None:
+            return True
+        try:
+            self._check_header()
+        except (TypeError, ValueError) as e:
+            self.error = f'{type(e).__name__}: {e}'
+            print(f'Recording error: {self.error}')
+            return False
+        self._running = True
+        self._start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+
+    def is_recording(self) -> bool:
+        """Return True if frames are accepted."""
+        return self._running and self.error is None
+
+    def acquire(self, shape: tuple, dtype):
+        """
+        Get a free buffer to write a new frame (to pass to commit once written).
+        :param shape:   Shape of the frame.
+        :param dtype:   Data type of the frame.
+        :return:    Writable buffer, None if the frame is dropped (queue full, other format, stopped).
+        """
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        if not self.is_recording():
+            return None
+        if self.shape is None:
+            self.shape, self.dtype = shape, dtype
+        if shape != self.shape or dtype != self.dtype or self.queue.full():
+            self.dropped_count += 1
+            return None
+        return self.pool.acquire(shape, dtype)
+
+    def commit(self, buffer: np.ndarray, timestamp: float = None, device_timestamp: int = 0):
+        """
+        Queue a frame written in a buffer of the recorder.
+        :param buffer:              Buffer of the frame (see acquire).
+        :param timestamp:           Time of the frame (time.perf_counter), now if None.
+        :param device_timestamp:    Timestamp of the camera.
+        """
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        try:
+            self.queue.put_nowait((buffer, timestamp, device_timestamp or 0))
+        except queue.Full:
+            self.dropped_count += 1
+
+    def put(self, frame: np.ndarray, timestamp: float = None, device_timestamp: int = 0) -> bool:
+        """
+        Record a frame (copied, the producer can reuse it).
+        :param frame:               New frame.
+        :param timestamp:           Time of the frame (time.perf_counter), now if None.
+        :param device_timestamp:    Timestamp of the camera.
+        :return:    True if the frame was queued, False if it was dropped.
+        """
+        buffer = self.acquire(frame.shape, frame.dtype)
+        if buffer is None:
+            return False
+        np.copyto(buffer, frame)
+        self.commit(buffer, timestamp, device_timestamp)
+        return True
+
+    def mark_dropped(self, count: int = 1):
+        """
+        Count frames of the stream that were lost before the recorder (overwritten in a ring buffer...).
+        :param count:   Number of frames.
+        """
+        self.dropped_count += count
+
+    def stop(self) -> dict:
+        """
+        Stop the recording : the queued frames are written, then the file is closed.
+        :return:    Statistics of the recording (see get_stats).
+        """
+        if self.thread is not None:
+            self._running = False
+            while self.thread.is_alive():
+                try:
+                    self.queue.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    # Writer thread busy or stopped on an error
+                    continue
+            self.thread.join()
+            self.thread = None
+            self._stop_time = time.perf_counter()
+            self._drain()
+        return self.get_stats()
+
+    def get_stats(self) -> dict:
+        """
+        Get the statistics of the recording.
+        :return:    Dictionary : frames (written), dropped, queued, bytes, rate (written frames per second),
+            error (message, None if no error).
+        """
+        duration = 0
+        if self._start_time is not None:
+            duration = (self._stop_time or time.perf_counter()) - self._start_time
+        return {'frames': self.frames_count, 'dropped': self.dropped_count, 'queued': self.queue.qsize(),
+                'bytes': self.bytes_count, 'rate': self.frames_count / duration if duration > 0 else 0.0,
+                'error': self.error}
+
+    def _check_header(self):
+        """
+        Check that the header of the closed recording (largest header) fits in HEADER_SIZE.
+        Raises ValueError if the metadata are too large.
+        """
+        header = self._get_header(closed=True)
+        header.update({'count': 2 ** 63, 'dropped': 2 ** 63, 'timestamps_offset': 2 ** 63,
+                       'shape': [2 ** 31] * 4, 'dtype': '<c16'})
+        if len(json.dumps(header, default=str).encode('utf-8')) > HEADER_SIZE:
+            raise ValueError('Header of the recording too large (metadata)')
+
+    def _drain(self):
+        """Release the frames left in the queue (writer thread stopped)."""
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _get_header(self, closed: bool = False) -> dict:
+        """
+        Header of the file.
+        :param closed:  True at the end of the recording (timestamps written).
+        :return:    Dictionary of the header.
+        """
+        header = {'format': RECORD_FORMAT, 'version': RECORD_VERSION,
+                  'shape': list(self.shape or []), 'dtype': self.dtype.str if self.dtype is not None else None,
+                  'count': self.frames_count, 'dropped': self.dropped_count,
+                  'timestamps_offset': None, 'metadata': self.metadata}
+        if closed:
+            header['timestamps_offset'] = HEADER_SIZE + self.bytes_count
+        return header
+
+    def _run(self):
+        """Writer thread : the queued frames are written in the order of the acquisition."""
+        try:
+            with open(self.filepath, 'wb', buffering=0) as file:
+                file.write(b' ' * HEADER_SIZE)
+                last_update = time.perf_counter()
+                while True:
+                    item = self.queue.get()
+                    if item is None:
+                        break
+                    buffer, timestamp, device_timestamp = item
+                    if self.error is None:
+                        self.bytes_count += file.write(np.ascontiguousarray(buffer).data)
+                        self.timestamps.append((timestamp, float(device_timestamp)))
+                        self.frames_count += 1
+                    del buffer, item    # Buffer released to the pool
+                    if time.perf_counter() - last_update > HEADER_UPDATE_INTERVAL:
+                        # Readable recording, even if it is not closed
+                        _write_header(file, self._get_header())
+                        last_update = time.perf_counter()
+                file.write(np.asarray(self.timestamps, dtype=np.float64).reshape(-1, 2).tobytes())
+                _write_header(file, self._get_header(closed=True))
+        except Exception as e:
+            self.error = f'{type(e).__name__}: {e}'
+            print(f'Recording error: {self.error}')
+            # Queued frames released
+            while self.thread is not None:
+                try:
+                    if self.queue.get(timeout=0.1) is None:
+                        break
+                except queue.Empty:
+                    if not self._running:
+                        break
@@ -1,9 +1,40 @@
 import time
+import threading
 from pathlib import Path
 import numpy as np
 from PyQt6 import sip
 from PyQt6.QtCore import pyqtSignal, QObject, QThread
 from PyQt6.QtWidgets import QWidget, QMessageBox, QFileDialog
+from lensepy_app.appli._app.frame_store import FrameStack
+
+BURST_TIMEOUT = 2.0     # Maximum time (in s) without frame during a burst acquisition
+
+
+def get_arrays_memory(values) -> int:
+    """
+    Memory of the numpy arrays contained in values, in nested lists, tuples, sets and dictionaries.
+    Views are counted as their base array, an array shared by several views is counted once
+    (memory-mapped files are not counted).
+    :param values:  List of objects.
+    :return:    Memory in bytes.
+    """
+    total = 0
+    arrays = set()      # Base arrays already counted
+    containers = set()  # Containers already visited
+    stack = list(values)
+    while stack:
+        value = stack.pop()
+        if isinstance(value, np.ndarray):
+            base = value
+            while isinstance(base.base, np.ndarray):
+                base = base.base
+            if id(base) not in arrays and not isinstance(base, np.memmap):
+                arrays.add(id(base))
+                total += base.nbytes
+        elif isinstance(value, (list, tuple, set, frozenset, dict)) and id(value) not in containers:
+            containers.add(id(value))
+            stack.extend(value.values() if isinstance(value, dict) else value)
+    return total
 
 
 class TemplateController(QObject):
@@ -12,6 +43,7 @@ class TemplateController(QObject):
     """
 
     controller_changed = pyqtSignal(str)
+    cacheable = False   # True if the controller can be suspended in the controllers pool
 
     def __init__(self, parent=None):
         """
@@ -23,20 +55,53 @@ class TemplateController(QObject):
         self.top_right = QWidget()
         self.bot_left = QWidget()
         self.bot_right = QWidget()
+        self.suspended = False
+        self._visible_widgets = []
         self.destroyed.connect(self.on_destroy)
 
     def init_view(self):
-        self.parent.main_window.top_left_container.deleteLater()
-        self.parent.main_window.top_right_container.deleteLater()
-        self.parent.main_window.bot_left_container.deleteLater()
-        self.parent.main_window.bot_right_container.deleteLater()
-        # Update new containers
-        self.parent.main_window.top_left_container = self.top_left
-        self.parent.main_window.bot_left_container = self.bot_left
-        self.parent.main_window.top_right_container = self.top_right
-        self.parent.main_window.bot_right_container = self.bot_right
+        # Update new containers - containers of suspended controllers are kept
+        retained = []
+        if getattr(self.parent, 'controller_pool', None) is not None:
+            retained = self.parent.controller_pool.get_widgets()
+        self.parent.main_window.set_containers(self.top_left, self.top_right,
+                                               self.bot_left, self.bot_right, retained)
         self.update_view()
 
+    def suspend(self):
+        """
+        Suspend the controller before storing it in the controllers pool.
+        Widgets are kept. Subclasses stop their acquisition / timers here.
+        """
+        self.suspended = True
+        self._visible_widgets = [w for w in [self.top_left, self.top_right, self.bot_left, self.bot_right]
+                                 if w is not None and not w.isHidden()]
+
+    def resume(self):
+        """
+        Resume a suspended controller : its widgets are displayed again.
+        Subclasses restart their acquisition / timers here.
+        """
+        self.suspended = False
+        TemplateController.init_view(self)
+        for widget in self._visible_widgets:
+            widget.show()
+        self._visible_widgets = []
+
+    def get_memory_usage(self) -> int:
+        """
+        Estimate the memory used by the controller : arrays held by the controller, its containers
+        and their child widgets, directly or in lists, tuples, sets and dictionaries (see get_arrays_memory).
+        A controller holding its data elsewhere reports it by overriding this method.
+        :return:    Memory in bytes.
+        """
+        objects = [self]
+        for widget in [self.top_left, self.top_right, self.bot_left, self.bot_right]:
+            if widget is not None and not sip.isdeleted(widget):
+                objects.append(widget)
+                objects.extend(widget.findChildren(QObject))
+        return get_arrays_memory([getattr(obj, '__dict__', {}) for obj in objects])
+
     def update_view(self):
         # Display mode value in XML
         mode = self.parent.xml_module.get_parameter_xml('display')
@@ -122,17 +187,93 @@ class TemplateController(QObject):
         pass
 
 
+class FrameMailbox:
+    """
+    Single-slot mailbox between the acquisition thread and the GUI thread : the latest frame wins.
+    A new frame replaces the frame not yet taken by the GUI (dropped frame), so the delay
+    between acquisition and display is bounded whatever the processing cost in the GUI thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.event = threading.Event()  # Set when a frame is waiting
+        self.frame = None
+        self.frames_count = 0       # Frames put in the mailbox
+        self.delivered_count = 0    # Frames taken by the GUI
+        self.dropped_count = 0      # Frames replaced before being taken
+
+    @property
+    def depth(self) -> int:
+        """Number of frames waiting in the mailbox (0 or 1)."""
+        return 0 if self.frame is None else 1
+
+    def put(self, frame: np.ndarray) -> bool:
+        """
+        Put a new frame in the mailbox.
+        :param frame:   New frame.
+        :return:    True if the mailbox was empty (the GUI must be notified).
+        """
+        with self.lock:
+            was_empty = self.frame is None
+            if not was_empty:
+                self.dropped_count += 1
+            self.frame = frame
+            self.frames_count += 1
+            self.event.set()
+        return was_empty
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait for a frame (consumer in another thread than the GUI).
+        :param timeout:     Maximum waiting time in s.
+        :return:    True if a frame is waiting.
+        """
+        return self.event.wait(timeout)
+
+    def wake(self):
+        """Wake the consumer waiting for a frame, without frame (end of the consumer)."""
+        self.event.set()
+
+    def take(self):
+        """
+        Take the latest frame.
+        :return:    Latest frame, None if the mailbox is empty.
+        """
+        with self.lock:
+            frame, self.frame = self.frame, None
+            self.event.clear()
+            if frame is not None:
+                self.delivered_count += 1
+        return frame
+
+    def get_stats(self) -> dict:
+        """
+        Get the counters of the mailbox.
+        :return:    Dictionary : frames, delivered, dropped, depth.
+        """
+        return {'frames': self.frames_count, 'delivered': self.delivered_count,
+                'dropped': self.dropped_count, 'depth': self.depth}
+
+
 class ImageLive(QObject):
     """
     Worker for image acquisition.
     Based on threads.
+    If the get_image method of the camera waits for the next frame (get_image_blocks attribute
+    of the camera), the worker does not sleep between two frames.
+    With a mailbox, the frames are handed over through the mailbox and frame_available is emitted
+    only when the mailbox was empty : at most one notification is queued for the GUI.
+    Without a mailbox, each frame is emitted by image_ready.
+    Each frame is also sent to the recorder of the controller, if any (before any frame is dropped).
     """
     image_ready = pyqtSignal(np.ndarray)
+    frame_available = pyqtSignal()
     finished = pyqtSignal()
 
-    def __init__(self, controller):
+    def __init__(self, controller, mailbox: FrameMailbox = None):
         super().__init__()
         self.controller = controller
+        self.mailbox = mailbox
         self._running = False
 
     def run(self):
@@ -142,12 +283,21 @@ class ImageLive(QObject):
 
         self._running = True
         camera.camera_acquiring = True
+        blocking = getattr(camera, 'get_image_blocks', False)
 
         while self._running:
             image = camera.get_image()
+            t_frame = time.perf_counter()
+            recorder = getattr(self.controller, 'recorder', None)
+            if image is not None and recorder is not None:
+                recorder.put(image, t_frame, getattr(camera, 'last_timestamp', 0))
             if image is not None and not sip.isdeleted(self):
-                self.image_ready.emit(image)
-            time.sleep(0.01)
+                if self.mailbox is None:
+                    self.image_ready.emit(image)
+                elif self.mailbox.put(image):
+                    self.frame_available.emit()
+            if not blocking or image is None:
+                time.sleep(0.01)
 
         camera.camera_acquiring = False
         self.finished.emit()
@@ -179,3 +329,102 @@ class ImageLive(QObject):
 
     def stop(self):
         self._running = False
+
+
+class FrameProcessor(QObject):
+    """
+    Worker of a processing stage of the acquisition (demosaicing...), between two mailboxes.
+    Only the latest raw frame is processed : frames dropped before the display are never processed.
+    """
+    frame_available = pyqtSignal()
+    finished = pyqtSignal()
+
+    def __init__(self, function, source: FrameMailbox, target: FrameMailbox):
+        """
+
+        :param function:    Processing function, called as function(raw frame) - returns the processed frame.
+        :param source:      Mailbox of the raw frames.
+        :param target:      Mailbox of the processed frames.
+        """
+        super().__init__()
+        self.function = function
+        self.source = source
+        self.target = target
+        self._running = False
+
+    def run(self):
+        self._running = True
+        while self._running:
+            if not self.source.wait(0.1):
+                continue
+            raw = self.source.take()
+            if raw is None:
+                continue
+            try:
+                image = self.function(raw)
+            except Exception as e:
+                print(f'Frame processing error: {e}')
+                continue
+            if image is not None and not sip.isdeleted(self) and self.target.put(image):
+                self.frame_available.emit()
+        self.finished.emit()
+
+    def stop(self):
+        self._running = False
+        self.source.wake()
+
+
+class BurstCapture(QObject):
+    """
+    Worker of a burst acquisition : N successive frames of the camera are stored in a FrameStack,
+    without any processing nor signal per frame. The stack is emitted by burst_ready at the end.
+    If the camera has a frame_pool attribute, the frames are written directly in the stack.
+    """
+    burst_ready = pyqtSignal(object)
+    finished = pyqtSignal()
+
+    def __init__(self, camera, stack: FrameStack, timeout: float = BURST_TIMEOUT):
+        """
+
+        :param camera:  Camera of the acquisition (not used by another thread).
+        :param stack:   Stack of the frames.
+        :param timeout: Maximum time (in s) without any frame before stopping the burst.
+        """
+        super().__init__()
+        self.camera = camera
+        self.stack = stack
+        self.timeout = timeout
+        self._running = False
+
+    def run(self):
+        self._running = True
+        camera = self.camera
+        pool = getattr(camera, 'frame_pool', None)
+        if hasattr(camera, 'frame_pool'):
+            camera.frame_pool = self.stack
+        blocking = getattr(camera, 'get_image_blocks', False)
+        camera.camera_acquiring = True
+        t_last = time.perf_counter()
+        try:
+            while self._running and not self.stack.full:
+                image = camera.get_image()
+                t_frame = time.perf_counter()
+                if image is None:
+                    if t_frame - t_last > self.timeout:
+                        print('Burst acquisition: no frame from the camera')
+                        break
+                    if not blocking:
+                        time.sleep(0.001)
+                    continue
+                t_last = t_frame
+                self.stack.add(image, t_frame, getattr(camera, 'last_timestamp', 0))
+        finally:
+            camera.camera_acquiring = False
+            if hasattr(camera, 'frame_pool'):
+                camera.frame_pool = pool
+        if not sip.isdeleted(self):
+            self.burst_ready.emit(self.stack)
+        self.finished.emit()
+
+    def stop(self):
+        self._running = False
@@ -0,0 +1,211 @@
+from collections.abc import MutableMapping
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# Types that can be declared in the application XML file : <variable name="..." type="bool"/>
+VARIABLE_TYPES = {
+    'bool': bool,
+    'int': int,
+    'float': (int, float),
+    'str': str,
+    'list': list,
+    'dict': dict,
+    'ndarray': np.ndarray,
+    'object': object,
+}
+# Values compared by equality - other objects (arrays, datasets...) are compared by identity
+SIMPLE_TYPES = (bool, int, float, str, bytes, tuple, type(None))
+
+
+class VariableSignals(QObject):
+    """
+    Signals of the variable store.
+    """
+    variable_changed = pyqtSignal(str, object)      # Name, new value
+    definition_changed = pyqtSignal(str, bool)      # Name, True if the variable is not None
+
+
+class VariableStore(MutableMapping):
+    """
+    Observable dictionary of the application variables.
+    A signal is emitted each time a variable changes. Simple values are compared by value,
+    heavy objects (arrays, datasets...) by identity : a module modifying an object
+    in place calls notify(name).
+    A variable updated at a high rate (latest image...) is bound to its provider (see bind) :
+    reading it calls the provider, and only its definition changes are signaled.
+    """
+
+    def __init__(self, variables: dict = None, types: dict = None):
+        """
+
+        :param variables:   Initial variables.
+        :param types:       Type name of each typed variable (see VARIABLE_TYPES).
+        """
+        self.signals = VariableSignals()
+        self._variables = {}
+        self._types = {}
+        self._callbacks = {}    # Functions called when a variable changes, by name
+        self._bound = {}        # (getter, setter, defined) of the bound variables, by name
+        self.reset(variables, types)
+
+    @property
+    def variable_changed(self):
+        return self.signals.variable_changed
+
+    @property
+    def definition_changed(self):
+        return self.signals.definition_changed
+
+    def __getitem__(self, name):
+        if name in self._bound:
+            return self._bound[name][0]()
+        return self._variables[name]
+
+    def __setitem__(self, name, value):
+        self._check_type(name, value)
+        if name in self._bound:
+            old_value = self[name]
+            self._bound[name][1](value)
+            if self._is_changed(old_value, value):
+                self._bound[name][2] = value is not None
+                self._emit(name, old_value, value)
+            return
+        changed = name not in self._variables or self._is_changed(self._variables[name], value)
+        old_value = self._variables.get(name)
+        self._variables[name] = value
+        if changed:
+            self._emit(name, old_value, value)
+
+    def __delitem__(self, name):
+        if name in self._bound:
+            self[name] = None
+            return
+        old_value = self._variables.pop(name)
+        self._emit(name, old_value, None)
+
+    def __iter__(self):
+        yield from self._variables
+        yield from (name for name in self._bound if name not in self._variables)
+
+    def __len__(self):
+        return len(set(self._variables) | set(self._bound))
+
+    def __repr__(self):
+        return f'VariableStore({dict(self)!r})'
+
+    def bind(self, name: str, getter, setter):
+        """
+        Bind a variable to its provider : the value is read by getter and written by setter.
+        The provider calls notify_definition when its value is updated (no variable_changed signal).
+        :param name:    Name of the variable.
+        :param getter:  Function returning the value of the variable.
+        :param setter:  Function called with the new value when the variable is set.
+        """
+        value = self._variables.pop(name, None)
+        self._bound[name] = [getter, setter, getter() is not None]
+        if value is not None:
+            self[name] = value
+
+    def notify_definition(self, name: str):
+        """
+        Signal that the value of a bound variable was updated by its provider :
+        definition_changed is emitted only if the variable became defined or undefined.
+        :param name:    Name of the bound variable.
+        """
+        bound = self._bound[name]
+        defined = bound[0]() is not None
+        if defined != bound[2]:
+            bound[2] = defined
+            self.definition_changed.emit(name, defined)
+    def reset(self, variables: dict = None, types: dict = None):
+        """
+        Replace all the variables (new application).
+        :param variables:   New variables.
+        :param types:       Type name of each typed variable.
+        """
+        self._types = {}
+        for name, type_name in (types or {}).items():
+            self.set_type(name, type_name)
+        old_variables = self._variables
+        self._variables = {}
+        for name, value in (variables or {}).items():
+            self._check_type(name, value)
+            if name in self._bound:
+                self[name] = value
+            else:
+                self._variables[name] = value
+        for name in self._bound:
+            if name not in (variables or {}):
+                self[name] = None
+        for name in set(old_variables) | set(self._variables):
+            old_value, value = old_variables.get(name), self._variables.get(name)
+            if self._is_changed(old_value, value):
+                self._emit(name, old_value, value)
+
+    def set_type(self, name: str, type_name: str):
+        """
+        Declare the type of a variable. None is always accepted.
+        :param name:        Name of the variable.
+        :param type_name:   Name of the type (see VARIABLE_TYPES).
+        """
+        if type_name not in VARIABLE_TYPES:
+            raise ValueError(f'Unknown type {type_name} for variable {name}')
+        self._types[name] = VARIABLE_TYPES[type_name]
+
+    def get_type(self, name: str):
+        """
+        Get the declared type of a variable.
+        :param name:    Name of the variable.
+        :return:    Python type, None if the variable is not typed.
+        """
+        return self._types.get(name)
+
+    def connect(self, name: str, callback):
+        """
+        Call a function each time a variable changes.
+        :param name:        Name of the variable.
+        :param callback:    Function called with the new value.
+        """
+        self._callbacks.setdefault(name, []).append(callback)
+
+    def disconnect(self, name: str, callback=None):
+        """
+        Remove a function called when a variable changes.
+        :param name:        Name of the variable.
+        :param callback:    Function to remove. None to remove all the functions of the variable.
+        """
+        if callback is None:
+            self._callbacks.pop(name, None)
+        elif callback in self._callbacks.get(name, []):
+            self._callbacks[name].remove(callback)
+
+    def notify(self, name: str):
+        """
+        Signal that a variable was modified in place (dataset, phase...).
+        :param name:    Name of the variable.
+        """
+        value = self.get(name)
+        self.variable_changed.emit(name, value)
+        for callback in list(self._callbacks.get(name, [])):
+            callback(value)
+
+    def _emit(self, name, old_value, value):
+        if (old_value is None) != (value is None):
+            self.definition_changed.emit(name, value is not None)
+        self.variable_changed.emit(name, value)
+        for callback in list(self._callbacks.get(name, [])):
+            callback(value)
+
+    def _check_type(self, name, value):
+        var_type = self._types.get(name)
+        if var_type is not None and value is not None and not isinstance(value, var_type):
+            raise TypeError(f'Variable {name} must be of type {var_type}, not {type(value).__name__}')
+
+    @staticmethod
+    def _is_changed(old_value, value) -> bool:
+        if isinstance(old_value, SIMPLE_TYPES) and isinstance(value, SIMPLE_TYPES):
+            try:
+                return type(old_value) is not type(value) or bool(old_value != value)
+            except ValueError:  # Tuple of arrays
+                return True
+        return old_value is not value
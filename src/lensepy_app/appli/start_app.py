@@ -1,13 +1,17 @@
-import sys, os
+import sys, os, time
 from pathlib import Path
 
 import lensepy_app
 from lensepy import translate, load_dictionary, dictionary
 
 from lensepy_app.modules.default.default_controller import DefaultController
-from lensepy_app.appli._app.app_utils import XMLFileConfig, XMLFileModule
+from lensepy_app.appli._app.app_utils import XMLFileConfig, XMLFileModule, get_appli_root
 from lensepy_app.appli._app.main_manager import MainManager
+from lensepy_app.appli._app.startup_profiler import StartupProfiler, FirstPaintFilter, get_profile_option
+from lensepy_app.appli._app.batch_runner import get_batch_option
+from lensepy_app.appli.start_batch import start_batch
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
 import importlib
 import importlib.util
 
@@ -15,25 +19,20 @@ DEFAULT_LANG = 'FR'
 
 class My_Application(QApplication):
 
-    def __init__(self, app_name=None, standalone=False, argv=None):
+    def __init__(self, app_name=None, standalone=False, argv=None, profiler=None):
         if argv is None:
             argv = sys.argv
         super().__init__(argv)
+        self.profiler = profiler or StartupProfiler()     # Startup timeline (--profile-startup)
+        self.first_paint_filter = None
         self.manager = MainManager(self)
         self.window = self.manager.main_window
         self.standalone = standalone
         self.package_root = os.path.dirname(lensepy_app.__file__)
         self.app_name = app_name
-        self.appli_root = None
-        if not self.standalone:
-            self.appli_root = os.path.dirname(os.path.abspath(__file__))
-            self.appli_root = os.path.dirname(self.appli_root)
-            self.appli_root += f'/applis_dir/{app_name}'
-        else:
-            if app_name is not None:
-                self.appli_root = f'{app_name}'
-            else:
-                return
+        self.appli_root = get_appli_root(app_name, standalone)
+        if self.appli_root is None:
+            return
 
         self.config_name = f'{self.appli_root}/config/appli.xml'
         # Parser for options
@@ -45,7 +44,12 @@ class My_Application(QApplication):
         self.error_modules = []
 
     def init_config(self):
-        self.check_options()    # Change config_name if necessary
+        with self.profiler.phase('init_config'):
+            return self._init_config()
+
+    def _init_config(self):
+        with self.profiler.phase('check_options'):
+            self.check_options()    # Change config_name if necessary
         self.config_ok = self.manager.set_xml_app(self.config_name)
 
         xml_data: XMLFileConfig = self.manager.xml_app
@@ -85,28 +89,27 @@ class My_Application(QApplication):
             module.init_app(self)
 
     def init_app(self):
-        self.manager.init_list_modules()
+        with self.profiler.phase('init_list_modules'):
+            self.manager.init_list_modules()
 
     def check_dependencies(self):
         """Check if required dependencies are installed."""
+        with self.profiler.phase('check_dependencies'):
+            return self._check_dependencies()
+
+    def _check_dependencies(self):
         if self.config_ok:
             modules_list = self.manager.xml_app.get_list_modules()
             # List the missing modules
             for module in modules_list:
-                module_path = self.manager.xml_app.get_module_path(module)
-                if './' in module_path:
-                    module_path_n = module_path.lstrip("./").replace("/", ".")
-                    path_module = f'{module_path_n}.{module}'
-                else:
-                    path_module = f'{module_path}.{module}'
-                try:
-                    if importlib.util.find_spec(path_module) is None:
-                        self.missing_modules.append(module)
-                except ModuleNotFoundError:
+                status = self.manager.manifest.get_parameter(module, 'status')
+                if status == 'missing':
+                    self.missing_modules.append(module)
+                elif status == 'error':
                     self.error_modules.append(module)
             # List the required modules
             for module in modules_list:
-                req_module = self.manager.xml_app.get_module_parameter(module, 'requirements')
+                req_module = self.manager.manifest.get_parameter(module, 'requirements')
                 if req_module is not None:
                     req_module = req_module.split(',')
                     for r_module in req_module:
@@ -140,15 +143,59 @@ class My_Application(QApplication):
             title += f' - {self.config["year"]}' or ''
         # Display Main Window
         self.window.setWindowTitle(f'{title}')
+        if self.profiler.enabled:
+            t_show = time.perf_counter()
+            self.first_paint_filter = FirstPaintFilter(lambda: self.handle_first_paint(t_show))
+            self.window.installEventFilter(self.first_paint_filter)
         self.window.showMaximized()
+        # Import the other modules once the main window is displayed (<prewarm>True</prewarm>)
+        QTimer.singleShot(0, self.manager.prewarm_modules)
+
+    def handle_first_paint(self, t_show: float):
+        """
+        Action performed at the first paint of the main window (startup profiling).
+        :param t_show:  Time of the showMaximized call.
+        """
+        self.profiler.add_event('showMaximized / first paint', t_show, time.perf_counter())
+        self.window.removeEventFilter(self.first_paint_filter)
+        print(self.profiler.get_report())
+        print(f'Startup profile saved in {self.profiler.save()}')
+        # Save again at the end, with the modules imported in background
+        self.aboutToQuit.connect(self.handle_quit_profile)
+
+    def handle_quit_profile(self):
+        """Save the startup timeline when the application quits."""
+        self.profiler.stop()
+        self.profiler.save()
 
 
 def start_app(app_path, standalone=False, argv=None):
+    """
+    Start an application.
+    :param app_path:    Name of the application.
+    :param standalone:  True if the application is outside the package.
+    :param argv:        Arguments of the command line.
+    :return:    Exit code of the batch mode (the application exits at the end of the GUI mode).
+    """
+    # Headless batch mode (--batch batch_file.xml), see start_batch.py to run it without Qt
+    batch_file = get_batch_option(sys.argv)
+    if argv is not None and argv is not sys.argv:
+        batch_file_argv = get_batch_option(argv)
+        batch_file = batch_file if batch_file is not None else batch_file_argv
+    if batch_file is not None:
+        return start_batch(app_path, batch_file, standalone)
+    # Startup profiling option (removed from the arguments)
+    profile_file = get_profile_option(sys.argv)
+    if argv is not None and argv is not sys.argv:
+        profile_file_argv = get_profile_option(argv)
+        profile_file = profile_file if profile_file is not None else profile_file_argv
+    profiler = StartupProfiler(profile_file is not None, profile_file or '')
+    profiler.start()
     if standalone:
         print('Standalone')
-        app = My_Application(app_path, standalone)
+        app = My_Application(app_path, standalone, profiler=profiler)
     else:
-        app = My_Application(app_path, argv=argv)
+        app = My_Application(app_path, argv=argv, profiler=profiler)
 
     if app.init_config():
         if app.check_dependencies():
@@ -172,7 +219,7 @@ def start_app(app_path, standalone=False, argv=None):
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         application_name = sys.argv[1]
-        start_app(application_name, standalone=False, argv=sys.argv)
+        sys.exit(start_app(application_name, standalone=False, argv=sys.argv))
     else:
         # Display all app
         path_to_app = Path("./")
@@ -0,0 +1,40 @@
+import sys
+from lensepy_app.appli._app.app_utils import get_appli_root
+from lensepy_app.appli._app.batch_runner import BatchRunner, get_batch_option
+
+
+def start_batch(app_path, batch_file, standalone=False) -> int:
+    """
+    Process files by a chain of modules of an application, without window (Qt is not imported).
+    :param app_path:    Name of the application.
+    :param batch_file:  Path of the XML batch file.
+    :param standalone:  True if the application is outside the package.
+    :return:    Exit code : 0 if all the files were processed, 1 otherwise.
+    """
+    runner = BatchRunner(get_appli_root(app_path, standalone), batch_file)
+    if not runner.load():
+        print('Batch failed')
+        return 1
+    runner.run()
+    return 1 if runner.get_errors_number() != 0 else 0
+
+
+def main(argv: list) -> int:
+    """
+    Batch mode from the command line : start_batch.py app_name --batch batch_file.xml
+    (or start_batch.py app_name batch_file.xml).
+    :param argv:    Arguments of the command line.
+    :return:    Exit code.
+    """
+    argv = list(argv)
+    batch_file = get_batch_option(argv)
+    if batch_file is None and len(argv) > 2:
+        batch_file = argv[2]
+    if len(argv) < 2 or batch_file is None:
+        print('Usage: start_batch.py app_name --batch batch_file.xml')
+        return 2
+    return start_batch(argv[1], batch_file)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,6 +1,4 @@
-import time
-from PyQt6.QtCore import QObject, QThread
-from lensepy_app.appli._app.template_controller import TemplateController, ImageLive
+from lensepy_app.appli._app.template_controller import TemplateController
 from lensepy_app.modules.camera.basler.basler_views import *
 from lensepy_app.modules.camera.basler.basler_models import *
 from lensepy_app.widgets.camera_widget import *
@@ -14,6 +12,8 @@ class BaslerController(TemplateController):
 
     """
 
+    cacheable = True
+
     def __init__(self, parent=None):
         """
         :param parent:
@@ -21,8 +21,6 @@ class BaslerController(TemplateController):
         super().__init__(parent)
         # Attributes initialization
         self.camera_connected = False       # Camera is connected
-        self.thread = None
-        self.worker = None
         self.colormode = []
         self.colormode_bits_depth = []
         self.camera_range = [0, 0, 0, 0]
@@ -47,9 +45,10 @@ class BaslerController(TemplateController):
         # Camera infos
         camera = self.parent.variables['camera']
         if camera is not None:
-            expo_init = camera.get_parameter('ExposureTime')
+            with camera.session():
+                expo_init = camera.get_parameter('ExposureTime')
+                fps_init = camera.get_parameter('BslResultingAcquisitionFrameRate')
             self.bot_right.slider_expo.set_value(expo_init)
-            fps_init = camera.get_parameter('BslResultingAcquisitionFrameRate')
             fps = np.round(fps_init, 2)
             self.bot_right.label_fps.set_value(str(fps))
         if self.parent.variables['roi_coords'] is not None:
@@ -99,22 +98,37 @@ class BaslerController(TemplateController):
         """
         Initialize the camera.
         """
+        from lensepy_app.modules.camera.simulated.simulated_models import create_simulated_camera
+        from lensepy_app.modules.camera.replay.replay_models import create_replay_camera
         camera = self.parent.variables["camera"]
         # Check if a camera is already connected
         if camera is None:
-            # Init Camera
-            self.parent.variables["camera"] = BaslerCamera()
+            # Init Camera (simulated or replay camera if selected in the XML file)
+            self.parent.variables["camera"] = (create_simulated_camera(self.parent.xml_app)
+                                               or create_replay_camera(self.parent.xml_app) or BaslerCamera())
             self.camera_connected = self.parent.variables["camera"].find_first_camera()
             if self.camera_connected is False:
                 self.parent.variables["camera"] = None
             else:
                 camera = self.parent.variables["camera"]
                 self.parent.variables["first_connexion"] = 'Yes'
+                # Packed transfer of the 10/12 bits formats (<camera><packed>True</packed></camera>)
+                packed = self.parent.xml_app.get_sub_parameter('camera', 'packed')
+                if packed is not None and hasattr(camera, 'set_packed_transfer'):
+                    camera.set_packed_transfer(packed.strip() == 'True')
                 # Initial parameters
                 camera_ini_file = self.parent.parent.config.get('camera_ini')
                 if camera_ini_file is not None:
                     if os.path.isfile(camera_ini_file):
                         camera.init_camera_parameters(camera_ini_file)
+                # Grab strategy of the stream (<camera><grab_strategy>latest</grab_strategy></camera>)
+                grab_strategy = self.parent.xml_app.get_sub_parameter('camera', 'grab_strategy')
+                if grab_strategy is not None and hasattr(camera, 'set_grab_strategy'):
+                    camera.set_grab_strategy(grab_strategy.strip())
+                # Demosaicing of the Bayer frames (<camera><demosaic>bilinear</demosaic></camera>)
+                demosaic_mode = self.parent.xml_app.get_sub_parameter('camera', 'demosaic')
+                if demosaic_mode is not None:
+                    camera.set_demosaic_mode(demosaic_mode.strip())
 
                 # ROI management
                 x0, y0, x1, y1 = self._get_max_coords()
@@ -146,10 +160,7 @@ class BaslerController(TemplateController):
         if 'first_connexion' in self.parent.variables:
             if self.parent.variables['first_connexion'] == 'Yes':
                 first_mode_color = self.colormode[0]
-                camera.open()
-                camera.set_parameter("PixelFormat", first_mode_color)
-                camera.initial_params["PixelFormat"] = first_mode_color
-                camera.close()
+                self._apply_color_mode(camera, first_mode_color)
                 first_bits_depth = self.colormode_bits_depth[0]
                 self.parent.variables["bits_depth"] = first_bits_depth
             else:
@@ -162,38 +173,16 @@ class BaslerController(TemplateController):
 
     def start_live(self):
         """
-        Start live acquisition from camera.
+        Start live acquisition from camera (subscription to the acquisition service).
         """
         if self.camera_connected:
-            self.thread = QThread()
-            self.worker = ImageLive(self)
-            self.worker.moveToThread(self.thread)
-
-            self.thread.started.connect(self.worker.run)
-            self.worker.image_ready.connect(self.handle_image_ready)
-            self.worker.finished.connect(self.thread.quit)
-
-            self.worker.finished.connect(self.worker.deleteLater)
-            self.worker.finished.connect(self.thread.deleteLater)
-
-            self.thread.start()
+            self.parent.acquisition.subscribe(self, self.handle_image_ready)
 
     def stop_live(self):
         """
-        Stop live mode, i.e. continuous image acquisition.
+        Suspend the live mode of the module (the frames of the other modules are not affected).
         """
-        if self.worker is not None:
-            # Arrêter le worker
-            self.worker._running = False
-
-            # Attendre la fin du thread
-            if self.thread is not None:
-                self.thread.quit()
-                self.thread.wait()  # bloque jusqu'à la fin
-
-            # Supprimer les références
-            self.worker = None
-            self.thread = None
+        self.parent.acquisition.pause(self)
 
     def handle_image_ready(self, image: np.ndarray):
         """
@@ -205,25 +194,23 @@ class BaslerController(TemplateController):
         # Update Histo
         self.bot_left.set_image(image, checked=False)
         # Store new image.
-        self.parent.variables['image'] = image.copy()
+        self.parent.frame_store.publish(image, source='basler')
+
+    def handle_parameters_changed(self, params: dict):
+        """
+        Action performed when parameters of the camera were set.
+        :param params:  Dictionary of the values, by parameter name.
+        """
+        self.bot_right.update_infos()
 
     def handle_exposure_time_changed(self, value):
         """
         Action performed when the exposure time changed.
+        The parameter is set during the acquisition (successive values are coalesced).
         """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
-            camera.set_parameter('ExposureTime', value)
-            camera.initial_params['ExposureTime'] = value
-            self.bot_right.update_infos()
-            # Restart live
-            camera.open()
-            self.start_live()
+        if self.parent.variables["camera"] is not None:
+            self.parent.acquisition.set_camera_parameters({'ExposureTime': value},
+                                                          callback=self.handle_parameters_changed)
 
     def handle_color_mode_changed(self, event):
         """
@@ -231,17 +218,10 @@ class BaslerController(TemplateController):
         """
         camera = self.parent.variables["camera"]
         if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
+            # Read available formats (the camera is not closed : other modules can receive its frames)
             available_formats = []
             try:
-                if camera.camera_device is not None:
-                    camera.open()
-                    available_formats = list(camera.camera_device.PixelFormat.Symbolics)
-                    camera.close()
+                available_formats = (camera.get_parameter_info('PixelFormat') or {}).get('symbolics', [])
             except Exception as e:
                 print(f"Unable to read PixelFormat.Symbolics: {e}")
             # Select new format
@@ -251,39 +231,24 @@ class BaslerController(TemplateController):
             if new_format is None:
                 return
             if new_format in available_formats:
-                camera.open()
-                camera.set_parameter("PixelFormat", new_format)
-                camera.initial_params["PixelFormat"] = new_format
-                camera.close()
+                self._apply_color_mode(camera, new_format)
             # Change bits depth
             self.parent.variables['bits_depth'] = self.colormode_bits_depth[idx]
             self.bot_left.set_bits_depth(int(self.parent.variables['bits_depth']))
             self.top_left.set_bits_depth(int(self.parent.variables['bits_depth']))
-            if 'Bayer' in new_format:
+            if 'Bayer' in new_format and camera.demosaic_mode not in ['gray', 'raw']:
                 self.bot_left.reinit_checkbox('RGB')
-            elif 'Mono' in new_format:
+            elif 'Mono' in new_format or 'Bayer' in new_format:
                 self.bot_left.reinit_checkbox('Gray')
-            # Restart live
-            camera.open()
-            self.start_live()
 
     def handle_black_level_changed(self, value):
         """
         Action performed when the black level changed.
+        The parameter is set during the acquisition (successive values are coalesced).
         """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
-            camera.set_parameter('BlackLevel', value)
-            camera.initial_params['BlackLevel'] = value
-            self.bot_right.update_infos()
-            # Restart live
-            camera.open()
-            self.start_live()
+        if self.parent.variables["camera"] is not None:
+            self.parent.acquisition.set_camera_parameters({'BlackLevel': value},
+                                                          callback=self.handle_parameters_changed)
 
     def handle_rect_changed(self, coords):
         """Action performed when a new rectangle has been drawn."""
@@ -296,31 +261,33 @@ class BaslerController(TemplateController):
         self.top_left.draw_rectangle(self.parent.variables['roi_coords'])
 
     def handle_roi_activated(self, value):
+        """
+        Action performed when the ROI is activated or deactivated.
+        The ROI is set by the acquisition service (aligned, in a single batch, without stopping
+        the live acquisition when possible).
+        """
+        if self.parent.variables["camera"] is None:
+            self.parent.variables["roi_activated"] = value
+            return
+        if value:
+            x0, y0, x1, y1 = self.parent.variables["roi_coords"]
+        else:
+            x0, y0, x1, y1 = self._get_max_coords()
+        roi = self.parent.acquisition.set_roi(x0, y0, x1 - x0, y1 - y0,
+                                             callback=self.handle_parameters_changed)
+        if roi is None:
+            # ROI not applied (recording) : previous state kept
+            self.top_right.set_roi_activated(not value)
+            return
+        x0, y0, x1, y1 = roi
         self.parent.variables["roi_activated"] = value
-        camera = self.parent.variables["camera"]
-        self.stop_live()
         self.top_right.set_enabled_roi_widget(not value)
         self.top_left.set_enabled(not value)
         if value:
-            x0, y0, x1, y1 = self.parent.variables["roi_coords"]
-            new_w = min((x1-x0) + (4-(x1-x0)%4), camera.get_parameter('WidthMax'))
-            new_h = min((y1-y0) + (4-(y1-y0)%4), camera.get_parameter('HeightMax'))
-            x0, y0 = x0 - x0%4, y0 - y0%4
-            x1 = x0 + new_w
-            y1 = y0 + new_h
             self.parent.variables["roi_coords"] = [x0, y0, x1, y1]
         else:
-            x0, y0, x1, y1 = self._get_max_coords()
-            new_w = x1
-            new_h = y1
             self.top_left.draw_rectangle(self.parent.variables["roi_coords"])
         self.top_right.set_roi([x0, y0, x1, y1])
-        camera.set_parameter('Width', new_w)
-        camera.set_parameter('Height', new_h)
-        camera.set_parameter('OffsetX', x0)
-        camera.set_parameter('OffsetY', y0)
-        time.sleep(0.05)
-        self.start_live()
         self.top_left.update()
 
     def check_order(self, coords: list):
@@ -385,17 +352,42 @@ class BaslerController(TemplateController):
         x1, y1 = int(max_width)+x0, int(max_height)+y0
         return x0, y0, x1, y1
 
-    def cleanup(self):
+    def _apply_color_mode(self, camera, color_mode: str):
         """
-        Stop the camera cleanly and release resources.
+        Set the pixel format of the camera, through a preset named as the color mode.
+        The acquisition is stopped by the service while the preset is applied.
+        :param camera:      BaslerCamera object.
+        :param color_mode:  Pixel format (Mono8, BayerRG12...).
         """
-        self.stop_live()
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            if getattr(camera, "is_open", False):
-                camera.close()
-            camera.camera_acquiring = False
-        self.worker = None
-        self.thread = None
+        if color_mode not in camera.presets:
+            camera.add_preset(color_mode, {'PixelFormat': color_mode})
+        self.parent.acquisition.set_camera_parameters(camera.presets[color_mode],
+                                                      callback=self.handle_parameters_changed)
 
+    def suspend(self):
+        """
+        Suspend the controller : stop the live acquisition, widgets are kept.
+        """
+        super().suspend()
+        # cleanup is called once, when the controller is released (see ControllerPool.release)
+        self.parent.acquisition.unsubscribe(self)
+
+    def resume(self):
+        """
+        Resume the controller : restart the live acquisition.
+        """
+        super().resume()
+        if self.parent.variables['camera'] is not None:
+            bits_depth = self.parent.variables['bits_depth']
+            if bits_depth is not None:
+                self.top_left.set_bits_depth(int(bits_depth))
+                self.bot_left.set_bits_depth(int(bits_depth))
+            self.start_live()
+
+    def cleanup(self):
+        """
+        Unsubscribe from the acquisition service.
+        The camera is closed by the service when no module needs it.
+        """
+        self.parent.acquisition.unsubscribe(self)
 
@@ -1,8 +1,254 @@
 
 import os
+import time
+import json
+import hashlib
+import threading
+from collections import deque
+from contextlib import contextmanager
 import numpy as np
 from pypylon import pylon, genicam
 import cv2
+from lensepy_app.appli._app.app_utils import get_cache_dir
+
+GRAB_STRATEGIES = {
+    'latest': pylon.GrabStrategy_LatestImageOnly,   # Live display, only the last frame is kept
+    'one_by_one': pylon.GrabStrategy_OneByOne,      # All the frames, in the acquisition order
+}
+DEFAULT_BUFFERS_NUMBER = 10     # Size of the buffer pool of the stream
+GRAB_TIMEOUT = 1000             # Maximum waiting time of a frame, in ms
+
+# Writing order of the parameters in a batch (parameters changing the range of others first)
+PARAMETERS_ORDER = ['PixelFormat', 'BinningHorizontal', 'BinningVertical',
+                    'DecimationHorizontal', 'DecimationVertical',
+                    'Width', 'Height', 'OffsetX', 'OffsetY',
+                    'ExposureAuto', 'ExposureTime', 'GainAuto', 'Gain', 'BlackLevel',
+                    'AcquisitionFrameRateEnable', 'AcquisitionFrameRate',
+                    'TriggerSelector', 'TriggerMode', 'TriggerSource', 'TriggerActivation', 'TriggerDelay']
+# ROI axes : offset, size and maximum size (sensor) parameters
+ROI_AXES = [('OffsetX', 'Width', 'WidthMax'), ('OffsetY', 'Height', 'HeightMax')]
+NODES_CACHE_VERSION = 1     # Version of the node map cache files
+# Trigger of the frames : free-run, software command or hardware line
+TRIGGER_MODES = ['off', 'software', 'hardware']
+TRIGGER_READY_TIMEOUT = 1000    # Maximum waiting time of the trigger ready state, in ms
+
+# Demosaicing of the Bayer frames
+DEMOSAIC_MODES = ['bilinear',   # Full resolution RGB, bilinear interpolation
+                  'ea',         # Full resolution RGB, edge-aware interpolation
+                  'half',       # Half resolution RGB, one pixel per 2x2 cell (fast preview)
+                  'gray',       # Full resolution luminance (analyses without colors)
+                  'raw']        # Raw Bayer frame
+# OpenCV names the pattern from the second row of the sensor : GenICam pattern -> OpenCV pattern
+OPENCV_BAYER_PATTERNS = {'RG': 'BG', 'BG': 'RG', 'GR': 'GB', 'GB': 'GR'}
+# Positions (row, column) of the red pixel, the blue pixel and the two green pixels in a 2x2 cell
+BAYER_CELLS = {'RG': ((0, 0), (1, 1), (0, 1), (1, 0)), 'BG': ((1, 1), (0, 0), (0, 1), (1, 0)),
+               'GR': ((0, 1), (1, 0), (0, 0), (1, 1)), 'GB': ((1, 0), (0, 1), (0, 0), (1, 1))}
+
+
+def read_parameters_file(filepath: str) -> dict:
+    """
+    Read camera parameters from a file.
+    The txt file should have the following format:
+    # comment
+    key_1;value1;type1
+    key_2;value2;type2
+    :param filepath:    Name of the txt file.
+    :return:    Dictionary of the values, by parameter name.
+    """
+    params = {}
+    # Read the CSV file, ignoring lines starting with '#'
+    data = np.genfromtxt(filepath, delimiter=';', dtype=str, comments='#', encoding='UTF-8')
+    # Populate the dictionary with key-value pairs from the CSV file
+    for key, value, typ in np.atleast_2d(data):
+        match typ.strip():
+            case 'I':
+                params[key.strip()] = int(value.strip())
+            case 'F':
+                params[key.strip()] = float(value.strip())
+            case 'B':
+                params[key.strip()] = value.strip() == "True"
+            case _:
+                params[key.strip()] = value.strip()
+    return params
+
+# Packed pixel formats : pylon pixel type -> (bits per pixel, packing)
+# 'p' (GenICam) : bit stream, least significant bits first (Mono12p : 2 pixels in 3 bytes, Mono10p : 4 in 5)
+# 'packed' (GigE Vision legacy) : 2 pixels in 3 bytes, most significant bits in the first and last bytes
+PACKED_PIXEL_TYPES = {}
+for _name in dir(pylon):
+    if _name.startswith(('PixelType_Mono', 'PixelType_Bayer')):
+        for _bits in [10, 12]:
+            if _name.endswith(f'{_bits}p'):
+                PACKED_PIXEL_TYPES[getattr(pylon, _name)] = (_bits, 'p')
+            elif _name.lower().endswith(f'{_bits}packed'):
+                PACKED_PIXEL_TYPES[getattr(pylon, _name)] = (_bits, 'packed')
+
+
+def get_packed_format(pixel_format: str, available_formats: list):
+    """
+    Get the packed equivalent of a pixel format (Mono12 -> Mono12p).
+    :param pixel_format:        Pixel format (unpacked).
+    :param available_formats:   Pixel formats of the camera.
+    :return:    Packed pixel format, or the pixel format if no packed equivalent is available.
+    """
+    for suffix in ['p', 'Packed', 'packed']:
+        if f'{pixel_format}{suffix}' in available_formats:
+            return f'{pixel_format}{suffix}'
+    return pixel_format
+
+
+def get_unpacked_format(pixel_format: str) -> str:
+    """
+    Get the unpacked equivalent of a pixel format (Mono12p -> Mono12).
+    :param pixel_format:    Pixel format.
+    :return:    Unpacked pixel format.
+    """
+    for suffix in ['10p', '12p', '10Packed', '12Packed', '10packed', '12packed']:
+        if pixel_format.endswith(suffix):
+            return pixel_format[:-len(suffix)] + suffix[:2]
+    return pixel_format
+
+
+def unpack_pixels(data: np.ndarray, bits: int, packing: str = 'p', out: np.ndarray = None) -> np.ndarray:
+    """
+    Unpack 10 or 12 bits packed pixels to 16 bits pixels (vectorized).
+    :param data:    Packed pixels (1D-array of uint8).
+    :param bits:    Number of bits per pixel (10 or 12).
+    :param packing: 'p' (GenICam Mono10p / Mono12p) or 'packed' (GigE Vision Mono10packed / Mono12packed).
+    :param out:     Array of uint16 to write the pixels into (its size is the number of pixels),
+        None to unpack all the data in a new 1D-array.
+    :return:    Array of uint16.
+    """
+    pixels, nbytes = (4, 5) if packing == 'p' and bits == 10 else (2, 3)
+    if out is None:
+        out = np.empty(data.size // nbytes * pixels, dtype=np.uint16)
+    flat = out.reshape(-1)
+    groups = flat.size // pixels
+    if groups * pixels != flat.size:
+        # Incomplete last group : unpacked in a temporary array
+        padded = np.zeros((groups + 1) * nbytes, dtype=np.uint8)
+        size = min(data.size, padded.size)
+        padded[:size] = data[:size]
+        flat[:] = unpack_pixels(padded, bits, packing)[:flat.size]
+        return out
+    b = data[:groups * nbytes].reshape(groups, nbytes)
+    o = flat.reshape(groups, pixels)
+    if packing == 'p':
+        # Bit stream, least significant bits first
+        for k in range(pixels):
+            start = k * bits
+            column = o[:, k]
+            np.right_shift(b[:, start // 8], start % 8, out=column, dtype=np.uint16)
+            for i in range(start // 8 + 1, (start + bits - 1) // 8 + 1):
+                column |= np.left_shift(b[:, i], i * 8 - start, dtype=np.uint16)
+            column &= (1 << bits) - 1
+    else:
+        # Most significant bits in bytes 0 and 2, least significant bits of both pixels in byte 1
+        low_bits = bits - 8
+        np.left_shift(b[:, 0], low_bits, out=o[:, 0], dtype=np.uint16)
+        o[:, 0] |= b[:, 1] & ((1 << low_bits) - 1)
+        np.left_shift(b[:, 2], low_bits, out=o[:, 1], dtype=np.uint16)
+        o[:, 1] |= (b[:, 1] >> 4) & ((1 << low_bits) - 1)
+    return out
+
+
+def get_bayer_pattern(pixel_format: str):
+    """
+    Get the Bayer pattern of a pixel format.
+    :param pixel_format:    Pixel format of the camera (BayerRG8, BayerBG12...).
+    :return:    Pattern ('RG', 'BG', 'GR' or 'GB'), None if the format is not a Bayer format.
+    """
+    if pixel_format is None or not pixel_format.startswith('Bayer'):
+        return None
+    pattern = pixel_format[5:7]
+    return pattern if pattern in BAYER_CELLS else None
+
+
+def demosaic(raw: np.ndarray, pattern: str, mode: str = 'bilinear', out: np.ndarray = None) -> np.ndarray:
+    """
+    Demosaic a raw Bayer frame.
+    :param raw:         Raw frame (2D-array).
+    :param pattern:     Bayer pattern of the sensor (see get_bayer_pattern).
+    :param mode:        Demosaicing mode (see DEMOSAIC_MODES).
+    :param out:         Array to write the result into (see get_demosaic_shape), None to allocate a new array.
+    :return:    RGB image, luminance image or raw frame (mode 'raw').
+    """
+    if mode == 'raw':
+        return raw
+    if mode == 'half':
+        (ry, rx), (by, bx), (g1y, g1x), (g2y, g2x) = BAYER_CELLS[pattern]
+        h, w = raw.shape[0] // 2 * 2, raw.shape[1] // 2 * 2
+        if out is None:
+            out = np.empty((h // 2, w // 2, 3), dtype=raw.dtype)
+        out[..., 0] = raw[ry:h:2, rx:w:2]
+        out[..., 2] = raw[by:h:2, bx:w:2]
+        # Mean of the two green pixels, (g1 + g2) // 2 without overflow
+        g1, g2 = raw[g1y:h:2, g1x:w:2], raw[g2y:h:2, g2x:w:2]
+        np.right_shift(g1, 1, out=out[..., 1])
+        out[..., 1] += g2 >> 1
+        out[..., 1] += g1 & g2 & 1
+        return out
+    cv_pattern = OPENCV_BAYER_PATTERNS[pattern]
+    match mode:
+        case 'ea':
+            code = getattr(cv2, f'COLOR_Bayer{cv_pattern}2RGB_EA')
+        case 'gray':
+            code = getattr(cv2, f'COLOR_Bayer{cv_pattern}2GRAY')
+        case _:
+            code = getattr(cv2, f'COLOR_Bayer{cv_pattern}2RGB')
+    if out is None:
+        return cv2.cvtColor(raw, code)
+    cv2.cvtColor(raw, code, dst=out)
+    return out
+
+
+def get_demosaic_shape(shape: tuple, mode: str) -> tuple:
+    """
+    Get the shape of a demosaiced frame.
+    :param shape:   Shape of the raw frame.
+    :param mode:    Demosaicing mode (see DEMOSAIC_MODES).
+    :return:    Shape of the result of demosaic.
+    """
+    h, w = shape[:2]
+    match mode:
+        case 'half':
+            return h // 2, w // 2, 3
+        case 'gray' | 'raw':
+            return h, w
+        case _:
+            return h, w, 3
+
+
+def get_node_info(node) -> dict:
+    """
+    Get the description of a node of the node map : type, access mode and range.
+    :param node:    Node of the node map (pypylon parameter).
+    :return:    Dictionary of the description ('type', 'access', 'min', 'max', 'inc', 'symbolics').
+    """
+    info = {'type': type(node).__name__.replace('Parameter', ''),
+            'access': int(node.GetAccessMode()) if hasattr(node, 'GetAccessMode') else None}
+    if not genicam.IsReadable(node):
+        return info
+    for key, method in [('min', 'GetMin'), ('max', 'GetMax'), ('inc', 'GetInc')]:
+        try:
+            if hasattr(node, method):
+                info[key] = getattr(node, method)()
+        except Exception:
+            pass
+    if hasattr(node, 'Symbolics'):
+        info['symbolics'] = list(node.Symbolics)
+    return info
+
+
+def enumerate_cameras() -> list:
+    """
+    List the Basler cameras connected to the computer.
+    :return:    List of dictionaries : index, serial (serial number), model, name (user-friendly name).
+    """
+    devices = pylon.TlFactory.GetInstance().EnumerateDevices()
+    return [{'index': index, 'serial': device.GetSerialNumber(), 'model': device.GetModelName(),
+             'name': device.GetFriendlyName()} for index, device in enumerate(devices)]
+
 
 def init_first_camera(filename: str = ""):
     """
@@ -23,6 +269,8 @@ class BaslerCamera:
     Class to manage Basler camera.
     """
 
+    get_image_blocks = True     # get_image waits for the next frame of the stream
+
     def __init__(self):
         """
         Basler Camera constructor.
@@ -31,9 +279,31 @@ class BaslerCamera:
         self.camera_device = None
         self.camera_nodemap = None
         self.opened = False
-        self.camera_acquiring = False
+        self.remote = False         # True while the device is driven by an acquisition process (not accessed)
+        self._acquiring = False
+        self.grab_strategy = 'latest'
+        self.buffers_number = DEFAULT_BUFFERS_NUMBER
         self.list_params = {}
         self.initial_params = {}
+        self.presets = {}           # Named sets of parameters
+        self.failed_parameters = [] # Parameters not set by the last call of set_parameters
+        self._session_depth = 0     # Number of opened parameter sessions
+        self._cache = {}            # Values of the parameters read during the session
+        self._lock = threading.RLock()  # Access to the device (background refresh of the node map)
+        self.nodes_info = {}        # Description of the accessible parameters (see get_node_info)
+        self.refresh_thread = None
+        self._refresh_pending = False   # Background refresh waiting for the next opening of the camera
+        self.frame_pool = None      # FramePool of the frames (set by the acquisition), None to allocate each frame
+        self.demosaic_mode = 'bilinear'
+        self.packed_transfer = False        # True to transfer 10/12 bits formats as packed pixels
+        self.unpack_buffer = None           # Unpacked frame before demosaicing
+        self.deferred_processing = False    # True if get_image returns raw frames (see process_frame)
+        self.last_timestamp = 0     # Timestamp of the last frame, set by the camera (ticks)
+        self.trigger_mode = 'off'
+        self.trigger_params = {}        # Trigger parameters, written again at each opening of the camera
+        self.trigger_events = deque()   # Event IDs of the triggers waiting for their frame
+        self.trigger_count = 0          # Triggered frames received since the trigger mode was set
+        self.last_event_id = None       # Event ID of the trigger of the last frame (None in free-run)
         # Converter
         self.converter = pylon.ImageFormatConverter()
 
@@ -41,78 +311,355 @@ class BaslerCamera:
     def is_open(self):
         return self.opened and self.camera_device is not None and self.camera_device.IsOpen()
 
+    @property
+    def is_streaming(self) -> bool:
+        """True if the camera is grabbing frames continuously."""
+        return self.camera_device is not None and self.camera_device.IsGrabbing()
+
+    @property
+    def camera_acquiring(self) -> bool:
+        """True if frames can be retrieved by get_image."""
+        return self._acquiring
+
+    @camera_acquiring.setter
+    def camera_acquiring(self, value: bool):
+        """
+        Start / stop the acquisition. The stream is stopped at the end of the acquisition.
+        :param value:   True to acquire frames.
+        """
+        self._acquiring = value
+        if not value:
+            self.stop_streaming()
+
     def find_first_camera(self) -> bool:
         """
+        Connect to the first camera, or to the camera of the DeviceSerialNumber parameter if it is set
+        (copy of a camera in an acquisition process).
+        :return:    True if a camera was found.
+        """
+        return self.find_camera(self.initial_params.get('DeviceSerialNumber'))
 
-        :return:
+    def find_camera(self, serial: str = None, index: int = 0) -> bool:
+        """
+        Connect to a camera, selected by its serial number or by its index (see enumerate_cameras).
+        The serial number of the camera is stored in initial_params (DeviceSerialNumber).
+        :param serial:  Serial number of the camera, None to select the camera by its index.
+        :param index:   Index of the camera in the list of the connected cameras.
+        :return:    True if the camera was found.
         """
         tl_factory = pylon.TlFactory.GetInstance()
         devices = tl_factory.EnumerateDevices()
+        if serial is not None:
+            devices = [device for device in devices if device.GetSerialNumber() == str(serial)]
+            index = 0
+        # Check if the camera is available.
+        if index >= len(devices):
+            return False
+        # Create an instance of a Basler Camera (using pypylon wrapper).
+        self.camera_device = pylon.InstantCamera(tl_factory.CreateDevice(devices[index]))
+        self.camera_nodemap = self.camera_device.GetNodeMap()
+        self._list_parameters()
+        self.initial_params['DeviceSerialNumber'] = devices[index].GetSerialNumber()
+        return True
+
+    def set_grab_strategy(self, strategy: str = 'latest', buffers_number: int = DEFAULT_BUFFERS_NUMBER):
+        """
+        Set the grab strategy of the stream (applied at the next start of the stream).
+        :param strategy:        'latest' (only the last frame is kept) or 'one_by_one' (all the frames).
+        :param buffers_number:  Size of the buffer pool.
+        """
+        if strategy in GRAB_STRATEGIES:
+            self.grab_strategy = strategy
+        else:
+            print(f'Unknown grab strategy {strategy}')
+        self.buffers_number = int(buffers_number)
+
+    def set_demosaic_mode(self, mode: str = 'bilinear'):
+        """
+        Set the demosaicing of the Bayer frames.
+        :param mode:    'bilinear', 'ea' (edge-aware), 'half' (half resolution), 'gray' (luminance) or 'raw'.
+        """
+        if mode in DEMOSAIC_MODES:
+            self.demosaic_mode = mode
+        else:
+            print(f'Unknown demosaic mode {mode}')
 
-        # Check if almost one camera is available.
-        if not devices:
+    def set_packed_transfer(self, value: bool = True):
+        """
+        Transfer the 10/12 bits pixel formats as packed pixels (Mono12 -> Mono12p), if the camera supports it.
+        The frames are unpacked to 16 bits arrays, and the pixel format is still read as the unpacked format.
+        Applied at the next setting of the pixel format.
+        :param value:   True to use the packed formats.
+        """
+        self.packed_transfer = value
+
+    def set_trigger_mode(self, mode: str = 'off', source: str = 'Line1', activation: str = 'RisingEdge',
+                         delay: float = 0.0) -> bool:
+        """
+        Set the trigger of the frames (FrameStart trigger of the camera).
+        In software mode, each frame is triggered by the trigger method. In hardware mode, each frame
+        is triggered by an edge on an input line. The stream is stopped : frames of the previous mode
+        are discarded, and in trigger mode all the frames are kept in the acquisition order.
+        The trigger is disabled by pylon at the opening of the camera : it is set again by open.
+        :param mode:        'off' (free-run), 'software' or 'hardware'.
+        :param source:      Input line of the hardware trigger (Line1, Line2...).
+        :param activation:  Activation of the hardware trigger (RisingEdge, FallingEdge, AnyEdge...).
+        :param delay:       Delay between the trigger and the start of the exposure, in us.
+        :return:    True if the trigger mode was set.
+        """
+        if mode not in TRIGGER_MODES:
+            print(f'Unknown trigger mode {mode}')
+            return False
+        if self.camera_device is None or self.remote:
             return False
+        params = {'TriggerSelector': 'FrameStart', 'TriggerMode': 'Off' if mode == 'off' else 'On'}
+        if mode == 'software':
+            params['TriggerSource'] = 'Software'
+        elif mode == 'hardware':
+            params.update({'TriggerSource': source, 'TriggerActivation': activation})
+        if mode != 'off' and 'TriggerDelay' in self.list_params:
+            params['TriggerDelay'] = float(delay)
+        with self.session():
+            self.stop_streaming()
+            if not self.set_parameters(params):
+                print(f'Trigger mode {mode} not available')
+                return False
+        self.trigger_mode = mode
+        self.trigger_params = params if mode != 'off' else {}
+        self.trigger_events.clear()
+        self.trigger_count = 0
+        self.last_event_id = None
+        return True
+
+    def trigger(self, event_id=None):
+        """
+        Trigger a frame (software trigger) or register the event of the next hardware trigger.
+        The event ID is associated with the next frame of the stream (last_event_id after get_image).
+        :param event_id:    ID of the event (step of a sequence...), None for the number of the trigger.
+        :return:    Event ID, None if the camera is not in trigger mode or not ready.
+        """
+        if self.trigger_mode == 'off' or self.camera_device is None:
+            return None
+        if event_id is None:
+            event_id = self.trigger_count + len(self.trigger_events) + 1
+        if self.trigger_mode == 'software':
+            if not self.is_streaming:
+                self.start_streaming()
+            if not self.camera_device.WaitForFrameTriggerReady(TRIGGER_READY_TIMEOUT,
+                                                               pylon.TimeoutHandling_Return):
+                print('Camera not ready for a trigger')
+                return None
+            self.trigger_events.append(event_id)
+            self.camera_device.ExecuteSoftwareTrigger()
         else:
-            # Create an instance of a Basler Camera (using pypylon wrapper).
-            self.camera_device = pylon.InstantCamera(tl_factory.CreateDevice(devices[0]))
-            self.camera_nodemap = self.camera_device.GetNodeMap()
-            self._list_parameters()
-            # self.init_camera_parameters('./config/camera.ini')
-            return True
+            self.trigger_events.append(event_id)
+        return event_id
+
+    def get_triggered_image(self, event_id=None, timeout: float = GRAB_TIMEOUT / 1000):
+        """
+        Trigger a frame (software mode) and wait for it. Frames of previous triggers are skipped.
+        :param event_id:    ID of the event, None for the number of the trigger.
+        :param timeout:     Maximum waiting time of the frame, in s.
+        :return:    (event ID, frame), frame is None if no frame of the trigger was received.
+        """
+        self.camera_acquiring = True
+        event_id = self.trigger(event_id)
+        if event_id is None:
+            return None, None
+        t_end = time.perf_counter() + timeout
+        while time.perf_counter() < t_end:
+            image = self.get_image()
+            if image is not None and self.last_event_id == event_id:
+                return event_id, image
+        # Frame lost : the event is not associated with a next frame
+        if event_id in self.trigger_events:
+            self.trigger_events.remove(event_id)
+        return event_id, None
+
+    def start_streaming(self):
+        """
+        Start grabbing frames continuously (buffer pool filled by the camera driver).
+        In trigger mode, all the frames are kept (one by one strategy).
+        """
+        if self.camera_device is None or self.is_streaming:
+            return
+        self.open()
+        strategy = self.grab_strategy if self.trigger_mode == 'off' else 'one_by_one'
+        self.camera_device.MaxNumBuffer.SetValue(self.buffers_number)
+        self.camera_device.StartGrabbing(GRAB_STRATEGIES[strategy])
+
+    def stop_streaming(self):
+        """
+        Stop grabbing frames. The camera stays opened.
+        """
+        if self.is_streaming:
+            self.camera_device.StopGrabbing()
 
     def get_image(self):
         """
         Get image from the camera.
-        :return:    Array containing the image.
+        The stream is started at the first call and the next frame is taken from the buffer pool.
+        :return:    Array containing the image, None if no frame was received.
         """
         if self.camera_acquiring:
-            # Test if the camera is opened
-            if not self.is_open:
-                self.open()
-            # Test if the camera is grabbing images
-            if not self.camera_device.IsGrabbing():
-                self.camera_device.StopGrabbing()
-            # Create a list of images
-            self.camera_device.StartGrabbingMax(1)
-            grab_result = self.camera_device.RetrieveResult(100000, pylon.TimeoutHandling_ThrowException)
-            if grab_result.GrabSucceeded():
-                image = grab_result.Array
-            else:
-                image = None
-
-            # Free memory
-            grab_result.Release()
-            if image is not None and image.size > 0:
-                if 'PixelFormat' in self.initial_params:
-                    pixel_format = self.initial_params['PixelFormat']
-                    if "Bayer" in pixel_format:
-                        image = cv2.cvtColor(image, cv2.COLOR_BayerBG2RGB)
-            return image
+            if not self.is_streaming:
+                self.start_streaming()
+            grab_result = self.camera_device.RetrieveResult(GRAB_TIMEOUT, pylon.TimeoutHandling_Return)
+            if grab_result is None or not grab_result.IsValid():
+                return None
+            try:
+                if not grab_result.GrabSucceeded():
+                    return None
+                self.last_timestamp = grab_result.TimeStamp
+                if self.trigger_mode != 'off':
+                    self.trigger_count += 1
+                    self.last_event_id = (self.trigger_events.popleft() if self.trigger_events
+                                          else self.trigger_count)
+                packing = PACKED_PIXEL_TYPES.get(grab_result.GetPixelType())
+                if packing is not None:
+                    return self._unpack_frame(grab_result, *packing)
+                with grab_result.GetArrayZeroCopy() as raw:
+                    if raw.size == 0:
+                        return None
+                    return self._convert_frame(raw)
+            finally:
+                # Buffer returned to the pool of the driver
+                grab_result.Release()
         return None
 
+    def _convert_frame(self, raw: np.ndarray) -> np.ndarray:
+        """
+        Copy (or demosaic) the buffer of a grab result to a new frame.
+        With a frame pool, the frame is written in a preallocated buffer (read-only view).
+        With deferred processing, the raw frame is returned (see process_frame).
+        :param raw:     Array of the grab result (buffer of the driver).
+        :return:    Frame.
+        """
+        if (not self.deferred_processing and self.demosaic_mode != 'raw'
+                and self._get_bayer_pattern() is not None):
+            return self.process_frame(raw, self.frame_pool)
+        if self.frame_pool is None:
+            return raw.copy()
+        buffer = self.frame_pool.acquire(raw.shape, raw.dtype)
+        np.copyto(buffer, raw)
+        return self.frame_pool.borrow(buffer)
+
+    def _unpack_frame(self, grab_result, bits: int, packing: str) -> np.ndarray:
+        """
+        Unpack the buffer of a grab result in a packed pixel format (Mono12p...) to a 16 bits frame.
+        The frame is unpacked in the frame pool, or in an intermediate buffer before demosaicing.
+        :param grab_result: Grab result.
+        :param bits:        Number of bits per pixel.
+        :param packing:     Packing of the pixels (see unpack_pixels).
+        :return:    Frame.
+        """
+        shape = (grab_result.GetHeight(), grab_result.GetWidth())
+        direct = self.deferred_processing or self._get_bayer_pattern() is None
+        if direct and self.frame_pool is not None:
+            buffer = self.frame_pool.acquire(shape, np.uint16)
+        elif direct or self.frame_pool is None:
+            buffer = np.empty(shape, dtype=np.uint16)
+        else:
+            if self.unpack_buffer is None or self.unpack_buffer.shape != shape:
+                self.unpack_buffer = np.empty(shape, dtype=np.uint16)
+            buffer = self.unpack_buffer
+        memory = grab_result.GetImageMemoryView()
+        data = np.frombuffer(memory, dtype=np.uint8)
+        unpack_pixels(data, bits, packing, out=buffer)
+        # No reference to the buffer of the driver is kept
+        del data
+        memory.release()
+        if not direct:
+            return self._convert_frame(buffer)
+        return self.frame_pool.borrow(buffer) if self.frame_pool is not None else buffer
+
+    def process_frame(self, raw: np.ndarray, frame_pool=None) -> np.ndarray:
+        """
+        Convert a raw frame to an image, depending on the pixel format (demosaicing of the Bayer frames).
+        Called by get_image, or by a processing stage of the acquisition (deferred processing).
+        :param raw:         Raw frame.
+        :param frame_pool:  FramePool of the images, None to allocate a new array.
+        :return:    Image (the raw frame for monochrome formats and in 'raw' demosaic mode).
+        """
+        pattern = self._get_bayer_pattern()
+        if pattern is None or self.demosaic_mode == 'raw':
+            return raw
+        if frame_pool is None:
+            return demosaic(raw, pattern, self.demosaic_mode)
+        buffer = frame_pool.acquire(get_demosaic_shape(raw.shape, self.demosaic_mode), raw.dtype)
+        demosaic(raw, pattern, self.demosaic_mode, out=buffer)
+        return frame_pool.borrow(buffer)
+
+    def _get_bayer_pattern(self):
+        """Bayer pattern of the current pixel format, None for a monochrome format."""
+        return get_bayer_pattern(self.initial_params.get('PixelFormat'))
+
     def disconnect(self):
         """
         Disconnect the camera.
         """
+        self.stop_streaming()
         self.camera_device = None
 
     def open(self):
         """
         Open camera.
+        A background refresh of the parameters deferred while the camera was closed is started.
+        The device is not opened while it is driven by an acquisition process (remote).
         """
-        if self.camera_device is not None:
-            if not self.opened:
-                self.camera_device.Open()
-                self.opened = True
+        if self.remote:
+            return
+        with self._lock:
+            if self.camera_device is not None:
+                if not self.opened:
+                    self.camera_device.Open()
+                    self.opened = True
+                    for name, value in self.trigger_params.items():
+                        node = self.camera_nodemap.GetNode(name)
+                        if genicam.IsWritable(node):
+                            node.SetValue(value)
+                    if self._refresh_pending:
+                        self.refresh_parameters(background=True)
 
     def close(self):
         """
-        Open camera.
+        Close camera.
+        The camera is kept opened during a parameter session, and while it is streaming
+        (parameters accessed during the acquisition).
         """
-        if self.camera_device is not None:
-            if self.opened:
-                self.camera_device.Close()
-                self.opened = False
+        with self._lock:
+            if self.camera_device is not None:
+                if self.opened:
+                    if self._session_depth > 0 or (self.camera_acquiring and self.is_streaming):
+                        return
+                    self.stop_streaming()
+                    self.camera_device.Close()
+                    self.opened = False
+
+    @contextmanager
+    def session(self):
+        """
+        Parameter session : the camera is kept opened and the values of the parameters
+        are cached until the end of the session (the cache is cleared at each write).
+            with camera.session():
+                w = camera.get_parameter('Width')
+                camera.set_parameters({'Width': 640, 'OffsetX': 32})
+        While the device is driven by an acquisition process (remote), the values are the last ones
+        received from the acquisition process (initial_params), and the parameters can not be set.
+        """
+        if self.remote:
+            yield self
+            return
+        with self._lock:
+            self.open()
+            self._session_depth += 1
+            try:
+                yield self
+            finally:
+                self._session_depth -= 1
+                if self._session_depth == 0:
+                    self._cache = {}
+                    self.close()
 
     def init_camera_parameters(self, filepath: str):
         """
@@ -124,48 +671,118 @@ class BaslerCamera:
 
         :param filepath:    Name of a txt file containing the parameters to setup.
         """
-        self.open()
         print('INIT CAM - file')
-        self.initial_params = {}
+        serial = self.initial_params.get('DeviceSerialNumber')
+        self.initial_params = {} if serial is None else {'DeviceSerialNumber': serial}
         if os.path.exists(filepath):
-            # Read the CSV file, ignoring lines starting with '//'
-            data = np.genfromtxt(filepath, delimiter=';',
-                                 dtype=str, comments='#', encoding='UTF-8')
-            # Populate the dictionary with key-value pairs from the CSV file
-            for key, value, typ in data:
-                match typ:
-                    case 'I':
-                        self.initial_params[key.strip()] = int(value.strip())
-                    case 'F':
-                        self.initial_params[key.strip()] = float(value.strip())
-                    case 'B':
-                        self.initial_params[key.strip()] = value.strip() == "True"
-                    case _:
-                        self.initial_params[key.strip()] = value.strip()
-                self.set_parameter(key, self.initial_params[key.strip()])
+            params = read_parameters_file(filepath)
+            self.initial_params.update(params)
+            # Parameters of other camera models are skipped
+            self.set_parameters({name: value for name, value in params.items() if name in self.list_params})
         else:
             print('File error')
-        self.close()
 
     def _list_parameters(self):
         """
         Update the list of accessible parameters of the camera.
+        The description of the node map is read from the cache file of the camera model if it exists,
+        and refreshed in background (the enumeration of the nodes is slow on a real device).
         """
-        self.open()
-        self.list_params = [x for x in dir(self.camera_device) if not x.startswith("__")]
+        nodes_info = self._load_nodes_cache()
+        if nodes_info is None:
+            self.refresh_parameters()
+        else:
+            self.nodes_info = nodes_info
+            self.list_params = list(nodes_info)
+            self.refresh_parameters(background=True)
 
-        for attr in self.list_params:
-            try:
-                node = self.camera_nodemap.GetNode(attr)
-                if hasattr(node, "GetValue"):
-                    pass
-                elif hasattr(node, "Execute"):
-                    self.list_params.remove(attr)
-                else:
-                    self.list_params.remove(attr)
-            except Exception as e:
-                self.list_params.remove(attr)
-        self.close()
+    def refresh_parameters(self, background: bool = False):
+        """
+        Enumerate the accessible parameters of the camera and update the cache file.
+        The background refresh never opens the camera : it is deferred to the next opening
+        if the camera is closed.
+        :param background:  True to enumerate the parameters in a separate thread.
+        """
+        if background:
+            with self._lock:
+                if self.refresh_thread is not None and self.refresh_thread.is_alive():
+                    return
+                self._refresh_pending = not self.is_open
+                if self._refresh_pending:
+                    return
+                self.refresh_thread = threading.Thread(target=self._enumerate_parameters, args=(True,),
+                                                       daemon=True)
+                self.refresh_thread.start()
+        else:
+            with self.session():
+                self._enumerate_parameters()
+
+    def _enumerate_parameters(self, background: bool = False):
+        """
+        Read the description of the accessible parameters of the camera (readable nodes).
+        In background, the device is locked for each node only : the GUI thread is not blocked
+        by the enumeration, and the enumeration is deferred again if the camera is closed meanwhile.
+        :param background:  True if called by the refresh thread.
+        """
+        nodes_info = {}
+        try:
+            for attr in dir(self.camera_device):
+                if attr.startswith("__"):
+                    continue
+                with self._lock:
+                    if background and not self.is_open:
+                        self._refresh_pending = True
+                        return
+                    try:
+                        node = self.camera_nodemap.GetNode(attr)
+                        if hasattr(node, "GetValue"):
+                            nodes_info[attr] = get_node_info(node)
+                    except Exception:
+                        pass
+        except Exception as e:
+            print(f'Node map enumeration error: {e}')
+            return
+        with self._lock:
+            self.list_params = list(nodes_info)
+            changed = nodes_info != self.nodes_info
+            self.nodes_info = nodes_info
+        if changed:
+            self._save_nodes_cache()
+
+    def _get_nodes_cache_file(self):
+        """
+        Get the cache file of the node map, keyed by camera model, serial number and device version.
+        :return:    Path of the cache file, None if no camera.
+        """
+        if self.camera_device is None:
+            return None
+        device_info = self.camera_device.GetDeviceInfo()
+        key = f'{device_info.GetModelName()}|{device_info.GetSerialNumber()}|{device_info.GetDeviceVersion()}'
+        key = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(get_cache_dir('cameras'), f'basler_{key}.json')
+
+    def _load_nodes_cache(self):
+        """
+        Load the description of the node map from the cache file.
+        :return:    Dictionary of the nodes description, None if no valid cache file.
+        """
+        try:
+            with open(self._get_nodes_cache_file(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, TypeError, ValueError):
+            return None
+        if data.get('version') != NODES_CACHE_VERSION:
+            return None
+        return data.get('nodes')
+
+    def _save_nodes_cache(self):
+        """Store the description of the node map in the cache file."""
+        data = {'version': NODES_CACHE_VERSION, 'nodes': self.nodes_info}
+        try:
+            with open(self._get_nodes_cache_file(), 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1)
+        except (OSError, TypeError) as e:
+            print(f'Node map cache error: {e}')
 
     def get_list_parameters(self) -> list:
         """
@@ -174,26 +791,54 @@ class BaslerCamera:
         """
         return self.list_params
 
+    def get_parameter_info(self, param) -> dict:
+        """
+        Get the description of a camera parameter (type, access mode and range).
+        The range is the one read at the enumeration of the node map : it can depend on other parameters.
+        :param param:   Name of the parameter.
+        :return:    Dictionary of the description (see get_node_info), None if the parameter does not exist.
+        """
+        return self.nodes_info.get(param)
+
     def get_parameter(self, param):
         """
         Get the value of a camera parameter.
         The accessibility of the parameter is verified beforehand.
+        During a session, the value is read from the camera only once.
         :param param:   Name of the parameter.
         :return:        Value of the parameter if exists, else None.
         """
+        if self.remote:
+            return self.initial_params.get(param)
         if param in self.list_params:
-            self.open()
-            node = self.camera_nodemap.GetNode(param)
-            if hasattr(node, "GetValue"):
-                node_value = node.GetValue()
-                self.close()
-                return node_value
-            else:
-                self.close()
-                return None
+            if param in self._cache:
+                return self._cache[param]
+            with self.session():
+                node = self.camera_nodemap.GetNode(param)
+                if hasattr(node, "GetValue"):
+                    node_value = node.GetValue()
+                    if param == 'PixelFormat' and self.packed_transfer:
+                        node_value = get_unpacked_format(node_value)
+                    if self._session_depth > 1:
+                        self._cache[param] = node_value
+                    return node_value
+                else:
+                    return None
         else:
             return None
 
+    def is_writable(self, param) -> bool:
+        """
+        Check if a camera parameter can be set in the current state of the camera
+        (some parameters are locked while the camera is streaming, as PixelFormat or Width).
+        :param param:   Name of the parameter.
+        :return:    True if the parameter is writable.
+        """
+        if param not in self.list_params or self.remote:
+            return False
+        with self.session():
+            return genicam.IsWritable(self.camera_nodemap.GetNode(param))
+
     def set_parameter(self, param, value):
         """
         Set a camera parameter to a specific value.
@@ -201,27 +846,124 @@ class BaslerCamera:
         :param param:   Name of the parameter.
         :param value:   Value to give to the parameter.
         """
+        if self.remote:
+            print(f'Parameter {param} not set - camera driven by the acquisition process')
+            return False
         if param in self.list_params:
-            self.open()
-            node = self.camera_nodemap.GetNode(param)
-            try:
-                if hasattr(node, "GetAccessMode") and node.GetAccessMode() == genicam.RW:
-                    if hasattr(node, "SetValue"):
-                        node.SetValue(value)
-                        self.initial_params[param] = value
-                        self.close()
-                        return True
+            with self.session():
+                node = self.camera_nodemap.GetNode(param)
+                try:
+                    if hasattr(node, "GetAccessMode") and node.GetAccessMode() == genicam.RW:
+                        if hasattr(node, "SetValue"):
+                            # A value can change the range or the value of other parameters
+                            self._cache = {}
+                            if param == 'PixelFormat' and self.packed_transfer:
+                                node.SetValue(get_packed_format(value, list(node.Symbolics)))
+                            else:
+                                node.SetValue(value)
+                            self.initial_params[param] = value
+                            return True
+                        else:
+                            print(f"Node {param} has no SetValue()")
                     else:
-                        print(f"Node {param} has no SetValue()")
-                else:
-                    print(f"Node {param} not writable or invalid access mode")
-            except Exception as e:
-                print(f"Error setting parameter {param}: {e}")
+                        print(f"Node {param} not writable or invalid access mode")
+                except Exception as e:
+                    print(f"Error setting parameter {param}: {e}")
         else:
             print(f"Parameter {param} not found in list_params")
-        self.close()
         return False
 
+    def set_parameters(self, params: dict) -> bool:
+        """
+        Set a batch of parameters in a single session.
+        All the names are checked before writing : nothing is written if a parameter does not exist.
+        Parameters are written in dependency order (format and binning, then ROI, exposure, frame rate).
+        For each ROI axis, the offset and the size are ordered to stay in the sensor range.
+        If a parameter can not be set, the previous values are restored.
+        The names of the parameters not set are stored in failed_parameters.
+        :param params:  Dictionary of the values, by parameter name.
+        :return:    True if all the parameters were set.
+        """
+        if self.remote:
+            self.failed_parameters = list(params)
+            print('Parameters not set - camera driven by the acquisition process')
+            return False
+        self.failed_parameters = [p for p in params if p not in self.list_params]
+        if self.failed_parameters:
+            print(f'Parameters not found: {", ".join(self.failed_parameters)} - no parameter set')
+            return False
+        names = sorted(params,
+                       key=lambda p: PARAMETERS_ORDER.index(p) if p in PARAMETERS_ORDER else len(PARAMETERS_ORDER))
+        with self.session():
+            old_values = []
+            for name in self._get_roi_order(names, params):
+                old_value = self.get_parameter(name)
+                # With packed transfer, the pixel format is read as the unpacked format : always written
+                if old_value == params[name] and not (name == 'PixelFormat' and self.packed_transfer):
+                    self.initial_params[name] = params[name]
+                    continue
+                if not self.set_parameter(name, params[name]):
+                    self.failed_parameters = [name]
+                    # Rollback
+                    not_restored = [old_name for old_name, value in reversed(old_values)
+                                    if value is None or not self.set_parameter(old_name, value)]
+                    print(f'Parameter not set: {name} - previous values restored'
+                          + (f' except {", ".join(not_restored)}' if not_restored else ''))
+                    return False
+                old_values.append((name, old_value))
+        return True
+
+    def _get_roi_order(self, names: list, params: dict) -> list:
+        """
+        Order the offset and the size of each ROI axis :
+        the offset is written first if it is valid with the current size, else the size is written first.
+        :param names:   Names of the parameters, in writing order.
+        :param params:  Dictionary of the values, by parameter name.
+        :return:    Names of the parameters, in writing order.
+        """
+        names = list(names)
+        for offset, size, size_max in ROI_AXES:
+            if offset in names and size in names:
+                current_size = self.get_parameter(size)
+                max_size = self.get_parameter(size_max)
+                offset_first = (current_size is None or max_size is None
+                                or params[offset] + current_size <= max_size)
+                i_offset, i_size = names.index(offset), names.index(size)
+                if offset_first != (i_offset < i_size):
+                    names[i_offset], names[i_size] = names[i_size], names[i_offset]
+        return names
+
+    def add_preset(self, name: str, params: dict):
+        """
+        Add a named set of parameters (mode of the camera).
+        :param name:    Name of the preset.
+        :param params:  Dictionary of the values, by parameter name.
+        """
+        self.presets[name] = dict(params)
+
+    def load_preset(self, name: str, filepath: str) -> bool:
+        """
+        Add a preset from a parameters file (see init_camera_parameters).
+        :param name:        Name of the preset.
+        :param filepath:    Name of the txt file.
+        :return:    True if the file exists.
+        """
+        if not os.path.exists(filepath):
+            return False
+        self.add_preset(name, read_parameters_file(filepath))
+        return True
+
+    def apply_preset(self, name: str) -> bool:
+        """
+        Apply a preset in a single session.
+        :param name:    Name of the preset.
+        :return:    True if all the parameters of the preset were set.
+        """
+        if name not in self.presets:
+            print(f'Preset {name} not found')
+            return False
+        return self.set_parameters(self.presets[name])
+
 
 if __name__ == "__main__":
     import time
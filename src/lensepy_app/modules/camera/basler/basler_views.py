@@ -100,12 +100,19 @@ class CameraInfosWidget(QWidget):
         self.roi_checked.emit(value)
 
     def handle_roi_activated(self):
-        self.roi_activated_state = not self.roi_activated_state
+        self.set_roi_activated(not self.roi_activated_state)
+        self.roi_activated.emit(self.roi_activated_state)
+
+    def set_roi_activated(self, value: bool):
+        """
+        Set the state of the ROI activation button (no signal emitted).
+        :param value:   True if the ROI is activated.
+        """
+        self.roi_activated_state = value
         if self.roi_activated_state:
             self.activate_roi_button.setStyleSheet(actived_button)
         else:
             self.activate_roi_button.setStyleSheet(unactived_button)
-        self.roi_activated.emit(self.roi_activated_state)
 
     def update_infos(self):
         """
@@ -113,13 +120,14 @@ class CameraInfosWidget(QWidget):
         """
         self.camera: BaslerCamera = self.parent.get_variables()['camera']
         if self.parent.camera_connected:
-            self.camera.open()
-            self.label_name.set_value(self.camera.get_parameter('DeviceModelName'))
-            self.label_serial.set_value(self.camera.get_parameter('DeviceSerialNumber'))
-            w = str(self.camera.get_parameter('SensorWidth'))
-            h = str(self.camera.get_parameter('SensorHeight'))
+            # Read by the acquisition service (the camera can be driven by the acquisition process)
+            infos = self.parent.parent.acquisition.get_camera_parameters(
+                ['DeviceModelName', 'DeviceSerialNumber', 'SensorWidth', 'SensorHeight'])
+            self.label_name.set_value(infos.get('DeviceModelName'))
+            self.label_serial.set_value(infos.get('DeviceSerialNumber'))
+            w = str(infos.get('SensorWidth'))
+            h = str(infos.get('SensorHeight'))
             self.label_size.set_value(f'WxH = {w} x {h}')
-            self.camera.close()
         else:
             self.label_name.set_value(translate('no_camera'))
             self.label_serial.set_value(translate('no_camera'))
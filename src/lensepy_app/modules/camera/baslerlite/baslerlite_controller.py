@@ -1,12 +1,13 @@
 import time
-from PyQt6.QtCore import QObject, QThread
 from PyQt6.QtWidgets import QDialog
 from pathlib import Path
 import lensepy_app
 
-from lensepy_app.appli._app.template_controller import TemplateController, ImageLive
+from lensepy_app.appli._app.template_controller import TemplateController
 from lensepy_app.modules.camera.baslerlite.baslerlite_views import *
 from lensepy_app.modules.camera.basler.basler_models import *
+from lensepy_app.modules.camera.simulated.simulated_models import create_simulated_camera
+from lensepy_app.modules.camera.replay.replay_models import create_replay_camera
 from lensepy_app.widgets.image_display_widget import *
 from lensepy_app.widgets.histogram_widget import *
 from lensepy import translate
@@ -25,8 +26,6 @@ class BaslerController(TemplateController):
         super().__init__(parent)
         # Attributes initialization
         self.camera_connected = False       # Camera is connected
-        self.thread = None
-        self.worker = None
         self.colormode = []
         self.colormode_bits_depth = []
         self.masked = False
@@ -101,8 +100,9 @@ class BaslerController(TemplateController):
         camera = self.parent.variables["camera"]
         # Check if a camera is already connected
         if camera is None:
-            # Init Camera
-            self.parent.variables["camera"] = BaslerCamera()
+            # Init Camera (simulated or replay camera if selected in the XML file)
+            self.parent.variables["camera"] = (create_simulated_camera(self.parent.xml_app)
+                                               or create_replay_camera(self.parent.xml_app) or BaslerCamera())
             self.camera_connected = self.parent.variables["camera"].find_first_camera()
             if self.camera_connected is False:
                 self.parent.variables["camera"] = None
@@ -125,7 +125,7 @@ class BaslerController(TemplateController):
             self.camera_connected = True
             self.parent.variables["first_connexion"] = 'No'
             default_fps = self.parent.variables["disp_fps"]
-            camera.set_parameter("AcquisitionFrameRate", default_fps)
+            self.parent.acquisition.set_camera_parameters({'AcquisitionFrameRate': default_fps})
 
 
     def set_color_mode(self):
@@ -142,59 +142,33 @@ class BaslerController(TemplateController):
         self.bot_right.set_max_exposure_time(exposuretime_get)
 
     def update_color_mode(self):
-        camera = self.parent.variables["camera"]
         # Update to first mode if first connection
         first_mode_color = self.colormode[0]
-        camera.open()
-        camera.set_parameter("PixelFormat", first_mode_color)
-        camera.initial_params["PixelFormat"] = first_mode_color
-        camera.close()
+        # Set by the acquisition service (the camera can be driven by the acquisition process)
+        self.parent.acquisition.set_camera_parameters({'PixelFormat': first_mode_color})
         first_bits_depth = self.colormode_bits_depth[0]
         self.parent.variables["bits_depth"] = first_bits_depth
-        pix_format = camera.get_parameter('PixelFormat')
-        self.top_right.label_color_mode.set_value(pix_format)
+        self.top_right.label_color_mode.set_value(first_mode_color)
 
     def start_live(self):
         """
-        Start live acquisition from camera.
+        Start live acquisition from camera (subscription to the acquisition service).
         """
         if self.camera_connected:
-            self.thread = QThread()
-            self.worker = ImageLive(self)
-            self.worker.moveToThread(self.thread)
-
-            self.thread.started.connect(self.worker.run)
-            self.worker.image_ready.connect(self.handle_image_ready)
-            self.worker.finished.connect(self.thread.quit)
-
-            self.worker.finished.connect(self.worker.deleteLater)
-            self.worker.finished.connect(self.thread.deleteLater)
-
-            self.thread.start()
+            self.parent.acquisition.subscribe(self, self.handle_image_ready)
 
     def stop_live(self):
         """
-        Stop live mode, i.e. continuous image acquisition.
+        Suspend the live mode of the module (the frames of the other modules are not affected).
         """
-        if self.worker is not None:
-            # Arrêter le worker
-            self.worker._running = False
-
-            # Attendre la fin du thread
-            if self.thread is not None:
-                self.thread.quit()
-                self.thread.wait()  # bloque jusqu'à la fin
-
-            # Supprimer les références
-            self.worker = None
-            self.thread = None
+        self.parent.acquisition.pause(self)
 
     def handle_image_ready(self, image: np.ndarray):
         """
         Thread-safe GUI updates
         :param image:   Numpy array containing new image.
         """
-        image_disp = image.copy()
+        image_disp = image
         if self.masked and self.parent.variables["mask"] is not None:
             mask = self.parent.variables["mask"]
             image_disp = np.ma.masked_where(np.logical_not(mask), image_disp)
@@ -203,57 +177,39 @@ class BaslerController(TemplateController):
         # Update Histo
         self.bot_left.set_image(image_disp)
         # Store new image.
-        self.parent.variables['image'] = image.copy()
+        self.parent.frame_store.publish(image, source='baslerlite')
+
+    def handle_parameters_changed(self, params: dict):
+        """
+        Action performed when parameters of the camera were set.
+        :param params:  Dictionary of the values, by parameter name.
+        """
+        self.bot_right.update_infos()
 
     def handle_exposure_time_changed(self, value):
         """
         Action performed when the exposure time changed.
+        The parameter is set during the acquisition (successive values are coalesced).
         """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
-            camera.set_parameter('ExposureTime', value)
-            camera.initial_params['ExposureTime'] = value
-            self.bot_right.update_infos()
-            print(f'EXPO  TIME CHANGED: {value}')
-            # Restart live
-            camera.open()
-            self.start_live()
+        if self.parent.variables["camera"] is not None:
+            self.parent.acquisition.set_camera_parameters({'ExposureTime': value},
+                                                          callback=self.handle_parameters_changed)
 
     def handle_black_level_changed(self, value):
         """
         Action performed when the black level changed.
+        The parameter is set during the acquisition (successive values are coalesced).
         """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
-            camera.set_parameter('BlackLevel', value)
-            camera.initial_params['BlackLevel'] = value
-            self.bot_right.update_infos()
-            # Restart live
-            camera.open()
-            self.start_live()
+        if self.parent.variables["camera"] is not None:
+            self.parent.acquisition.set_camera_parameters({'BlackLevel': value},
+                                                          callback=self.handle_parameters_changed)
 
     def cleanup(self):
         """
-        Stop the camera cleanly and release resources.
+        Unsubscribe from the acquisition service.
+        The camera is closed by the service when no module needs it.
         """
-        self.stop_live()
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            if getattr(camera, "is_open", False):
-                camera.close()
-            camera.camera_acquiring = False
-        self.worker = None
-        self.thread = None
+        self.parent.acquisition.unsubscribe(self)
 
     def handle_mask(self):
         type = 'circular'
@@ -274,7 +230,6 @@ class BaslerController(TemplateController):
             self.parent.variables["mask"] = mask
             self.top_right.activate_mask_button(False)
             self.top_right.activate_mask_check()
-            self.parent.update_menu()
 
     def handle_mask_applied(self, value):
         self.masked = value
\ No newline at end of file
@@ -81,13 +81,14 @@ class CameraInfosWidget(QWidget):
         """
         self.camera: BaslerCamera = self.parent.get_variables()['camera']
         if self.parent.camera_connected:
-            self.camera.open()
-            self.label_name.set_value(self.camera.get_parameter('DeviceModelName'))
-            self.label_serial.set_value(self.camera.get_parameter('DeviceSerialNumber'))
-            w = str(self.camera.get_parameter('SensorWidth'))
-            h = str(self.camera.get_parameter('SensorHeight'))
+            # Read by the acquisition service (the camera can be driven by the acquisition process)
+            infos = self.parent.parent.acquisition.get_camera_parameters(
+                ['DeviceModelName', 'DeviceSerialNumber', 'SensorWidth', 'SensorHeight'])
+            self.label_name.set_value(infos.get('DeviceModelName'))
+            self.label_serial.set_value(infos.get('DeviceSerialNumber'))
+            w = str(infos.get('SensorWidth'))
+            h = str(infos.get('SensorHeight'))
             self.label_size.set_value(f'WxH = {w} x {h}')
-            self.camera.close()
         else:
             self.label_name.set_value(translate('no_camera'))
             self.label_serial.set_value(translate('no_camera'))
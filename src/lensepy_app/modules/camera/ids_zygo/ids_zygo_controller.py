@@ -1,8 +1,8 @@
-import time
-from PyQt6.QtCore import QObject, QThread
-from lensepy_app.appli._app.template_controller import TemplateController, ImageLive
+from lensepy_app.appli._app.template_controller import TemplateController
 from lensepy_app.modules.camera.ids_zygo.ids_zygo_views import *
 from lensepy.drivers.ids_camera import CameraIds
+from lensepy_app.modules.camera.simulated.simulated_models import create_simulated_camera
+from lensepy_app.modules.camera.replay.replay_models import create_replay_camera
 from lensepy_app.widgets import *
 from lensepy import translate
 
@@ -19,8 +19,6 @@ class IDSZygoController(TemplateController):
         super().__init__(parent)
         # Attributes initialization
         self.camera_connected = False       # Camera is connected
-        self.thread = None
-        self.worker = None
         self.colormode = []
         self.colormode_bits_depth = []
         self.camera_range = [0, 0, 0, 0]
@@ -95,8 +93,9 @@ class IDSZygoController(TemplateController):
         # Check if a camera is already connected
         if camera is None:
             print('Camera NONE')
-            # Init Camera
-            self.parent.variables["camera"] = IDSZygoCamera()
+            # Init Camera (simulated or replay camera if selected in the XML file)
+            self.parent.variables["camera"] = (create_simulated_camera(self.parent.xml_app)
+                                               or create_replay_camera(self.parent.xml_app) or IDSZygoCamera())
             self.camera_connected = self.parent.variables["camera"].find_first_camera()
             if self.camera_connected is False:
                 self.parent.variables["camera"] = None
@@ -155,38 +154,16 @@ class IDSZygoController(TemplateController):
 
     def start_live(self):
         """
-        Start live acquisition from camera.
+        Start live acquisition from camera (subscription to the acquisition service).
         """
         if self.camera_connected:
-            self.thread = QThread()
-            self.worker = ImageLive(self)
-            self.worker.moveToThread(self.thread)
-
-            self.thread.started.connect(self.worker.run)
-            self.worker.image_ready.connect(self.handle_image_ready)
-            self.worker.finished.connect(self.thread.quit)
-
-            self.worker.finished.connect(self.worker.deleteLater)
-            self.worker.finished.connect(self.thread.deleteLater)
-
-            self.thread.start()
+            self.parent.acquisition.subscribe(self, self.handle_image_ready)
 
     def stop_live(self):
         """
-        Stop live mode, i.e. continuous image acquisition.
+        Suspend the live mode of the module (the frames of the other modules are not affected).
         """
-        if self.worker is not None:
-            # Arrêter le worker
-            self.worker._running = False
-
-            # Attendre la fin du thread
-            if self.thread is not None:
-                self.thread.quit()
-                self.thread.wait()  # bloque jusqu'à la fin
-
-            # Supprimer les références
-            self.worker = None
-            self.thread = None
+        self.parent.acquisition.pause(self)
 
     def handle_image_ready(self, image: np.ndarray):
         """
@@ -198,25 +175,23 @@ class IDSZygoController(TemplateController):
         # Update Histo
         self.bot_left.set_image(image, checked=False)
         # Store new image.
-        self.parent.variables['image'] = image.copy()
+        self.parent.frame_store.publish(image, source='ids_zygo')
+
+    def handle_parameters_changed(self, params: dict):
+        """
+        Action performed when parameters of the camera were set.
+        :param params:  Dictionary of the values, by parameter name.
+        """
+        self.bot_right.update_infos()
 
     def handle_exposure_time_changed(self, value):
         """
         Action performed when the exposure time changed.
+        The parameter is set during the acquisition (successive values are coalesced).
         """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
-            camera.set_parameter('ExposureTime', value)
-            camera.initial_params['ExposureTime'] = value
-            self.bot_right.update_infos()
-            # Restart live
-            camera.open()
-            self.start_live()
+        if self.parent.variables["camera"] is not None:
+            self.parent.acquisition.set_camera_parameters({'ExposureTime': value},
+                                                          callback=self.handle_parameters_changed)
 
     def handle_color_mode_changed(self, event):
         """
@@ -224,17 +199,13 @@ class IDSZygoController(TemplateController):
         """
         camera = self.parent.variables["camera"]
         if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
+            # Read available formats (the camera is not closed : other modules can receive its frames)
             available_formats = []
             try:
                 if camera.camera_device is not None:
-                    camera.open()
                     available_formats = list(camera.camera_device.PixelFormat.Symbolics)
-                    camera.close()
+                else:
+                    available_formats = camera.get_parameter_info('PixelFormat').get('symbolics', [])
             except Exception as e:
                 print(f"Unable to read PixelFormat.Symbolics: {e}")
             # Select new format
@@ -244,10 +215,9 @@ class IDSZygoController(TemplateController):
             if new_format is None:
                 return
             if new_format in available_formats:
-                camera.open()
-                camera.set_parameter("PixelFormat", new_format)
-                camera.initial_params["PixelFormat"] = new_format
-                camera.close()
+                # The acquisition is stopped by the service while the format is changed
+                self.parent.acquisition.set_camera_parameters({'PixelFormat': new_format},
+                                                              callback=self.handle_parameters_changed)
             # Change bits depth
             self.parent.variables['bits_depth'] = self.colormode_bits_depth[idx]
             self.bot_left.set_bits_depth(int(self.parent.variables['bits_depth']))
@@ -256,27 +226,15 @@ class IDSZygoController(TemplateController):
                 self.bot_left.reinit_checkbox('RGB')
             elif 'Mono' in new_format:
                 self.bot_left.reinit_checkbox('Gray')
-            # Restart live
-            camera.open()
-            self.start_live()
 
     def handle_black_level_changed(self, value):
         """
         Action performed when the black level changed.
+        The parameter is set during the acquisition (successive values are coalesced).
         """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
-            camera.set_parameter('BlackLevel', value)
-            camera.initial_params['BlackLevel'] = value
-            self.bot_right.update_infos()
-            # Restart live
-            camera.open()
-            self.start_live()
+        if self.parent.variables["camera"] is not None:
+            self.parent.acquisition.set_camera_parameters({'BlackLevel': value},
+                                                          callback=self.handle_parameters_changed)
 
     def handle_rect_changed(self, coords):
         """Action performed when a new rectangle has been drawn."""
@@ -289,31 +247,32 @@ class IDSZygoController(TemplateController):
         self.top_left.draw_rectangle(self.parent.variables['roi_coords'])
 
     def handle_roi_activated(self, value):
+        """
+        Action performed when the ROI is activated or deactivated.
+        The ROI is set by the acquisition service (aligned, in a single batch, without stopping
+        the live acquisition when possible).
+        """
+        if self.parent.variables["camera"] is None:
+            self.parent.variables["roi_activated"] = value
+            return
+        if value:
+            x0, y0, x1, y1 = self.parent.variables["roi_coords"]
+        else:
+            x0, y0, x1, y1 = self._get_max_coords()
+        roi = self.parent.acquisition.set_roi(x0, y0, x1 - x0, y1 - y0)
+        if roi is None:
+            # ROI not applied (recording) : previous state kept
+            self.top_right.set_roi_activated(not value)
+            return
+        x0, y0, x1, y1 = roi
         self.parent.variables["roi_activated"] = value
-        camera = self.parent.variables["camera"]
-        self.stop_live()
         self.top_right.set_enabled_roi_widget(not value)
         self.top_left.set_enabled(not value)
         if value:
-            x0, y0, x1, y1 = self.parent.variables["roi_coords"]
-            new_w = min((x1-x0) + (4-(x1-x0)%4), camera.get_parameter('WidthMax'))
-            new_h = min((y1-y0) + (4-(y1-y0)%4), camera.get_parameter('HeightMax'))
-            x0, y0 = x0 - x0%4, y0 - y0%4
-            x1 = x0 + new_w
-            y1 = y0 + new_h
             self.parent.variables["roi_coords"] = [x0, y0, x1, y1]
         else:
-            x0, y0, x1, y1 = self._get_max_coords()
-            new_w = x1
-            new_h = y1
             self.top_left.draw_rectangle(self.parent.variables["roi_coords"])
         self.top_right.set_roi([x0, y0, x1, y1])
-        camera.set_parameter('Width', new_w)
-        camera.set_parameter('Height', new_h)
-        camera.set_parameter('OffsetX', x0)
-        camera.set_parameter('OffsetY', y0)
-        time.sleep(0.05)
-        self.start_live()
         self.top_left.update()
 
     def check_order(self, coords: list):
@@ -380,15 +339,9 @@ class IDSZygoController(TemplateController):
 
     def cleanup(self):
         """
-        Stop the camera cleanly and release resources.
+        Unsubscribe from the acquisition service.
+        The camera is closed by the service when no module needs it.
         """
-        self.stop_live()
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            if getattr(camera, "is_open", False):
-                camera.close()
-            camera.camera_acquiring = False
-        self.worker = None
-        self.thread = None
+        self.parent.acquisition.unsubscribe(self)
 
 
@@ -0,0 +1 @@
+from .replay_models import *
@@ -0,0 +1,272 @@
+import os
+import time
+import numpy as np
+from lensepy_app.appli._app.stream_recorder import open_recording
+from lensepy_app.modules.camera.basler.basler_models import get_bayer_pattern
+from lensepy_app.modules.camera.simulated.simulated_models import SimulatedCamera
+
+REPLAY_CAMERA_NAME = 'Replay'       # Name of the camera in the application XML file
+REPLAY_MODES = ['original',     # Timing of the recording
+                'fps',          # Fixed frame rate (AcquisitionFrameRate)
+                'fast']         # As fast as possible (no wait between two frames)
+DEFAULT_REPLAY_FPS = 30.0       # Frame rate of a recording without timestamps
+# Parameters of the recording copied to the camera
+RECORDED_PARAMETERS = ['DeviceModelName', 'DeviceSerialNumber', 'ExposureTime', 'Gain', 'BlackLevel']
+# Parameters of the replay (in the application XML file : <camera><file>record.lraw</file>...)
+REPLAY_PARAMETERS = {'file': 'ReplayFile', 'mode': 'ReplayMode', 'fps': 'AcquisitionFrameRate',
+                     'loop': 'ReplayLoop'}
+
+
+class ReplayCamera(SimulatedCamera):
+    """
+    Camera playing a recording of the stream (see StreamRecorder), with the interface of BaslerCamera.
+    The frames are read from the memory-mapped file, at the timing of the recording, at a fixed frame rate
+    or as fast as possible (maximum throughput of the modules, see AcquisitionService.get_frame_stats).
+    The ROI crops the recorded frames, the pixel format is the one of the recording.
+    The frame number in the recording is given by last_event_id, the camera timestamp of the recording
+    by last_timestamp. All the parameters (file and mode included) are stored in initial_params.
+    """
+
+    def __init__(self, filepath: str = None):
+        """
+
+        :param filepath:    Name of the recording file.
+        """
+        super().__init__()
+        self.initial_params.update({'DeviceModelName': 'Replay camera', 'AcquisitionFrameRate': DEFAULT_REPLAY_FPS,
+                                    'ReplayFile': '', 'ReplayMode': 'original', 'ReplayLoop': True})
+        for name in ['SimulationScene', 'SimulationNoise', 'SimulationLevel', 'SimulationFringePeriod',
+                     'SimulationFringeAngle', 'SimulationBeamWaist']:
+            del self.initial_params[name]
+        self.recording = None       # Memory-mapped frames (N, H, W...)
+        self.timestamps = None      # Host time (s) and camera timestamp of each frame
+        self.recording_file = None  # Name of the opened recording
+        self.recording_header = {}
+        self.last_event_id = 0      # Frame number of the last frame in the recording
+        self.played_count = 0       # Frames played since the start of the stream
+        self.loops_count = 0
+        self.start_time = 0.0
+        if filepath is not None:
+            self.load(filepath)
+
+    def configure(self, **kwargs):
+        """
+        Set the replay of the camera.
+        :param kwargs:  file (recording), mode (see REPLAY_MODES), fps (frame rate of the fps mode),
+            loop (True to restart at the end of the recording).
+        """
+        for key, value in kwargs.items():
+            if key not in REPLAY_PARAMETERS:
+                print(f'Unknown replay parameter {key}')
+            elif key == 'file':
+                self.load(value)
+            elif key == 'mode':
+                if value in REPLAY_MODES:
+                    self.initial_params['ReplayMode'] = value
+                else:
+                    print(f'Unknown replay mode {value}')
+            elif key == 'loop':
+                self.initial_params['ReplayLoop'] = str(value) == 'True'
+            else:
+                self.initial_params[REPLAY_PARAMETERS[key]] = float(value)
+
+    def load(self, filepath: str) -> bool:
+        """
+        Open a recording : the size, the pixel format and the parameters of the camera are the ones
+        of the recording. The replay restarts at the first frame.
+        Raises ValueError if the pixel format of the recording is not a Mono or Bayer format.
+        :param filepath:    Name of the recording file.
+        :return:    True if the recording was opened.
+        """
+        self.initial_params['ReplayFile'] = filepath
+        if self._get_recording() is None:
+            return False
+        height, width = self.recording.shape[1:3]
+        params = self.recording_header.get('metadata', {}).get('parameters', {})
+        pixel_format = params.get('PixelFormat')
+        if self.recording.ndim > 3:
+            pixel_format = 'RGB8'
+        elif pixel_format is None:
+            # Recording without the parameters of the camera
+            pixel_format = 'Mono8' if self.recording.dtype == np.uint8 else 'Mono12'
+        elif not str(pixel_format).startswith('Mono') and get_bayer_pattern(pixel_format) is None:
+            raise ValueError(f'Replay camera: unknown pixel format {pixel_format} in {filepath}')
+        self.initial_params.update({name: params[name] for name in RECORDED_PARAMETERS if name in params})
+        self.initial_params.update({'SensorWidth': width, 'SensorHeight': height,
+                                    'WidthMax': width, 'HeightMax': height,
+                                    'Width': width, 'Height': height, 'OffsetX': 0, 'OffsetY': 0,
+                                    'PixelFormat': pixel_format})
+        if 'AcquisitionFrameRate' in params:
+            self.initial_params['AcquisitionFrameRate'] = float(params['AcquisitionFrameRate'])
+        self.rewind()
+        return True
+
+    def find_first_camera(self) -> bool:
+        """The replay camera is available if its recording can be opened."""
+        return self._get_recording() is not None
+
+    def rewind(self, index: int = 0):
+        """
+        Set the next frame of the replay.
+        :param index:   Frame number in the recording.
+        """
+        self.frame_index = int(index)
+        self.next_time = time.perf_counter()
+
+    def get_frames_number(self) -> int:
+        """Number of frames of the recording."""
+        recording = self._get_recording()
+        return 0 if recording is None else len(recording)
+
+    def get_frame_rate(self) -> float:
+        """Frame rate of the replay : mean frame rate of the recording, or AcquisitionFrameRate in fps mode."""
+        intervals = self._get_intervals()
+        if self.initial_params['ReplayMode'] == 'fps' or intervals is None or len(intervals) == 0:
+            return float(self.initial_params['AcquisitionFrameRate'])
+        return 1 / max(float(np.mean(intervals)), 1e-6)
+
+    def get_replay_stats(self) -> dict:
+        """
+        Get the counters of the replay since the start of the stream.
+        :return:    Dictionary : frames (played), loops, index (next frame), rate (played frames per second).
+        """
+        duration = time.perf_counter() - self.start_time
+        return {'frames': self.played_count, 'loops': self.loops_count, 'index': self.frame_index,
+                'rate': self.played_count / duration if self.played_count and duration > 0 else 0.0}
+
+    def get_image(self):
+        """
+        Get the next frame of the recording, at the timing of the replay mode.
+        :return:    Array containing the image, None if the camera is not acquiring or
+            at the end of the recording (without loop).
+        """
+        recording = self._get_recording()
+        if not self.camera_acquiring or recording is None or len(recording) == 0:
+            return None
+        now = time.perf_counter()
+        if not self.streaming:
+            self.open()
+            self.streaming = True
+            self.next_time = now
+            self.start_time = now
+            self.played_count = 0
+        if self.frame_index >= len(recording):
+            if not self.initial_params['ReplayLoop']:
+                return None
+            self.frame_index = 0
+            self.loops_count += 1
+        if self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time = max(self.next_time + self._get_interval(self.frame_index), time.perf_counter())
+        index = self.frame_index
+        self.last_event_id = index
+        self.last_timestamp = (int(self.timestamps[index, 1]) if self.timestamps is not None
+                               else time.perf_counter_ns())
+        self.frame_index += 1
+        self.played_count += 1
+        params = self.initial_params
+        x0, y0 = int(params['OffsetX']), int(params['OffsetY'])
+        raw = recording[index, y0:y0 + int(params['Height']), x0:x0 + int(params['Width'])]
+        return self._make_image(raw)
+
+    def is_writable(self, param) -> bool:
+        """
+        Check if a camera parameter can be set in the current state of the camera.
+        The pixel format is the one of the recording.
+        :param param:   Name of the parameter.
+        :return:    True if the parameter is writable.
+        """
+        if param == 'PixelFormat':
+            return False
+        return super().is_writable(param)
+
+    def set_parameter(self, param, value):
+        """
+        Set a camera parameter to a specific value. A new recording file is opened.
+        :param param:   Name of the parameter.
+        :param value:   Value to give to the parameter.
+        :return:    True if the parameter was set.
+        """
+        if param == 'ReplayFile':
+            try:
+                return self.load(value)
+            except ValueError as e:
+                print(f"Error setting parameter {param}: {e}")
+                return False
+        if param == 'ReplayMode' and value not in REPLAY_MODES:
+            print(f"Error setting parameter {param}: unknown mode {value}")
+            return False
+        return super().set_parameter(param, value)
+
+    def _get_recording(self):
+        """
+        Get the frames of the recording file of the camera (ReplayFile), opened again when the file changed.
+        :return:    Memory-mapped frames, None if the file can not be opened.
+        """
+        filepath = self.initial_params['ReplayFile']
+        if filepath == self.recording_file:
+            return self.recording
+        self.recording, self.timestamps, self.recording_file = None, None, filepath
+        self.recording_header = {}
+        if not filepath or not os.path.isfile(filepath):
+            print(f'Replay camera: no recording file {filepath}')
+            return None
+        try:
+            self.recording, self.timestamps, self.recording_header = open_recording(filepath)
+        except (OSError, ValueError) as e:
+            print(f'Replay camera: {type(e).__name__}: {e}')
+        return self.recording
+
+    def _get_intervals(self):
+        """Time (in s) between two successive frames of the recording, None without timestamps."""
+        if self.timestamps is None or len(self.timestamps) < 2:
+            return None
+        return np.diff(self.timestamps[:, 0])
+
+    def _get_interval(self, index: int) -> float:
+        """
+        Time (in s) between a frame and the next one, depending on the replay mode.
+        :param index:   Frame number in the recording.
+        :return:    Time to wait.
+        """
+        mode = self.initial_params['ReplayMode']
+        if mode == 'fast':
+            return 0.0
+        if mode == 'original' and self.timestamps is not None and index + 1 < len(self.timestamps):
+            return max(float(self.timestamps[index + 1, 0] - self.timestamps[index, 0]), 0.0)
+        return 1 / self.get_frame_rate()
+
+
+def is_replay_camera(xml_app) -> bool:
+    """
+    Check if the camera of an application plays a recording (<camera><name>Replay</name></camera>).
+    :param xml_app: XML configuration of the application.
+    :return:    True if the camera plays a recording.
+    """
+    name = xml_app.get_sub_parameter('camera', 'name')
+    return name is not None and name.strip() == REPLAY_CAMERA_NAME
+
+
+def create_replay_camera(xml_app):
+    """
+    Create the replay camera of an application, configured from the <camera> section of its XML file :
+    <camera>
+        <name>Replay</name>
+        <file>./records/bench.lraw</file>   (recording of the stream, see StreamRecorder)
+        <mode>original</mode>               (optional, original, fps or fast)
+        <fps>30</fps>                       (optional, frame rate of the fps mode)
+        <loop>True</loop>                   (optional, restart at the end of the recording)
+    </camera>
+    :param xml_app: XML configuration of the application.
+    :return:    ReplayCamera, None if the camera of the application does not play a recording.
+    """
+    if not is_replay_camera(xml_app):
+        return None
+    camera = ReplayCamera()
+    settings = {}
+    for key in REPLAY_PARAMETERS:
+        value = xml_app.get_sub_parameter('camera', key)
+        if value is not None:
+            settings[key] = value.strip()
+    camera.configure(**settings)
+    return camera
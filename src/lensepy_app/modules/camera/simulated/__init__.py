@@ -0,0 +1 @@
+from .simulated_models import *
@@ -0,0 +1,463 @@
+import time
+import threading
+from contextlib import contextmanager
+import numpy as np
+from lensepy_app.modules.camera.basler.basler_models import (read_parameters_file, get_bayer_pattern, demosaic,
+                                                             get_demosaic_shape, DEMOSAIC_MODES, BAYER_CELLS)
+
+SIMULATED_CAMERA_NAME = 'Simulated'     # Name of the camera in the application XML file
+SCENES = ['noise',      # Uniform level with noise
+          'gaussian',   # Gaussian beam
+          'fringes']    # Tilted fringes
+PIXEL_FORMATS = ['Mono8', 'Mono10', 'Mono12', 'BayerRG8', 'BayerRG10', 'BayerRG12']
+SENSOR_WIDTH = 1936
+SENSOR_HEIGHT = 1216
+REFERENCE_EXPOSURE = 10000      # Exposure time (in us) of the reference level of the scene
+NOISE_FRAMES = 4                # Number of precomputed noisy frames (cycled)
+BAYER_COLOR = (1.0, 0.75, 0.5)  # Relative level of the red, green and blue channels of a Bayer scene
+# Parameters locked while the camera is streaming
+STREAM_LOCKED_PARAMETERS = ['PixelFormat', 'Width', 'Height']
+# Parameters of the scene (in the application XML file : <camera><scene>fringes</scene>...)
+SCENE_PARAMETERS = {'scene': 'SimulationScene', 'fps': 'AcquisitionFrameRate', 'noise': 'SimulationNoise',
+                    'level': 'SimulationLevel', 'period': 'SimulationFringePeriod',
+                    'angle': 'SimulationFringeAngle', 'waist': 'SimulationBeamWaist'}
+
+
+def get_bits_depth(pixel_format: str) -> int:
+    """
+    Get the number of bits of a pixel format.
+    :param pixel_format:    Pixel format (Mono12, BayerRG8...).
+    :return:    Number of bits per pixel.
+    """
+    digits = ''.join(c for c in pixel_format if c.isdigit())
+    return int(digits) if digits else 8
+
+
+def make_scene(scene: str, shape: tuple, period: float = 40.0, angle: float = 30.0,
+               waist: float = None) -> np.ndarray:
+    """
+    Compute the normalized intensity of a scene.
+    :param scene:   Name of the scene (see SCENES).
+    :param shape:   Shape of the sensor (height, width).
+    :param period:  Period of the fringes, in pixels.
+    :param angle:   Angle of the fringes, in degrees.
+    :param waist:   Waist of the gaussian beam in pixels, None for a sixth of the sensor.
+    :return:    Array of float32 values between 0 and 1.
+    """
+    height, width = shape
+    if scene == 'noise':
+        return np.full(shape, 0.5, dtype=np.float32)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    if scene == 'gaussian':
+        waist = waist or min(height, width) / 6
+        r2 = (x - width / 2) ** 2 + (y - height / 2) ** 2
+        return np.exp(-2 * r2 / waist ** 2).astype(np.float32)
+    if scene == 'fringes':
+        theta = np.deg2rad(angle)
+        phase = 2 * np.pi * (x * np.cos(theta) + y * np.sin(theta)) / period
+        return (0.5 * (1 + np.cos(phase))).astype(np.float32)
+    raise ValueError(f'Unknown scene {scene}')
+
+
+def mosaic(image: np.ndarray, pattern: str, color: tuple = BAYER_COLOR) -> np.ndarray:
+    """
+    Sample a gray scene through a Bayer color filter array.
+    :param image:   Intensity of the scene.
+    :param pattern: Bayer pattern of the sensor (RG, BG, GR, GB).
+    :param color:   Relative level of the red, green and blue channels.
+    :return:    Mosaic image (same shape).
+    """
+    raw = np.empty_like(image)
+    red, blue, green1, green2 = BAYER_CELLS[pattern]
+    for (dy, dx), gain in [(red, color[0]), (blue, color[2]), (green1, color[1]), (green2, color[1])]:
+        raw[dy::2, dx::2] = image[dy::2, dx::2] * gain
+    return raw
+
+
+class SimulatedCamera:
+    """
+    Camera without hardware, with the interface of BaslerCamera, for tests and benchmarks.
+    Frames of a synthetic scene (noise, gaussian beam, tilted fringes) are generated at the frame rate
+    of the camera (AcquisitionFrameRate, limited by the exposure time). Exposure time, gain (dB)
+    and black level change the level of the frames, the ROI crops the sensor and Bayer formats
+    give mosaic frames. All the parameters (scene included) are stored in initial_params.
+    """
+
+    get_image_blocks = True     # get_image waits for the next frame of the stream
+
+    def __init__(self):
+        self.camera_device = None
+        self.opened = False
+        self._acquiring = False
+        self.streaming = False
+        self.initial_params = {
+            'DeviceModelName': 'Simulated camera', 'DeviceSerialNumber': '00000000',
+            'SensorWidth': SENSOR_WIDTH, 'SensorHeight': SENSOR_HEIGHT,
+            'WidthMax': SENSOR_WIDTH, 'HeightMax': SENSOR_HEIGHT,
+            'Width': SENSOR_WIDTH, 'Height': SENSOR_HEIGHT, 'OffsetX': 0, 'OffsetY': 0,
+            'PixelFormat': 'Mono8', 'ExposureTime': float(REFERENCE_EXPOSURE), 'Gain': 0.0, 'BlackLevel': 0.0,
+            'AcquisitionFrameRateEnable': True, 'AcquisitionFrameRate': 30.0,
+            'SimulationScene': 'gaussian', 'SimulationNoise': 2.0, 'SimulationLevel': 0.5,
+            'SimulationFringePeriod': 40.0, 'SimulationFringeAngle': 30.0, 'SimulationBeamWaist': 0.0,
+        }
+        self.presets = {}
+        self.frame_pool = None      # FramePool of the frames (set by the acquisition), None to allocate each frame
+        self.demosaic_mode = 'bilinear'
+        self.deferred_processing = False    # True if get_image returns raw frames (see process_frame)
+        self.last_timestamp = 0     # Timestamp of the last frame (ns)
+        self.frames = None          # Precomputed noisy frames
+        self.frames_key = None      # Parameters of the precomputed frames
+        self.frame_index = 0
+        self.next_time = 0.0        # Time of the next frame of the stream
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened
+
+    @property
+    def is_streaming(self) -> bool:
+        """True if the camera is grabbing frames continuously."""
+        return self.streaming
+
+    @property
+    def camera_acquiring(self) -> bool:
+        """True if frames can be retrieved by get_image."""
+        return self._acquiring
+
+    @camera_acquiring.setter
+    def camera_acquiring(self, value: bool):
+        """
+        Start / stop the acquisition. The stream is stopped at the end of the acquisition.
+        :param value:   True to acquire frames.
+        """
+        self._acquiring = value
+        if not value:
+            self.streaming = False
+
+    def configure(self, **kwargs):
+        """
+        Set the scene of the camera.
+        :param kwargs:  scene (see SCENES), fps, noise (standard deviation in DN), level (mean level of the scene,
+            fraction of the full scale at the reference exposure), period and angle (fringes), waist (beam).
+        """
+        for key, value in kwargs.items():
+            if key not in SCENE_PARAMETERS:
+                print(f'Unknown scene parameter {key}')
+            elif key == 'scene':
+                if value in SCENES:
+                    self.initial_params['SimulationScene'] = value
+                else:
+                    print(f'Unknown scene {value}')
+            else:
+                self.initial_params[SCENE_PARAMETERS[key]] = float(value)
+
+    def find_first_camera(self) -> bool:
+        """The simulated camera is always available."""
+        return True
+
+    def init_camera(self):
+        """Initialize the camera (interface of the IDS cameras)."""
+        self.open()
+
+    def disconnect(self):
+        """Disconnect the camera."""
+        self.camera_acquiring = False
+        self.opened = False
+
+    def open(self):
+        """Open camera."""
+        self.opened = True
+
+    def close(self):
+        """Close camera. The camera is kept opened while it is streaming."""
+        if not (self.camera_acquiring and self.streaming):
+            self.opened = False
+            self.streaming = False
+
+    @contextmanager
+    def session(self):
+        """Parameter session (interface of BaslerCamera) : the camera is kept opened."""
+        yield self
+
+    def set_demosaic_mode(self, mode: str = 'bilinear'):
+        """
+        Set the demosaicing of the Bayer frames.
+        :param mode:    'bilinear', 'ea' (edge-aware), 'half' (half resolution), 'gray' (luminance) or 'raw'.
+        """
+        if mode in DEMOSAIC_MODES:
+            self.demosaic_mode = mode
+        else:
+            print(f'Unknown demosaic mode {mode}')
+
+    def get_frame_rate(self) -> float:
+        """Frame rate of the stream : AcquisitionFrameRate, limited by the exposure time."""
+        params = self.initial_params
+        fps = float(params['AcquisitionFrameRate']) if params['AcquisitionFrameRateEnable'] else np.inf
+        return min(fps, 1e6 / max(float(params['ExposureTime']), 1.0))
+
+    def get_image(self):
+        """
+        Get the next frame of the stream, at the frame rate of the camera.
+        :return:    Array containing the image, None if the camera is not acquiring.
+        """
+        if not self.camera_acquiring:
+            return None
+        now = time.perf_counter()
+        if not self.streaming:
+            self.open()
+            self.streaming = True
+            self.next_time = now
+        if self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time = max(self.next_time + 1 / self.get_frame_rate(), time.perf_counter())
+        self.last_timestamp = time.perf_counter_ns()
+        with self._lock:
+            frames = self._get_frames()
+            self.frame_index = (self.frame_index + 1 + np.random.randint(len(frames) - 1)) % len(frames)
+            raw = frames[self.frame_index]
+        return self._make_image(raw)
+
+    def _make_image(self, raw: np.ndarray) -> np.ndarray:
+        """
+        Copy (or demosaic) a raw frame to a new image.
+        With a frame pool, the image is written in a preallocated buffer (read-only view).
+        With deferred processing, the raw frame is returned (see process_frame).
+        :param raw:     Raw frame (not modified).
+        :return:    Image.
+        """
+        if not self.deferred_processing and self.demosaic_mode != 'raw' and self._get_bayer_pattern() is not None:
+            return self.process_frame(raw, self.frame_pool)
+        if self.frame_pool is None:
+            return raw.copy()
+        buffer = self.frame_pool.acquire(raw.shape, raw.dtype)
+        np.copyto(buffer, raw)
+        return self.frame_pool.borrow(buffer)
+
+    def process_frame(self, raw: np.ndarray, frame_pool=None) -> np.ndarray:
+        """
+        Convert a raw frame to an image, depending on the pixel format (demosaicing of the Bayer frames).
+        :param raw:         Raw frame.
+        :param frame_pool:  FramePool of the images, None to allocate a new array.
+        :return:    Image (the raw frame for monochrome formats and in 'raw' demosaic mode).
+        """
+        pattern = self._get_bayer_pattern()
+        if pattern is None or self.demosaic_mode == 'raw':
+            return raw
+        if frame_pool is None:
+            return demosaic(raw, pattern, self.demosaic_mode)
+        buffer = frame_pool.acquire(get_demosaic_shape(raw.shape, self.demosaic_mode), raw.dtype)
+        demosaic(raw, pattern, self.demosaic_mode, out=buffer)
+        return frame_pool.borrow(buffer)
+
+    def _get_bayer_pattern(self):
+        """Bayer pattern of the current pixel format, None for a monochrome format."""
+        return get_bayer_pattern(self.initial_params.get('PixelFormat'))
+
+    def _get_frames(self) -> list:
+        """
+        Get the precomputed noisy frames of the scene, computed again when a parameter changed.
+        :return:    List of frames.
+        """
+        params = self.initial_params
+        key = tuple(params[name] for name in ['PixelFormat', 'Width', 'Height', 'OffsetX', 'OffsetY',
+                                              'ExposureTime', 'Gain', 'BlackLevel', *SCENE_PARAMETERS.values()]
+                    if name != 'AcquisitionFrameRate')
+        if key == self.frames_key:
+            return self.frames
+        pixel_format = params['PixelFormat']
+        max_value = 2 ** get_bits_depth(pixel_format) - 1
+        dtype = np.uint8 if max_value < 256 else np.uint16
+        x0, y0 = int(params['OffsetX']), int(params['OffsetY'])
+        width, height = int(params['Width']), int(params['Height'])
+        scene = make_scene(params['SimulationScene'], (SENSOR_HEIGHT, SENSOR_WIDTH),
+                           params['SimulationFringePeriod'], params['SimulationFringeAngle'],
+                           params['SimulationBeamWaist'] or None)[y0:y0 + height, x0:x0 + width]
+        pattern = get_bayer_pattern(pixel_format)
+        if pattern is not None:
+            scene = mosaic(scene, pattern)
+        gain = 10 ** (float(params['Gain']) / 20)
+        signal = (scene * (params['SimulationLevel'] * max_value * gain
+                           * float(params['ExposureTime']) / REFERENCE_EXPOSURE) + float(params['BlackLevel']))
+        rng = np.random.default_rng()
+        self.frames = []
+        for _ in range(NOISE_FRAMES):
+            frame = signal + rng.normal(0, params['SimulationNoise'] * gain, signal.shape).astype(np.float32)
+            self.frames.append(np.clip(frame, 0, max_value).astype(dtype))
+        self.frames_key = key
+        self.frame_index = 0
+        return self.frames
+
+    def init_camera_parameters(self, filepath: str):
+        """
+        Initialize the parameters of the camera from a file (see read_parameters_file).
+        :param filepath:    Name of a txt file containing the parameters to setup.
+        """
+        self.set_parameters(read_parameters_file(filepath))
+
+    def get_list_parameters(self) -> list:
+        """Get the names of the parameters of the camera."""
+        return list(self.initial_params)
+
+    def get_parameter_info(self, param) -> dict:
+        """
+        Get the description of a camera parameter (interface of BaslerCamera).
+        :param param:   Name of the parameter.
+        :return:    Dictionary of the description, None if the parameter does not exist.
+        """
+        if param not in self.initial_params:
+            return None
+        value = self.initial_params[param]
+        info = {'type': type(value).__name__, 'access': None}
+        if param == 'PixelFormat':
+            info['symbolics'] = list(PIXEL_FORMATS)
+        elif param == 'SimulationScene':
+            info['symbolics'] = list(SCENES)
+        elif param in ['Width', 'OffsetX']:
+            info.update({'min': 0 if param == 'OffsetX' else 16, 'max': SENSOR_WIDTH, 'inc': 4})
+        elif param in ['Height', 'OffsetY']:
+            info.update({'min': 0 if param == 'OffsetY' else 16, 'max': SENSOR_HEIGHT, 'inc': 4})
+        return info
+
+    def get_parameter(self, param):
+        """
+        Get the value of a camera parameter.
+        :param param:   Name of the parameter.
+        :return:        Value of the parameter if exists, else None.
+        """
+        if param in ['BslResultingAcquisitionFrameRate', 'ResultingFrameRate']:
+            return self.get_frame_rate()
+        return self.initial_params.get(param)
+
+    def is_writable(self, param) -> bool:
+        """
+        Check if a camera parameter can be set in the current state of the camera.
+        :param param:   Name of the parameter.
+        :return:    True if the parameter is writable.
+        """
+        if param not in self.initial_params or param.startswith(('Device', 'Sensor')) or param.endswith('Max'):
+            return False
+        return not (self.streaming and param in STREAM_LOCKED_PARAMETERS)
+
+    def set_parameter(self, param, value):
+        """
+        Set a camera parameter to a specific value. The ROI is kept in the sensor.
+        :param param:   Name of the parameter.
+        :param value:   Value to give to the parameter.
+        :return:    True if the parameter was set.
+        """
+        if not self.is_writable(param):
+            print(f"Node {param} not writable or invalid access mode")
+            return False
+        if param == 'PixelFormat' and value not in PIXEL_FORMATS:
+            print(f"Error setting parameter {param}: unknown format {value}")
+            return False
+        if param in ['Width', 'Height', 'OffsetX', 'OffsetY']:
+            value = int(value)
+            size_max = self.initial_params['WidthMax' if param in ['Width', 'OffsetX'] else 'HeightMax']
+            other = {'Width': 'OffsetX', 'OffsetX': 'Width', 'Height': 'OffsetY', 'OffsetY': 'Height'}[param]
+            if value < 0 or value + self.initial_params[other] > size_max:
+                print(f"Error setting parameter {param}: value {value} out of range")
+                return False
+        self.initial_params[param] = value
+        return True
+
+    def set_parameters(self, params: dict) -> bool:
+        """
+        Set a batch of parameters. The pixel format is set first. For each ROI axis, an offset
+        moving to the origin is set before the size, an offset moving away is set after the size.
+        :param params:  Dictionary of the values, by parameter name.
+        :return:    True if all the parameters were set.
+        """
+        def order(name):
+            if name == 'PixelFormat':
+                return -2
+            if name.startswith('Offset'):
+                return -1 if params[name] <= self.initial_params.get(name, 0) else 1
+            return 0
+        names = sorted(params, key=order)
+        done = True
+        for name in names:
+            if self.initial_params.get(name) != params[name]:
+                done = self.set_parameter(name, params[name]) and done
+        return done
+
+    def add_preset(self, name: str, params: dict):
+        """
+        Add a named set of parameters (mode of the camera).
+        :param name:    Name of the preset.
+        :param params:  Dictionary of the values, by parameter name.
+        """
+        self.presets[name] = dict(params)
+
+    def load_preset(self, name: str, filepath: str) -> bool:
+        """
+        Add a preset from a parameters file (see read_parameters_file).
+        :param name:        Name of the preset.
+        :param filepath:    Name of the parameters file.
+        :return:    True if the file was read.
+        """
+        params = read_parameters_file(filepath)
+        if params:
+            self.add_preset(name, params)
+        return bool(params)
+
+    def apply_preset(self, name: str) -> bool:
+        """
+        Set the parameters of a preset.
+        :param name:    Name of the preset.
+        :return:    True if all the parameters were set.
+        """
+        if name not in self.presets:
+            print(f'Unknown preset {name}')
+            return False
+        return self.set_parameters(self.presets[name])
+
+    def set_exposure(self, exposure: float):
+        """
+        Set the exposure time (interface of the IDS cameras).
+        :param exposure:    Exposure time in us.
+        """
+        self.set_parameter('ExposureTime', float(exposure))
+
+    def get_exposure(self) -> float:
+        """Get the exposure time in us (interface of the IDS cameras)."""
+        return self.initial_params['ExposureTime']
+
+
+def is_simulated_camera(xml_app) -> bool:
+    """
+    Check if the camera of an application is simulated (<camera><name>Simulated</name></camera>).
+    :param xml_app: XML configuration of the application.
+    :return:    True if the camera is simulated.
+    """
+    name = xml_app.get_sub_parameter('camera', 'name')
+    return name is not None and name.strip() == SIMULATED_CAMERA_NAME
+
+
+def create_simulated_camera(xml_app):
+    """
+    Create the simulated camera of an application, configured from the <camera> section of its XML file :
+    <camera>
+        <name>Simulated</name>
+        <scene>fringes</scene>      (noise, gaussian or fringes)
+        <fps>30</fps>               (optional, target frame rate)
+        <noise>2.0</noise>          (optional, standard deviation of the noise in DN)
+        <level>0.5</level>          (optional, mean level of the scene, fraction of the full scale)
+        <period>40</period>         (optional, period of the fringes in pixels)
+        <angle>30</angle>           (optional, angle of the fringes in degrees)
+        <waist>200</waist>          (optional, waist of the gaussian beam in pixels)
+    </camera>
+    :param xml_app: XML configuration of the application.
+    :return:    SimulatedCamera, None if the camera of the application is not simulated.
+    """
+    if not is_simulated_camera(xml_app):
+        return None
+    camera = SimulatedCamera()
+    settings = {}
+    for key in SCENE_PARAMETERS:
+        value = xml_app.get_sub_parameter('camera', key)
+        if value is not None:
+            settings[key] = value.strip()
+    camera.configure(**settings)
+    return camera
@@ -2,11 +2,10 @@ import os
 from pathlib import Path
 
 import numpy as np
-from PyQt6.QtCore import QThread
 
 from lensepy import translate
 from lensepy.css import *
-from lensepy_app.appli._app.template_controller import TemplateController, ImageLive
+from lensepy_app.appli._app.template_controller import TemplateController
 from lensepy_app.widgets import ImageDisplayWithCrosshair, XYMultiChartWidget, HistoStatsWidget
 from lensepy_app.modules.camera.spatial_camera.spatial_camera_views import HistoSaveWidget
 from lensepy_app.widgets import CameraParamsWidget
@@ -15,6 +14,8 @@ from lensepy_app.widgets import CameraParamsWidget
 class SpatialCameraController(TemplateController):
     """Controller for camera acquisition."""
 
+    cacheable = True
+
     def __init__(self, parent=None):
         super().__init__(parent)
         # Attributes initialization
@@ -22,8 +23,6 @@ class SpatialCameraController(TemplateController):
         self.y_cross = None
         self.contrast_enabled = False       # Enhance contrast
         self.img_dir = self._get_image_dir(self.parent.parent.config['img_dir'])
-        self.thread = None
-        self.worker = None
 
         # Widgets
         self.top_left = ImageDisplayWithCrosshair()
@@ -63,27 +62,12 @@ class SpatialCameraController(TemplateController):
         self.start_live()
 
     def start_live(self):
-        """Start live acquisition with camera."""
-        self.thread = QThread()
-        self.worker = ImageLive(self)
-        self.worker.moveToThread(self.thread)
-
-        self.thread.started.connect(self.worker.run)
-        self.worker.image_ready.connect(self.handle_image_ready)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.worker.finished.connect(self.thread.deleteLater)
-        self.thread.start()
+        """Start live acquisition with camera (subscription to the acquisition service)."""
+        self.parent.acquisition.subscribe(self, self.handle_image_ready)
 
     def stop_live(self):
-        """Stop live acquisition."""
-        if self.worker:
-            self.worker.stop()
-            if self.thread:
-                self.thread.quit()
-                self.thread.wait()
-            self.worker = None
-            self.thread = None
+        """Stop live acquisition (the frames of the other modules are not affected)."""
+        self.parent.acquisition.pause(self)
 
     def handle_contrast_activated(self, value: bool):
         """
@@ -110,7 +94,7 @@ class SpatialCameraController(TemplateController):
         self.update_histogram(image)
         self.update_slices(image)
         # Store new image.
-        self.parent.variables['image'] = image.copy()
+        self.parent.frame_store.publish(image, source='spatial_camera')
 
     def handle_xy_changed(self, x, y):
         """
@@ -126,41 +110,30 @@ class SpatialCameraController(TemplateController):
         if image is not None:
             self.update_slices(image)
 
+    def handle_parameters_changed(self, params: dict):
+        """
+        Action performed when parameters of the camera were set.
+        :param params:  Dictionary of the values, by parameter name.
+        """
+        self.bot_right.update_infos()
+
     def handle_exposure_changed(self, value):
         """
-        Action performed when the color mode changed.
+        Action performed when the exposure time changed.
+        The parameter is set during the acquisition (successive values are coalesced).
         """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
-            camera.set_parameter('ExposureTime', value)
-            camera.initial_params['ExposureTime'] = value
-            self.bot_right.update_infos()
-            # Restart live
-            camera.open()
-            self.start_live()
+        if self.parent.variables["camera"] is not None:
+            self.parent.acquisition.set_camera_parameters({'ExposureTime': value},
+                                                          callback=self.handle_parameters_changed)
 
     def handle_black_level_changed(self, value):
         """
         Action performed when the black level changed.
+        The parameter is set during the acquisition (successive values are coalesced).
         """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Update information
-            camera.set_parameter('BlackLevel', value)
-            camera.initial_params['BlackLevel'] = value
-            self.bot_right.update_infos()
-            # Restart live
-            camera.open()
-            self.start_live()
+        if self.parent.variables["camera"] is not None:
+            self.parent.acquisition.set_camera_parameters({'BlackLevel': value},
+                                                          callback=self.handle_parameters_changed)
 
     # Histogram & slices
     def update_histogram(self, image):
@@ -206,18 +179,27 @@ class SpatialCameraController(TemplateController):
             f'Mean H = {np.mean(x_data):.1f} / Min = {np.min(x_data):.1f} / Max = {np.max(x_data):.1f} [] '
             f'Mean V = {np.mean(y_data):.1f} / Min = {np.min(y_data):.1f} / Max = {np.max(y_data):.1f}')
 
+    def suspend(self):
+        """Suspend the controller : stop the live acquisition, widgets are kept."""
+        super().suspend()
+        # cleanup is called once, when the controller is released (see ControllerPool.release)
+        self.parent.acquisition.unsubscribe(self)
+
+    def resume(self):
+        """Resume the controller : restart the live acquisition."""
+        super().resume()
+        bits_depth = self.parent.variables.get('bits_depth')
+        if bits_depth is not None:
+            self.top_left.set_bits_depth(int(bits_depth))
+            self.bot_left.set_bits_depth(int(bits_depth))
+        self.start_live()
+
     def cleanup(self):
         """
-        Stop the camera cleanly and release resources.
+        Unsubscribe from the acquisition service.
+        The camera is closed by the service when no module needs it.
         """
-        self.stop_live()
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            if getattr(camera, "is_open", False):
-                camera.close()
-            camera.camera_acquiring = False
-        self.worker = None
-        self.thread = None
+        self.parent.acquisition.unsubscribe(self)
 
     def _get_image_dir(self, filepath):
         if filepath is None:
@@ -1,14 +1,14 @@
 import os
 
 import numpy as np
-from PyQt6.QtCore import QThread
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
 from matplotlib import pyplot as plt
 
 from lensepy import translate
 from lensepy.css import *
 from lensepy_app.widgets import make_hline, HistoStatsWidget
-from lensepy_app.appli._app.template_controller import TemplateController, ImageLive
+from lensepy_app.appli._app.template_controller import TemplateController
+from lensepy_app.appli._app.stream_recorder import RECORD_EXTENSION
 from lensepy_app.widgets import XYMultiChartWidget, ImageDisplayWithPoints
 from lensepy_app.modules.camera.time_camera.time_camera_views import TimeOptionsWidget, MultiHistoWidget
 from lensepy.utils import process_hist_from_array, save_hist, rgb255_to_float
@@ -19,12 +19,12 @@ DISPLAY_NB_OF_PTS = 50
 class TimeCameraController(TemplateController):
     """Controller for camera acquisition."""
 
+    cacheable = True
+
     def __init__(self, parent=None):
         super().__init__(parent)
         # Attributes initialization
         self.img_dir = self._get_image_dir(self.parent.parent.config['img_dir'])
-        self.thread = None
-        self.worker = None
 
         # Data for time chart
         self.acquiring = False
@@ -67,43 +67,21 @@ class TimeCameraController(TemplateController):
         # Signals
         self.bot_right.acquisition_started.connect(self.start_acquisition)
         self.bot_right.save_data.connect(self.handle_save_data)
+        self.bot_right.record_toggled.connect(self.handle_record)
         # Start live acquisition
         self.start_live()
 
     def start_live(self):
-        """Start live acquisition with camera."""
-        self.thread = QThread()
-        self.worker = ImageLive(self)
-        self.worker.moveToThread(self.thread)
-
-        self.thread.started.connect(self.worker.run)
-        self.worker.image_ready.connect(self.handle_image_ready)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.worker.finished.connect(self.thread.deleteLater)
-        self.thread.start()
+        """Start live acquisition with camera (subscription to the acquisition service)."""
+        self.parent.acquisition.subscribe(self, self.handle_image_ready)
 
     def stop_live(self):
         """Stop live acquisition."""
-        if self.worker:
-            self.worker.stop()
-            if self.thread:
-                self.thread.quit()
-                self.thread.wait()
-            self.worker = None
-            self.thread = None
+        self.parent.acquisition.pause(self)
 
     def start_acq_live(self):
-        """Start live acquisition with camera."""
-        self.thread = QThread()
-        self.worker = ImageLive(self)
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.image_ready.connect(self.handle_image_acq_ready)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.worker.finished.connect(self.thread.deleteLater)
-        self.thread.start()
+        """Start live acquisition with camera, frames are collected for the time analysis."""
+        self.parent.acquisition.subscribe(self, self.handle_image_acq_ready)
 
     def start_acquisition(self, value: int):
         """Start acquisition of gray values for 4 random points."""
@@ -131,9 +109,19 @@ class TimeCameraController(TemplateController):
             self.point2_data = np.empty(self.max_acquisition)
             self.point3_data = np.empty(self.max_acquisition)
             self.point4_data = np.empty(self.max_acquisition)
-            self.start_acq_live()
+            if self.bot_right.is_burst_mode():
+                # Frames stored at the maximum rate, results displayed at the end
+                if not self.parent.acquisition.start_burst(self.max_acquisition, self.handle_burst_ready):
+                    self.acquiring = False
+                    self.bot_right.stop_acquisition()
+            else:
+                self.start_acq_live()
         else:
             self.acquiring = False
+            if self.parent.acquisition.is_bursting():
+                # Frames already acquired are displayed by handle_burst_ready
+                self.parent.acquisition.stop_burst()
+                return
             self.stop_live()
             self.bot_right.stop_acquisition()
             # Display statistics
@@ -146,7 +134,10 @@ class TimeCameraController(TemplateController):
         """
         self.top_left.set_image_from_array(image)
         # Store new image.
-        self.parent.variables['image'] = image.copy()
+        self.parent.frame_store.publish(image, source='time_camera')
+        stats = self.parent.acquisition.get_recording_stats()
+        if stats is not None:
+            self.bot_right.set_record_stats(stats)
 
     def handle_image_acq_ready(self, image: np.ndarray):
         """
@@ -156,7 +147,7 @@ class TimeCameraController(TemplateController):
         if self.nb_of_images < self.max_acquisition:
             self.top_left.set_image_from_array(image)
             # Store new image.
-            self.parent.variables['image'] = image.copy()
+            self.parent.frame_store.publish(image, source='time_camera')
             self.nb_of_images += 1
             # Collect new points
             (y1, x1) = (self.x_y_coords[0][0], self.x_y_coords[0][1])
@@ -168,15 +159,7 @@ class TimeCameraController(TemplateController):
             (y4, x4) = (self.x_y_coords[3][0], self.x_y_coords[3][1])
             self.point4_data[self.nb_of_images-1] = image[x4,y4]
             # Update time chart
-            y_data = [self.point1_data[:self.nb_of_images],
-                      self.point2_data[:self.nb_of_images],
-                      self.point3_data[:self.nb_of_images],
-                      self.point4_data[:self.nb_of_images]]
-            y_names = [f'point1 ({x1},{y1})', f'point2 ({x2},{y2})',
-                       f'point3 ({x3},{y3})', f'point4 ({x4},{y4})']
-            self.top_right.set_data(self.x_time[:self.nb_of_images],y_data,
-                                    x_label='Time', y_names=y_names)
-            self.top_right.refresh_chart(last=DISPLAY_NB_OF_PTS)
+            self.update_time_chart()
             # Update histogram / Acq
             self.update_histogram(image)
         else:    # End of acquisition
@@ -186,6 +169,54 @@ class TimeCameraController(TemplateController):
             m1, s1, m2, s2, m3, s3, m4, s4 = self._process_stats()
             self.bot_right.set_stats(m1, s1, m2, s2, m3, s3, m4, s4)
 
+    def handle_burst_ready(self, stack):
+        """
+        Action performed at the end of a burst acquisition : all the results are displayed once.
+        :param stack:   FrameStack containing the frames and their timestamps.
+        """
+        self.acquiring = False
+        self.bot_right.stop_acquisition()
+        frames = stack.get_frames()
+        if frames is None or stack.size == 0:
+            return
+        self.nb_of_images = stack.size
+        self.max_acquisition = stack.size
+        # Values of the points in all the frames
+        x_y = np.asarray(self.x_y_coords)
+        self.point1_data = frames[:, x_y[0][1], x_y[0][0]].astype(float)
+        self.point2_data = frames[:, x_y[1][1], x_y[1][0]].astype(float)
+        self.point3_data = frames[:, x_y[2][1], x_y[2][0]].astype(float)
+        self.point4_data = frames[:, x_y[3][1], x_y[3][0]].astype(float)
+        # Time of the frames from the first one, in ms
+        self.x_time = (stack.timestamps[:stack.size] - stack.timestamps[0]) * 1000
+        # Last frame copied : the stack is released
+        image = frames[-1].copy()
+        self.top_left.set_image_from_array(image)
+        self.parent.frame_store.publish(image, source='time_camera')
+        self.update_time_chart(x_label='Time (ms)')
+        self.update_histogram(image)
+        m1, s1, m2, s2, m3, s3, m4, s4 = self._process_stats()
+        self.bot_right.set_stats(m1, s1, m2, s2, m3, s3, m4, s4)
+
+    def update_time_chart(self, x_label: str = 'Time'):
+        """
+        Update the time chart with the values of the 4 points.
+        :param x_label:     Label of the time axis.
+        """
+        (y1, x1) = (self.x_y_coords[0][0], self.x_y_coords[0][1])
+        (y2, x2) = (self.x_y_coords[1][0], self.x_y_coords[1][1])
+        (y3, x3) = (self.x_y_coords[2][0], self.x_y_coords[2][1])
+        (y4, x4) = (self.x_y_coords[3][0], self.x_y_coords[3][1])
+        y_data = [self.point1_data[:self.nb_of_images],
+                  self.point2_data[:self.nb_of_images],
+                  self.point3_data[:self.nb_of_images],
+                  self.point4_data[:self.nb_of_images]]
+        y_names = [f'point1 ({x1},{y1})', f'point2 ({x2},{y2})',
+                   f'point3 ({x3},{y3})', f'point4 ({x4},{y4})']
+        self.top_right.set_data(self.x_time[:self.nb_of_images], y_data,
+                                x_label=x_label, y_names=y_names)
+        self.top_right.refresh_chart(last=DISPLAY_NB_OF_PTS)
+
     # Save data
     def handle_save_data(self, option):
         """Action performed when saving data button is pressed."""
@@ -244,6 +275,27 @@ class TimeCameraController(TemplateController):
             self.bot_right.reinit_acquisition()
         self.start_live()
 
+    def handle_record(self, start: bool):
+        """
+        Start or stop the recording of the live stream in a raw file.
+        :param start:   True to start the recording.
+        """
+        acquisition = self.parent.acquisition
+        if not start:
+            stats = acquisition.stop_recording()
+            if stats is not None:
+                self.bot_right.set_record_stats(stats)
+            self.bot_right.set_recording(False)
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self.bot_right, translate('dialog_save_record'),
+                                                   self.img_dir, f'Raw stream (*{RECORD_EXTENSION})')
+        if file_path == '':
+            self.bot_right.set_recording(False)
+            return
+        if not file_path.endswith(RECORD_EXTENSION):
+            file_path += RECORD_EXTENSION
+        self.bot_right.set_recording(acquisition.start_recording(file_path))
+
     # Histogram
     def update_histogram(self, image):
         """
@@ -256,18 +308,32 @@ class TimeCameraController(TemplateController):
                                self.point3_data[:self.nb_of_images],
                                self.point4_data[:self.nb_of_images], bits_depth=bits_depth)
 
+    def suspend(self):
+        """Suspend the controller : stop the live acquisition (or acquisition), widgets are kept."""
+        super().suspend()
+        if self.acquiring:
+            self.acquiring = False
+            self.parent.acquisition.stop_burst()
+            self.bot_right.stop_acquisition()
+        if self.parent.acquisition.is_recording():
+            self.handle_record(False)
+        # cleanup is called once, when the controller is released (see ControllerPool.release)
+        self.parent.acquisition.unsubscribe(self)
+
+    def resume(self):
+        """Resume the controller : restart the live acquisition."""
+        super().resume()
+        bits_depth = self.parent.variables.get('bits_depth')
+        if bits_depth is not None:
+            self.top_left.set_bits_depth(int(bits_depth))
+        self.start_live()
+
     def cleanup(self):
         """
-        Stop the camera cleanly and release resources.
+        Unsubscribe from the acquisition service.
+        The camera is closed by the service when no module needs it.
         """
-        self.stop_live()
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            if getattr(camera, "is_open", False):
-                camera.close()
-            camera.camera_acquiring = False
-        self.worker = None
-        self.thread = None
+        self.parent.acquisition.unsubscribe(self)
 
     def _random_points(self, x_min, x_max, y_min, y_max, n: int=4):
         # All the possible points
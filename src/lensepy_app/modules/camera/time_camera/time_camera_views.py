@@ -18,6 +18,7 @@ class TimeOptionsWidget(QWidget):
 
     acquisition_started = pyqtSignal(int)
     save_data = pyqtSignal(str)
+    record_toggled = pyqtSignal(bool)
 
     def __init__(self):
         super().__init__()
@@ -48,6 +49,23 @@ class TimeOptionsWidget(QWidget):
         self.start_time_acq_button.clicked.connect(self.handle_start_acquisition)
         layout.addWidget(self.start_time_acq_button)
         self.layout.addWidget(widget)
+        self.burst_mode = QCheckBox(translate('time_burst_mode'))
+        self.burst_mode.setToolTip(translate('time_burst_mode_tip'))
+        self.layout.addWidget(self.burst_mode)
+        # Stream recording
+        widget = QWidget()
+        layout = QHBoxLayout()
+        widget.setLayout(layout)
+        self.record_button = QPushButton(translate('time_record_button'))
+        self.record_button.setToolTip(translate('time_record_button_tip'))
+        self.record_button.setStyleSheet(unactived_button)
+        self.record_button.setFixedHeight(BUTTON_HEIGHT)
+        self.record_button.setCheckable(True)
+        self.record_button.clicked.connect(self.handle_record)
+        layout.addWidget(self.record_button)
+        self.record_stats = QLabel('')
+        layout.addWidget(self.record_stats)
+        self.layout.addWidget(widget)
 
         # Save data
         widget = QWidget()
@@ -98,6 +116,33 @@ class TimeOptionsWidget(QWidget):
         self.point4_stats.setText(point4)
         self.point4_stats.setStyleSheet(styleH3)
 
+    def is_burst_mode(self) -> bool:
+        """Return True if the frames are acquired in burst mode (results displayed at the end)."""
+        return self.burst_mode.isChecked()
+
+    def set_record_stats(self, stats: dict):
+        """
+        Display the statistics of the recording.
+        :param stats:   Dictionary : frames, dropped, bytes... (see StreamRecorder.get_stats).
+        """
+        text = f'{stats["frames"]} frames - {stats["dropped"]} dropped - {stats["bytes"] / 1e6:.0f} MB'
+        if stats.get('error') is not None:
+            text = f'{text} - {stats["error"]}'
+        self.record_stats.setText(text)
+
+    def set_recording(self, recording: bool):
+        """
+        Update the record button.
+        :param recording:   True if a recording is running.
+        """
+        self.record_button.setChecked(recording)
+        self.record_button.setStyleSheet(actived_button if recording else unactived_button)
+        self.record_button.setText(translate('time_record_stop_button' if recording else 'time_record_button'))
+
+    def handle_record(self):
+        """Action performed when the record button is clicked."""
+        self.record_toggled.emit(self.record_button.isChecked())
+
     def set_start_enabled(self):
         """Set enable start button."""
         self.start_time_acq_button.setText(translate('start_time_acq_button'))
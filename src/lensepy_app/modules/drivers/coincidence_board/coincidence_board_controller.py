@@ -82,13 +82,11 @@ class CoincidenceBoardController(TemplateController):
             hw_version = self.nucleo_wrapper.get_hw_version()
             self.bot_right.set_connected(hw_version)
             self.parent.variables['nucleo_connected'] = True
-            self.parent.update_menu()
 
     def handle_acq_started(self):
         """Action performed when acquisition is required."""
         if self.acquiring:
             self.parent.variables['nucleo_connected'] = True
-            self.parent.update_menu()
             self.stop_acq()
             self.data_time_a = np.zeros(30)
             self.data_time_b = np.zeros(30)
@@ -102,7 +100,6 @@ class CoincidenceBoardController(TemplateController):
             self.top_left.set_acquisition(False)
         else:
             self.parent.variables['nucleo_connected'] = None
-            self.parent.update_menu()
             self.acquiring = True
             self.bot_right.set_acquisition()
             self.top_left.set_acquisition()
@@ -49,7 +49,6 @@ class ImagesController(TemplateController):
         self.bot_left.refresh_chart()
         # Update image information
         self.top_right.update_infos(image)
-        self.parent.main_window.update_menu()
 
     def display_image(self, image: np.ndarray):
         """
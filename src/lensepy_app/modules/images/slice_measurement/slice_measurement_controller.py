@@ -2,12 +2,11 @@ import os
 from pathlib import Path
 
 import numpy as np
-from PyQt6.QtCore import QThread
 from PyQt6.QtWidgets import QWidget
 
 from lensepy import translate
 from lensepy.css import *
-from lensepy_app.appli._app.template_controller import TemplateController, ImageLive
+from lensepy_app.appli._app.template_controller import TemplateController
 from lensepy_app.widgets import ImageDisplayWithCrosshair, XYMultiChartWidget, HistoStatsWidget
 from lensepy_app.modules.images.slice_measurement.slice_measurement_views import SliceMeasurementWidget
 
@@ -21,8 +20,6 @@ class SliceMeasurementController(TemplateController):
         self.x_cross = None
         self.y_cross = None
         self.img_dir = self._get_image_dir(self.parent.parent.config['img_dir'])
-        self.thread = None
-        self.worker = None
 
         # Widgets
         self.top_left = XYMultiChartWidget()
@@ -49,27 +46,12 @@ class SliceMeasurementController(TemplateController):
         self.start_live()
 
     def start_live(self):
-        """Start live acquisition with camera."""
-        self.thread = QThread()
-        self.worker = ImageLive(self)
-        self.worker.moveToThread(self.thread)
-
-        self.thread.started.connect(self.worker.run)
-        self.worker.image_ready.connect(self.handle_image_ready)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.worker.finished.connect(self.thread.deleteLater)
-        self.thread.start()
+        """Start live acquisition with camera (subscription to the acquisition service)."""
+        self.parent.acquisition.subscribe(self, self.handle_image_ready)
 
     def stop_live(self):
-        """Stop live acquisition."""
-        if self.worker:
-            self.worker.stop()
-            if self.thread:
-                self.thread.quit()
-                self.thread.wait()
-            self.worker = None
-            self.thread = None
+        """Stop live acquisition (the frames of the other modules are not affected)."""
+        self.parent.acquisition.pause(self)
 
     def handle_horizontal_meas(self, x0, y0, x1, y1):
         self.top_right.set_horizontal_xy(x0, y0, x1, y1)
@@ -86,7 +68,7 @@ class SliceMeasurementController(TemplateController):
         # Update Slices
         self.update_slices(image)
         # Store new image.
-        self.parent.variables['image'] = image.copy()
+        self.parent.frame_store.publish(image, source='slice_measurement')
 
     def handle_xy_changed(self, x, y):
         """
@@ -100,23 +82,21 @@ class SliceMeasurementController(TemplateController):
         if image is not None:
             self.update_slices(image)
 
+    def handle_parameters_changed(self, params: dict):
+        """
+        Action performed when parameters of the camera were set.
+        :param params:  Dictionary of the values, by parameter name.
+        """
+        self.bot_right.update_infos()
+
     def handle_exposure_changed(self, value):
         """
-        Action performed when the color mode changed.
+        Action performed when the exposure time changed.
+        The parameter is set during the acquisition (successive values are coalesced).
         """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            # Stop live safely
-            self.stop_live()
-            # Close camera
-            camera.close()
-            # Read available formats
-            camera.set_parameter('ExposureTime', value)
-            camera.initial_params['ExposureTime'] = value
-            self.bot_right.update_infos()
-            # Restart live
-            camera.open()
-            self.start_live()
+        if self.parent.variables["camera"] is not None:
+            self.parent.acquisition.set_camera_parameters({'ExposureTime': value},
+                                                          callback=self.handle_parameters_changed)
 
     # Slices
     def update_slices(self, image):
@@ -156,16 +136,10 @@ class SliceMeasurementController(TemplateController):
 
     def cleanup(self):
         """
-        Stop the camera cleanly and release resources.
+        Unsubscribe from the acquisition service.
+        The camera is closed by the service when no module needs it.
         """
-        self.stop_live()
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            if getattr(camera, "is_open", False):
-                camera.close()
-            camera.camera_acquiring = False
-        self.worker = None
-        self.thread = None
+        self.parent.acquisition.unsubscribe(self)
 
     def _get_image_dir(self, filepath):
         if filepath is None:
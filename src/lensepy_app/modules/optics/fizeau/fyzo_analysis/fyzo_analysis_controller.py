@@ -4,7 +4,6 @@ from pathlib import Path
 
 import cv2
 import numpy as np
-from PyQt6.QtCore import QThread
 from PyQt6.QtWidgets import QWidget
 
 from lensepy import translate
@@ -13,15 +12,15 @@ from lensepy.images.masks import *
 from lensepy.images.conversion import *
 from lensepy.optics.zygo import process_statistics_surface
 
-from lensepy_app.appli._app.template_controller import TemplateController, ImageLive
+from lensepy_app.appli._app.template_controller import TemplateController
 from lensepy_app.widgets import ImageDisplayWidget
 from lensepy_app.modules.optics.fizeau.fyzo_analysis.fyzo_analysis_views import FyzoAnalysisOptionsView
 from lensepy_app.widgets.double_3d_view import Surface3DView
 from lensepy_app.widgets.surface_2D_view import Surface2DView
-from skimage.restoration import unwrap_phase
+from lensepy_app.modules.optics.fizeau.fyzo_analysis.fyzo_analysis_models import (
+    get_mask_crop, process_fft, get_masked_fft, get_centered_fft, process_surface)
 
 FPS_FFT = 3
-LAMBDA_LASER = 0.670 #micron
 
 class FyzoAnalysisController(TemplateController):
     """Controller for camera acquisition."""
@@ -56,10 +55,9 @@ class FyzoAnalysisController(TemplateController):
         self.top_right.view_saved.connect(self.handle_png_saved)
         # Crop size / mask
         mask = self.parent.variables['mask']
-        top_left, bottom_right = find_mask_limits(mask)
-        self.img_height, self.img_width = bottom_right[1] - top_left[1], bottom_right[0] - top_left[0]
-        self.img_pos_x, self.img_pos_y = top_left[1], top_left[0]
-        self.mask = crop_images([mask], (self.img_height, self.img_width), (self.img_pos_x, self.img_pos_y))[0]
+        crop_size, crop_position, self.mask = get_mask_crop(mask)
+        self.img_height, self.img_width = crop_size
+        self.img_pos_x, self.img_pos_y = crop_position
         # Initial Image
         self.initial_image = self.parent.variables.get('image')
         if self.initial_image is not None:
@@ -87,34 +85,13 @@ class FyzoAnalysisController(TemplateController):
             self.image_disp = image_8bits
         self.bot_right.set_image_from_array(self.image_disp)
         # Store new image.
-        self.parent.variables['image'] = image_raw
+        self.parent.frame_store.publish(image_raw, source='fyzo_analysis')
         # 3 modes
-        self.fft_raw = self._process_fft(image_raw)
-        self.fft_masked, idx_X, idx_Y = self._get_masked_fft(self.fft_raw)
-        self.fft_center = self._get_centered_fft(self.fft_masked, idx_X, idx_Y)
-
+        self.fft_raw = process_fft(image_raw)
+        self.fft_masked, idx_X, idx_Y = get_masked_fft(self.fft_raw)
+        self.fft_center = get_centered_fft(self.fft_masked, idx_X, idx_Y)
         # Phase / Surface
-        champ = np.fft.ifft2(np.fft.ifftshift(self.fft_center))
-        champ[~self.mask] = 0
-
-        wrapped_phase = np.angle(champ)
-        self.unwrapped_phase = unwrap_phase(wrapped_phase)
-        self.unwrapped_phase[~self.mask] = np.nan
-
-        # Surface
-        Masq = self.mask
-        xx = (np.arange(-self.img_width // 2, self.img_width // 2) / self.img_width) * 2
-        yy = (np.arange(-self.img_height // 2, self.img_height // 2) / self.img_height) * 2
-        Xg, Yg = np.meshgrid(xx, yy)
-        A = np.column_stack((np.ones(np.sum(self.mask)), Xg[self.mask], Yg[self.mask]))
-        Z = self.unwrapped_phase[self.mask]
-        coeffs, *_ = np.linalg.lstsq(A, Z, rcond=None)
-        phase_corr = np.full_like(self.unwrapped_phase, np.nan)
-        phase_corr[self.mask] = Z - A @ coeffs
-        # Process surface
-        self.surface = phase_corr / (4 * np.pi) * LAMBDA_LASER  # d éfaut en réflexion
-        self.surface[~self.mask] = np.nan
-        self.surface = np.ma.masked_where(np.logical_not(self.mask), self.surface)
+        self.unwrapped_phase, self.surface = process_surface(self.fft_center, self.mask)
 
         pv,rms = process_statistics_surface(self.surface)
         self.top_right.set_pv_rms(pv, rms)
@@ -172,42 +149,13 @@ class FyzoAnalysisController(TemplateController):
         # Value = {'interfer', 'fft', 'fft_masked', 'fft_centered', 'phase', 'surface'}
         self.disp_mode = value
 
-    def cleanup(self):
-        """
-        Stop the camera cleanly and release resources.
-        """
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            if getattr(camera, "is_open", False):
-                camera.close()
-            camera.camera_acquiring = False
-
     ### FFT and display
-    def _process_fft(self, image):
-        fft = np.fft.fftshift(np.fft.fft2(image))
-        return fft
-
     def _disp_fft(self, fft):
         fft_disp = np.log(np.abs(fft) + 1)
         max_disp = np.max(fft_disp)
         fft_disp = ((fft_disp / max_disp) * 255).astype(np.uint8)
         return fft_disp
 
-    def _get_masked_fft(self, fft, percent_excent=0.15):
-        width = fft.shape[0]
-        central_radius = width // 6  # rayon zone centrale
-        excent_radius = int(width * percent_excent)  # largeur pic latéral
-        central_mask = circular_mask(central_radius, fft, inverted=True)
-        imx, jmx = np.unravel_index(np.argmax(np.abs(central_mask)), fft.shape)
-        excent_mask = circular_mask(excent_radius, fft, center=(imx, jmx))
-        return excent_mask, imx, jmx
-
-    def _get_centered_fft(self, fft, imx, jmx):
-        Itf_filtr = np.zeros_like(fft)
-        fft_center_Y, fft_center_X = fft.shape
-        centered_fft = np.roll(fft, shift=(fft_center_X - imx, fft_center_Y - jmx), axis=(0, 1))  # démodulation
-        return np.fft.fftshift(centered_fft)
-
     def _get_image_dir(self, filepath):
         if filepath is None:
             return ''
@@ -1,4 +1,144 @@
+import os
+import cv2
 import numpy as np
+from lensepy.images.masks import circular_mask
+from lensepy.images.conversion import find_mask_limits, crop_images
+from lensepy.optics.zygo import process_statistics_surface
+from skimage.restoration import unwrap_phase
+
+LAMBDA_LASER = 0.670 #micron
+
+
+def get_mask_crop(mask: np.ndarray):
+    """
+    Get the crop of the images from the limits of a mask.
+    :param mask:    2D-array of booleans.
+    :return:    Crop size (height, width), crop position (x, y) and cropped mask.
+    """
+    top_left, bottom_right = find_mask_limits(mask)
+    crop_size = (bottom_right[1] - top_left[1], bottom_right[0] - top_left[0])
+    crop_position = (top_left[1], top_left[0])
+    cropped_mask = crop_images([mask], crop_size, crop_position)[0]
+    return crop_size, crop_position, cropped_mask
+
+
+def process_fft(image: np.ndarray) -> np.ndarray:
+    """
+    Process the centered FFT of an image.
+    :param image:   2D-array.
+    :return:    Complex 2D-array.
+    """
+    return np.fft.fftshift(np.fft.fft2(image))
+
+
+def get_masked_fft(fft: np.ndarray, percent_excent: float = 0.15):
+    """
+    Select the lateral peak of the FFT of an interferogram.
+    :param fft:             Centered FFT.
+    :param percent_excent:  Radius of the lateral peak, in percent of the width.
+    :return:    Masked FFT and position of the peak (i, j).
+    """
+    width = fft.shape[0]
+    central_radius = width // 6  # rayon zone centrale
+    excent_radius = int(width * percent_excent)  # largeur pic latéral
+    central_mask = circular_mask(central_radius, fft, inverted=True)
+    imx, jmx = np.unravel_index(np.argmax(np.abs(central_mask)), fft.shape)
+    excent_mask = circular_mask(excent_radius, fft, center=(imx, jmx))
+    return excent_mask, imx, jmx
+
+
+def get_centered_fft(fft: np.ndarray, imx: int, jmx: int) -> np.ndarray:
+    """
+    Move the lateral peak of the FFT to the center (demodulation).
+    :param fft:     Masked FFT.
+    :param imx:     Position of the peak (i).
+    :param jmx:     Position of the peak (j).
+    :return:    Centered FFT.
+    """
+    fft_center_Y, fft_center_X = fft.shape
+    centered_fft = np.roll(fft, shift=(fft_center_X - imx, fft_center_Y - jmx), axis=(0, 1))  # démodulation
+    return np.fft.fftshift(centered_fft)
+
+
+def process_surface(fft_center: np.ndarray, mask: np.ndarray, wavelength: float = LAMBDA_LASER):
+    """
+    Process the unwrapped phase and the surface (tilt removed) from the centered FFT.
+    :param fft_center:  Centered FFT of the cropped interferogram.
+    :param mask:        Cropped mask (2D-array of booleans).
+    :param wavelength:  Wavelength of the laser, in micron.
+    :return:    Unwrapped phase and surface (masked array, in micron).
+    """
+    img_height, img_width = mask.shape
+    # Phase / Surface
+    champ = np.fft.ifft2(np.fft.ifftshift(fft_center))
+    champ[~mask] = 0
+
+    wrapped_phase = np.angle(champ)
+    unwrapped_phase = unwrap_phase(wrapped_phase)
+    unwrapped_phase[~mask] = np.nan
+
+    # Surface
+    xx = (np.arange(-img_width // 2, img_width // 2) / img_width) * 2
+    yy = (np.arange(-img_height // 2, img_height // 2) / img_height) * 2
+    Xg, Yg = np.meshgrid(xx, yy)
+    A = np.column_stack((np.ones(np.sum(mask)), Xg[mask], Yg[mask]))
+    Z = unwrapped_phase[mask]
+    coeffs, *_ = np.linalg.lstsq(A, Z, rcond=None)
+    phase_corr = np.full_like(unwrapped_phase, np.nan)
+    phase_corr[mask] = Z - A @ coeffs
+    # Process surface
+    surface = phase_corr / (4 * np.pi) * wavelength  # d éfaut en réflexion
+    surface[~mask] = np.nan
+    surface = np.ma.masked_where(np.logical_not(mask), surface)
+    return unwrapped_phase, surface
+
+
+def load_mask(file_path: str) -> np.ndarray:
+    """
+    Load a mask from a .npy file or an image file (non-zero pixels).
+    :param file_path:   Path of the file.
+    :return:    2D-array of booleans.
+    """
+    if os.path.splitext(file_path)[1] == '.npy':
+        return np.load(file_path).astype(bool)
+    image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise FileNotFoundError(f'Mask file {file_path} not found')
+    return image > 0
+
+
+def process_batch(context):
+    """
+    Process the surface of an interferogram (batch mode).
+    Variables : mask (path of the mask file), wavelength (in micron, optional).
+    :param context:     BatchContext of the input file (an image file).
+    """
+    mask = context.get_variable('mask')
+    if mask is None:
+        raise ValueError('No mask (variable mask)')
+    if isinstance(mask, str):
+        mask = load_mask(mask)
+    image = context.get_variable('image')
+    if image is None:
+        image = cv2.imread(context.input_file, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError(f'Image {context.input_file} can not be read')
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    crop_size, crop_position, cropped_mask = get_mask_crop(mask)
+    image_crop = crop_images([image], crop_size, crop_position)[0]
+    fft_raw = process_fft(image_crop)
+    fft_masked, idx_X, idx_Y = get_masked_fft(fft_raw)
+    fft_center = get_centered_fft(fft_masked, idx_X, idx_Y)
+    wavelength = float(context.get_variable('wavelength', LAMBDA_LASER))
+    unwrapped_phase, surface = process_surface(fft_center, cropped_mask, wavelength)
+    context.variables['phase'] = unwrapped_phase
+    context.variables['surface'] = surface
+    pv, rms = process_statistics_surface(surface)
+    context.add_result('pv', pv)
+    context.add_result('rms', rms)
+    context.save_array('surface', surface)
+
 
 if __name__ == '__main__':
 
@@ -7,4 +147,4 @@ if __name__ == '__main__':
 
     module_TF = np.abs(Itf)
 
-    module_HF = module_TF.copy()
\ No newline at end of file
+    module_HF = module_TF.copy()
@@ -4,55 +4,20 @@ from pathlib import Path
 
 import cv2
 import numpy as np
-from PyQt6.QtCore import QThread
 from PyQt6.QtWidgets import QWidget
 
 from lensepy import translate
 from lensepy.css import *
 from lensepy.images.masks import *
 from lensepy.images.conversion import *
-from lensepy_app.appli._app.template_controller import TemplateController, ImageLive
+from lensepy_app.appli._app.template_controller import TemplateController
 from lensepy_app.widgets import ImageDisplayWidget
 from lensepy_app.modules.optics.fizeau.fyzo_fft.fyzo_fft_views import *
+from lensepy_app.modules.optics.fizeau.fyzo_fft.fyzo_fft_models import process_fft_display
 
 FPS_FFT = 3
 
 
-def gray_to_rgb(image_gray):
-    return np.stack([image_gray] * 3, axis=-1)
-
-
-def add_circle(image, center=None, radius=10, color=(255, 255, 255), thickness=2):
-    """
-    Draw a circle on the image
-    ----------
-    image : np.array (H, W, 3)
-    centre : tuple (x, y)
-    rayon : int
-    couleur : tuple (R, G, B)
-
-    Retour
-    ------
-    np.array : image modifiée
-    """
-
-    img = image.copy()
-    if center is None:
-        x0, y0 = img.shape[1] // 2, img.shape[0] // 2
-    else:
-        x0, y0 = center
-    y, x = np.ogrid[:img.shape[0], :img.shape[1]]
-    # Distance from center
-    distance = np.sqrt((x - x0) ** 2 + (y - y0) ** 2)
-    # Disc
-    mask = (
-            (distance >= radius - thickness / 2)
-            & (distance <= radius + thickness / 2)
-    )
-    img[mask] = color
-    return img
-
-
 class FyzoAnalysisController(TemplateController):
     """Controller for camera acquisition."""
 
@@ -64,8 +29,6 @@ class FyzoAnalysisController(TemplateController):
         self.contrast_enabled = False       # Enhance contrast
         self.img_dir = self._get_image_dir(self.parent.parent.config['img_dir'])
         self.disp_mode = 'fft_circled'
-        self.thread = None
-        self.worker = None
 
         # Widgets
         self.top_left = ImageDisplayWidget()
@@ -78,8 +41,7 @@ class FyzoAnalysisController(TemplateController):
         initial_image = self.parent.variables.get('image')
         if initial_image is not None:
             self.bot_right.set_image_from_array(initial_image)
-        camera = self.parent.variables["camera"]
-        camera.set_parameter("AcquisitionFrameRate", FPS_FFT)
+        self.parent.acquisition.set_camera_parameters({'AcquisitionFrameRate': FPS_FFT})
         # Signals
         self.top_right.display_changed.connect(self.handle_display_changed)
         # Crop size / mask
@@ -94,34 +56,29 @@ class FyzoAnalysisController(TemplateController):
         self.start_live()
 
     def start_live(self):
-        """Start live acquisition with camera."""
-        self.thread = QThread()
-        self.worker = ImageLive(self)
-        self.worker.moveToThread(self.thread)
-
-        self.thread.started.connect(self.worker.run)
-        self.worker.image_ready.connect(self.handle_image_ready)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.worker.finished.connect(self.thread.deleteLater)
-        self.thread.start()
+        """Start live acquisition with camera (subscription to the acquisition service)."""
+        self.parent.acquisition.subscribe(self, self.handle_image_ready)
+        self.update_fft_analysis()
 
     def stop_live(self):
-        """Stop live acquisition."""
-        if self.worker:
-            self.worker.stop()
-            if self.thread:
-                self.thread.quit()
-                self.thread.wait()
-            self.worker = None
-            self.thread = None
+        """Stop live acquisition (the frames of the other modules are not affected)."""
+        self.parent.acquisition.pause(self)
+
+    def update_fft_analysis(self):
+        """
+        Subscribe to the FFT of the frames (processed in an analysis process in process mode).
+        """
+        self.parent.acquisition.subscribe_analysis(
+            self, process_fft_display, self.handle_fft_ready,
+            crop_size=(self.img_height, self.img_width), crop_position=(self.img_pos_x, self.img_pos_y),
+            bits_depth=int(self.parent.variables["bits_depth"]), circled=self.disp_mode == 'fft_circled')
 
     def handle_image_ready(self, image: np.ndarray):
         """
         Thread-safe GUI updates
         :param image:   Numpy array containing new image.
         """
-        image_raw = image.copy()
+        image_raw = image
         # Crop image
         image_crop = crop_images([image_raw], (self.img_height, self.img_width), (self.img_pos_x, self.img_pos_y))[0]
         # Post Image
@@ -136,22 +93,22 @@ class FyzoAnalysisController(TemplateController):
             image_disp = np.ma.masked_where(np.logical_not(self.mask), image_8bits)
         self.bot_right.set_image_from_array(image_disp)
         # Store new image.
-        self.parent.variables['image'] = image_raw
-        # Different display
-        fft_raw = self._process_fft(image_8bits)
-        if self.disp_mode == 'interfer':
-            main_disp = image_disp
-        elif self.disp_mode == 'fft':
-            # Process and display FFT
-            main_disp = self._disp_fft(fft_raw)
-        elif self.disp_mode == 'fft_circled':
-            main_disp = self._get_circled_fft(self._disp_fft(fft_raw))
-        else:
-            main_disp = image_disp
-        self.top_left.set_image_from_array(main_disp)
+        self.parent.frame_store.publish(image_raw, source='fyzo_fft')
+        # FFT displays are updated by the analysis
+        if self.disp_mode not in ['fft', 'fft_circled']:
+            self.top_left.set_image_from_array(image_disp)
+
+    def handle_fft_ready(self, fft_disp: np.ndarray):
+        """
+        Action performed when the FFT of a frame is processed.
+        :param fft_disp:    Display-ready image of the FFT.
+        """
+        if self.disp_mode in ['fft', 'fft_circled']:
+            self.top_left.set_image_from_array(fft_disp)
 
     def handle_display_changed(self, value):
         self.disp_mode = value
+        self.update_fft_analysis()
 
     def set_disp_mode(self, value):
         # Value = {'interfer', 'fft', 'fft_circled'}
@@ -159,36 +116,10 @@ class FyzoAnalysisController(TemplateController):
 
     def cleanup(self):
         """
-        Stop the camera cleanly and release resources.
+        Unsubscribe from the acquisition service.
+        The camera is closed by the service when no module needs it.
         """
-        self.stop_live()
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            if getattr(camera, "is_open", False):
-                camera.close()
-            camera.camera_acquiring = False
-        self.worker = None
-        self.thread = None
-
-    ### FFT and display
-    def _process_fft(self, image):
-        fft = np.fft.fftshift(np.fft.fft2(image))
-        return fft
-
-    def _disp_fft(self, fft):
-        fft_disp = np.log(np.abs(fft) + 1)
-        max_disp = np.max(fft_disp)
-        fft_disp = ((fft_disp / max_disp) * 255).astype(np.uint8)
-        return fft_disp
-
-    def _get_circled_fft(self, fft):
-        width = fft.shape[0]
-        central_radius = width // 6  # rayon zone centrale
-        excent_radius = int(width * 0.4)  # largeur pic latéral
-        fft_rgb = gray_to_rgb(fft)
-        circled_fft = add_circle(fft_rgb, radius=central_radius, color=(255, 0, 255), thickness=3)
-        circled_fft = add_circle(circled_fft, radius=excent_radius, color=(0, 255, 255), thickness=3)
-        return circled_fft
+        self.parent.acquisition.unsubscribe(self)
 
     def _get_image_dir(self, filepath):
         if filepath is None:
@@ -1,4 +1,98 @@
 import numpy as np
+from lensepy.images.conversion import crop_images
+
+
+def gray_to_rgb(image_gray):
+    return np.stack([image_gray] * 3, axis=-1)
+
+
+def add_circle(image, center=None, radius=10, color=(255, 255, 255), thickness=2):
+    """
+    Draw a circle on the image
+    ----------
+    image : np.array (H, W, 3)
+    centre : tuple (x, y)
+    rayon : int
+    couleur : tuple (R, G, B)
+
+    Retour
+    ------
+    np.array : image modifiée
+    """
+
+    img = image.copy()
+    if center is None:
+        x0, y0 = img.shape[1] // 2, img.shape[0] // 2
+    else:
+        x0, y0 = center
+    y, x = np.ogrid[:img.shape[0], :img.shape[1]]
+    # Distance from center
+    distance = np.sqrt((x - x0) ** 2 + (y - y0) ** 2)
+    # Disc
+    mask = (
+            (distance >= radius - thickness / 2)
+            & (distance <= radius + thickness / 2)
+    )
+    img[mask] = color
+    return img
+
+
+def process_fft(image: np.ndarray) -> np.ndarray:
+    """
+    Process the centered FFT of an image.
+    :param image:   2D-array.
+    :return:    Complex 2D-array.
+    """
+    return np.fft.fftshift(np.fft.fft2(image))
+
+
+def get_fft_display(fft: np.ndarray) -> np.ndarray:
+    """
+    Convert a FFT to a displayable image (log of the modulus, 8 bits).
+    :param fft:     Complex 2D-array.
+    :return:    2D-array of uint8.
+    """
+    fft_disp = np.log(np.abs(fft) + 1)
+    max_disp = np.max(fft_disp)
+    fft_disp = ((fft_disp / max_disp) * 255).astype(np.uint8)
+    return fft_disp
+
+
+def get_circled_fft(fft_disp: np.ndarray) -> np.ndarray:
+    """
+    Draw the limits of the central zone and of the lateral peak on a displayed FFT.
+    :param fft_disp:    2D-array of uint8.
+    :return:    RGB image.
+    """
+    width = fft_disp.shape[0]
+    central_radius = width // 6  # rayon zone centrale
+    excent_radius = int(width * 0.4)  # largeur pic latéral
+    fft_rgb = gray_to_rgb(fft_disp)
+    circled_fft = add_circle(fft_rgb, radius=central_radius, color=(255, 0, 255), thickness=3)
+    circled_fft = add_circle(circled_fft, radius=excent_radius, color=(0, 255, 255), thickness=3)
+    return circled_fft
+
+
+def process_fft_display(image: np.ndarray, crop_size: tuple, crop_position: tuple,
+                        bits_depth: int = 8, circled: bool = False) -> np.ndarray:
+    """
+    Process the displayed FFT of an interferogram (analysis of the live frames).
+    :param image:           Raw image from the camera.
+    :param crop_size:       Size of the crop (height, width).
+    :param crop_position:   Position of the crop (x, y).
+    :param bits_depth:      Bits depth of the image.
+    :param circled:         True to draw the limits of the central zone and of the lateral peak.
+    :return:    Display-ready image of the FFT.
+    """
+    image_crop = crop_images([image], crop_size, crop_position)[0]
+    pow = bits_depth - 8
+    if pow > 0:
+        image_crop = image_crop // (2**pow)
+    fft_disp = get_fft_display(process_fft(image_crop))
+    if circled:
+        return get_circled_fft(fft_disp)
+    return fft_disp
+
 
 if __name__ == '__main__':
 
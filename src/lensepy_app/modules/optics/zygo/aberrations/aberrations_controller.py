@@ -11,6 +11,7 @@ from lensepy.optics.zygo import *
 from lensepy.utils import downsample_array
 from lensepy_app import *
 from lensepy_app.widgets.surface_2D_view import Surface2DView
+from lensepy_app.modules.optics.zygo.aberrations.aberrations_models import process_zernike_coefficients
 
 from matplotlib import pyplot as plt
 
@@ -32,9 +33,7 @@ class ZygoAberrationsController(TemplateController):
         else:
             self.phase = self.parent.variables['phase']
         self.zernike_coeffs = Zernike(self.phase)
-        self.zernike_coeffs.process_zernike_coefficient(0)
-        for k in range(nb_coeff + 1):
-            self.zernike_coeffs.process_zernike_coefficient(k)
+        process_zernike_coefficients(self.zernike_coeffs, nb_coeff)
 
         self.colormap_2D = 'plasma'
         self.tilt = False
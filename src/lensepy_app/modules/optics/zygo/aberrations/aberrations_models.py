@@ -0,0 +1,35 @@
+import numpy as np
+from lensepy.optics.zygo.zernike_coefficients import Zernike
+
+NB_COEFF = 36
+
+
+def process_zernike_coefficients(zernike_coeffs: Zernike, nb_coeff: int = NB_COEFF) -> np.ndarray:
+    """
+    Process the Zernike coefficients of a phase.
+    :param zernike_coeffs:  Zernike coefficients of the phase.
+    :param nb_coeff:        Number of coefficients to process.
+    :return:    1D array with the coefficients.
+    """
+    for k in range(nb_coeff + 1):
+        zernike_coeffs.process_zernike_coefficient(k)
+    return zernike_coeffs.get_coeffs()
+
+
+def process_batch(context):
+    """
+    Process the Zernike coefficients of the phase (batch mode).
+    The coefficients are written in the <input>_zernike.csv file.
+    Variables : nb_coeff (optional, number of coefficients).
+    :param context:     BatchContext of the input file.
+    """
+    phase = context.get_variable('phase')
+    if phase is None:
+        raise ValueError('No phase (interfer_control module)')
+    nb_coeff = int(context.get_variable('nb_coeff', NB_COEFF))
+    coeffs = process_zernike_coefficients(Zernike(phase), nb_coeff)
+    context.variables['zernike_coeffs'] = coeffs
+    file_path = context.get_output_path('zernike.csv')
+    np.savetxt(file_path, np.asarray(coeffs, dtype=float), delimiter=';', fmt='%.6g')
+    for k in range(1, min(len(coeffs), 9)):
+        context.add_result(f'Z{k}', float(coeffs[k]))
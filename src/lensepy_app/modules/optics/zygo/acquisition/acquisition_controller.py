@@ -7,8 +7,10 @@ from lensepy.drivers.ids_camera import *
 from PyQt6.QtWidgets import QWidget, QDialog, QLabel
 from PyQt6.QtCore import QThread, QObject
 from PyQt6 import sip
-from lensepy_app.appli._app.template_controller import TemplateController, ImageLive
+from lensepy_app.appli._app.template_controller import TemplateController
 from lensepy_app.widgets.image_display_widget import ImageDisplayWidget
+from lensepy_app.modules.camera.simulated.simulated_models import create_simulated_camera, is_simulated_camera
+from lensepy_app.modules.camera.replay.replay_models import create_replay_camera, is_replay_camera
 from lensepy_app.modules.optics.zygo.acquisition.nidaq_piezo import *
 from lensepy_app.modules.optics.zygo.acquisition.acquisition_view import *
 from lensepy.optics.zygo.dataset import DataSet
@@ -27,7 +29,6 @@ class ZygoAcquisitionController(TemplateController):
         """
         super().__init__(parent)
         self.data_set = DataSet()
-        self.acquiring = False
         self.camera_connected = False
         self.piezo_connected = False
         self.zoom_activated = False
@@ -60,7 +61,8 @@ class ZygoAcquisitionController(TemplateController):
         if self.get_variables("camera") is None or self.get_variables('piezo') is None:
             print('NO PIEZO OR CAM')
             return
-        self.stop_live()
+        # The camera is driven by the worker : released by the acquisition service (thread or process)
+        self.parent.acquisition.pause()
         self.start_acquisition()
 
     def handle_zoom_clicked(self):
@@ -81,7 +83,8 @@ class ZygoAcquisitionController(TemplateController):
 
     def init_view(self):
         ## Test if a camera is connected
-        if CameraIDS.is_connected():
+        if (is_simulated_camera(self.parent.xml_app) or is_replay_camera(self.parent.xml_app)
+                or CameraIDS.is_connected()):
             # Check if camera is connected
             self.init_camera()
             # Test if piezo connected ?
@@ -114,8 +117,9 @@ class ZygoAcquisitionController(TemplateController):
         # Check if a camera is already connected
         if camera is None:
             print('No Camera YET')
-            # Init Camera
-            self.parent.variables["camera"] = CameraIDS()
+            # Init Camera (simulated or replay camera if selected in the XML file)
+            self.parent.variables["camera"] = (create_simulated_camera(self.parent.xml_app)
+                                               or create_replay_camera(self.parent.xml_app) or CameraIDS())
             self.camera_connected = self.parent.variables["camera"].find_first_camera()
             if self.camera_connected is False:
                 self.parent.variables["camera"] = None
@@ -152,41 +156,16 @@ class ZygoAcquisitionController(TemplateController):
 
     def start_live(self):
         """
-        Start live acquisition from camera.
+        Start live acquisition from camera (subscription to the acquisition service).
         """
-        camera = self.parent.variables["camera"]
         if self.camera_connected:
-            camera.start_acquisition()
-            self.acquiring = True
-            self.thread = QThread()
-            self.worker = ImageLive(self)
-            self.worker.moveToThread(self.thread)
-
-            self.thread.started.connect(self.worker.run)
-            self.worker.image_ready.connect(self.handle_image_ready)
-            self.worker.finished.connect(self.thread.quit)
-
-            self.worker.finished.connect(self.worker.deleteLater)
-            self.worker.finished.connect(self.thread.deleteLater)
-
-            self.thread.start()
+            self.parent.acquisition.subscribe(self, self.handle_image_ready)
 
     def stop_live(self):
         """
         Stop live mode, i.e. continuous image acquisition.
         """
-        if self.acquiring:
-            if self.worker is not None:
-                # Stop the worker
-                self.worker._running = False
-                # Wait for thread ending
-                if self.thread is not None:
-                    self.thread.quit()
-                    self.thread.wait()  # bloque jusqu'à la fin
-                # Free ressources
-                self.worker = None
-                self.thread = None
-                self.acquiring = False
+        self.parent.acquisition.pause(self)
 
     def handle_image_ready(self, image: np.ndarray):
         """
@@ -199,11 +178,12 @@ class ZygoAcquisitionController(TemplateController):
         else:
             self.top_left.set_image_from_array(image)
         # Store new image.
-        self.parent.variables['image'] = image.copy()
+        self.parent.frame_store.publish(image, source='acquisition')
 
     def handle_acquisition_done(self, images, voltages):
         # Reinit UI
         self.top_right.set_acq_enabled()
+        self.parent.acquisition.resume()
         # Store new data in data_set
         self.data_set.add_set_images(images)
         self.set_variables('dataset', self.data_set)
@@ -228,14 +208,9 @@ class ZygoAcquisitionController(TemplateController):
         """
         Action performed when the exposure time changed.
         """
-        camera = self.parent.variables["camera"]
-        try:
-            if camera is not None:
-                # Read available formats
-                camera.set_exposure(value)
-                time.sleep(0.01)
-        except Exception as e:
-            print(f'camera_expo {e}')
+        if self.parent.variables["camera"] is not None:
+            # Set by the acquisition service (the camera can be driven by the acquisition process)
+            self.parent.acquisition.set_camera_parameters({'ExposureTime': value})
 
     def handle_voltage_changed(self, value):
         print(f'Voltage = {value} V')
@@ -248,19 +223,13 @@ class ZygoAcquisitionController(TemplateController):
 
     def cleanup(self):
         """
-        Stop the camera cleanly and release resources.
+        Stop the phase-shifting acquisition and unsubscribe from the acquisition service.
+        The camera is closed (or disconnected) by the service when no module needs it.
         """
-        self.stop_live()
         self.stop_acquisition()
-        time.sleep(0.1)
-        camera = self.parent.variables["camera"]
-        if camera is not None:
-            camera.disconnect()
-            camera.camera_acquiring = False
+        self.parent.acquisition.unsubscribe(self)
         self.worker = None
         self.thread = None
-        self.camera_connected = False
-        self.parent.variables["camera"] = None
 
     def start_acquisition(self):
         self.top_right.set_zoom_enabled(False)
@@ -312,18 +281,25 @@ class ZygoAcquisitionController(TemplateController):
 
             self.worker = None
             self.thread = None
+            self.parent.acquisition.resume()
 
     def update_progress_bar(self, value):
         self.top_right.update_progress_bar(value)
 
 
 class AcquisitionLive(QObject):
+    """
+    Phase-shifting acquisition : a voltage is applied to the piezo, then a frame is acquired.
+    If the camera supports a software trigger (set_trigger_mode / get_triggered_image), each frame
+    is triggered after the piezo settling time and identified by the index of the voltage.
+    Otherwise, the next frame of the stream is taken after a conservative settling time.
+    """
     acquisition_ready = pyqtSignal(np.ndarray)
     acquisition_done = pyqtSignal(list, list)  # images, voltages
     finished = pyqtSignal()
 
     def __init__(self, controller, volt_list, camera, piezo=None,
-                 settle_ms=400, interval_ms=10):
+                 settle_ms=400, interval_ms=10, trigger_settle_ms=20):
         super().__init__()
         self.controller = controller
         self.volt_list = volt_list
@@ -332,6 +308,8 @@ class AcquisitionLive(QObject):
 
         self.settle_ms = settle_ms
         self.interval_ms = interval_ms
+        self.trigger_settle_ms = trigger_settle_ms     # Piezo settling time in trigger mode
+        self.triggered = False
 
         self.index = 0
         self.images = []
@@ -347,6 +325,8 @@ class AcquisitionLive(QObject):
             return
 
         self._running = True
+        self.triggered = (hasattr(self.camera, 'set_trigger_mode')
+                          and self.camera.set_trigger_mode('software'))
         self.camera.camera_acquiring = True
 
         self.index = 0
@@ -385,18 +365,22 @@ class AcquisitionLive(QObject):
                     print(f"Piezo error: {e}")
 
             self.waiting_settle = True
-            self.timer.start(self.settle_ms)
+            self.timer.start(self.trigger_settle_ms if self.triggered else self.settle_ms)
             return
 
         # Acquiring image
         image = None
         try:
-            image = self.camera.get_image()
+            if self.triggered:
+                # Frame exposed after the voltage step
+                _, image = self.camera.get_triggered_image(self.index)
+            else:
+                image = self.camera.get_image()
         except Exception as e:
             print(f"Camera error: {e}")
 
         if image is not None:
-            self.images.append(image.copy())
+            self.images.append(image)
             self.acquisition_ready.emit(image)
 
         self.index += 1
@@ -422,6 +406,9 @@ class AcquisitionLive(QObject):
 
         if self.camera:
             self.camera.camera_acquiring = False
+            if self.triggered:
+                self.camera.set_trigger_mode('off')
+                self.triggered = False
 
         # envoyer dataset complet
         self.acquisition_done.emit(self.images, self.volt_list)
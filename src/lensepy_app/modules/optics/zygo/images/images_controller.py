@@ -10,6 +10,7 @@ from lensepy_app.appli._app.template_controller import TemplateController
 from lensepy_app.widgets.image_display_widget import ImageDisplayWidget
 from lensepy.optics.zygo.utils import generate_images_grid
 from lensepy.optics.zygo.dataset import DataSet
+from lensepy_app.modules.optics.zygo.images.images_models import load_dataset_file
 
 class ZygoImagesController(TemplateController):
     """
@@ -58,7 +59,7 @@ class ZygoImagesController(TemplateController):
         self.top_left.set_image_from_array(image1)
         self.bot_left.update_dataset(self.data_set)
         self.parent.variables['dataset_loaded'] = True
-        self.parent.update_menu()
+        self.parent.variables.notify('dataset')
 
     def handle_saving_png(self, filepath):
         """Save grid and first image to png file."""
@@ -76,12 +77,10 @@ class ZygoImagesController(TemplateController):
         self.data_set.save_file(filepath)
 
     def handle_image_opened(self, filepath):
-        im_ok = self.data_set.load_images_set_from_file(filepath)
+        im_ok, mask_ok = load_dataset_file(self.data_set, filepath)
         if im_ok:
-            mask_ok = self.data_set.load_masks_from_file(filepath)
             if mask_ok:
                 self.parent.variables['mask_loaded'] = True
-                self.parent.update_menu()
             self.update_images()
 
     def handle_image_changed(self, index, set_index):
@@ -0,0 +1,30 @@
+from lensepy.optics.zygo.dataset import DataSet
+
+
+def load_dataset_file(data_set: DataSet, file_path: str):
+    """
+    Load the images and the masks of a MAT file in a data set.
+    :param data_set:    Data set to update.
+    :param file_path:   Path of the MAT file.
+    :return:    True if images are loaded, True if masks are loaded.
+    """
+    images_ok = data_set.load_images_set_from_file(file_path)
+    masks_ok = False
+    if images_ok:
+        masks_ok = data_set.load_masks_from_file(file_path)
+    return images_ok, masks_ok
+
+
+def process_batch(context):
+    """
+    Load a data set from a MAT file (batch mode).
+    :param context:     BatchContext of the input file (a MAT file).
+    """
+    data_set = DataSet()
+    images_ok, masks_ok = load_dataset_file(data_set, context.input_file)
+    if not images_ok:
+        raise ValueError(f'No images in {context.input_file}')
+    context.variables['dataset'] = data_set
+    context.variables['dataset_loaded'] = True
+    context.variables['mask_loaded'] = True if masks_ok else None
+    context.add_result('images_sets', data_set.images_sets.get_number_of_sets())
@@ -12,6 +12,8 @@ from lensepy.optics.zygo import *
 from lensepy_app import *
 from lensepy_app.widgets.surface_2D_view import Surface2DView
 from lensepy_app.widgets.double_3d_view import Surface3DView, DoubleGraph3DView
+from lensepy_app.modules.optics.zygo.interfer_control.interfer_control_models import (
+    process_surfaces, process_corrected_surface)
 
 
 class ZygoInterferControlController(TemplateController):
@@ -72,22 +74,12 @@ class ZygoInterferControlController(TemplateController):
         self.top_right.activate_button(self.displayed_surface)
 
     def process_surfaces(self):
-        if not self.data_set.is_wrapped():
-            self.process_wrapped_phase_calculation(self.number_of_repetition)
-        if not self.data_set.is_unwrapped():
-            self.process_unwrapped_phase_calculation(self.number_of_repetition)
-        if self.data_set.is_unwrapped() and not self.data_set.is_analyzed():
-            self.zernike_coeffs.set_phase(self.phase)
-            for k in range(3):
-                self.process_zernike_calculation(k)
-            self.data_set.set_analyzed_state()
+        process_surfaces(self.data_set, self.phase, self.zernike_coeffs)
         self.set_variables('phase_calculated', True)
-        self.parent.update_menu()
+        self.parent.variables.notify('phase')
 
     def correct_surface(self):
-        self.unwrapped_phase = self.phase.get_unwrapped_phase()
-        print(f'Unwrap DTYPE = {self.unwrapped_phase.dtype} Type = {type(self.unwrapped_phase)}')
-        _, self.corrected_phase = self.zernike_coeffs.process_surface_correction(['piston', 'tilt'])
+        self.unwrapped_phase, self.corrected_phase = process_corrected_surface(self.phase, self.zernike_coeffs)
         pv, rms = process_statistics_surface(self.unwrapped_phase)
         self.bot_left.set_pv_uncorrected(pv, '\u03BB')
         self.bot_left.set_rms_uncorrected(rms, '\u03BB')
@@ -195,32 +187,3 @@ class ZygoInterferControlController(TemplateController):
         self.top_left.create_mesh_surface(x, y, w_s)
         self.top_left.showMaximized()
         self.top_left.raise_()
-
-    def process_wrapped_phase_calculation(self, set_number: int = 1):
-        """
-        Process wrapped phase from 5 images.
-        :param set_number: Number of the set to process.
-        """
-        # TO DO : select the good set of images if multiple acquisition
-        k = 0
-        if self.data_set.is_data_ready():
-            self.phase.prepare_data()
-            # Process Phase
-            self.phase.process_wrapped_phase()
-            # End of process
-            self.data_set.set_wrapped_state(True)
-
-    def process_unwrapped_phase_calculation(self, set_number: int = 1):
-        """
-        Process unwrapped phase from the wrapped phase.
-        :param set_number: Number of the set to process.
-        """
-        if self.data_set.is_data_ready() and self.data_set.is_wrapped():
-            # Process Phase
-            self.phase.process_unwrapped_phase()
-            # End of process
-            self.data_set.set_unwrapped_state(True)
-
-    def process_zernike_calculation(self, coeff: int):
-        """Process Zernike coefficients for correction."""
-        self.zernike_coeffs.process_zernike_coefficient(coeff)
\ No newline at end of file
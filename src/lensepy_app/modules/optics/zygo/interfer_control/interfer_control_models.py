@@ -0,0 +1,90 @@
+from lensepy.optics.zygo.dataset import DataSet
+from lensepy.optics.zygo.phase import PhaseModel, process_statistics_surface
+from lensepy.optics.zygo.zernike_coefficients import Zernike
+
+
+def process_wrapped_phase(data_set: DataSet, phase: PhaseModel):
+    """
+    Process wrapped phase from 5 images.
+    :param data_set:    Data set containing the images and the masks.
+    :param phase:       Phase model of the data set.
+    """
+    if data_set.is_data_ready():
+        phase.prepare_data()
+        # Process Phase
+        phase.process_wrapped_phase()
+        # End of process
+        data_set.set_wrapped_state(True)
+
+
+def process_unwrapped_phase(data_set: DataSet, phase: PhaseModel):
+    """
+    Process unwrapped phase from the wrapped phase.
+    :param data_set:    Data set containing the images and the masks.
+    :param phase:       Phase model of the data set.
+    """
+    if data_set.is_data_ready() and data_set.is_wrapped():
+        # Process Phase
+        phase.process_unwrapped_phase()
+        # End of process
+        data_set.set_unwrapped_state(True)
+
+
+def process_surfaces(data_set: DataSet, phase: PhaseModel, zernike_coeffs: Zernike):
+    """
+    Process the wrapped and unwrapped phases and the first Zernike coefficients (piston, tilt).
+    Steps already done are not processed again.
+    :param data_set:        Data set containing the images and the masks.
+    :param phase:           Phase model of the data set.
+    :param zernike_coeffs:  Zernike coefficients of the phase.
+    """
+    if not data_set.is_wrapped():
+        process_wrapped_phase(data_set, phase)
+    if not data_set.is_unwrapped():
+        process_unwrapped_phase(data_set, phase)
+    if data_set.is_unwrapped() and not data_set.is_analyzed():
+        zernike_coeffs.set_phase(phase)
+        for k in range(3):
+            zernike_coeffs.process_zernike_coefficient(k)
+        data_set.set_analyzed_state()
+
+
+def process_corrected_surface(phase: PhaseModel, zernike_coeffs: Zernike):
+    """
+    Get the unwrapped phase and the phase corrected of the piston and the tilt.
+    :param phase:           Phase model of the data set.
+    :param zernike_coeffs:  Zernike coefficients of the phase.
+    :return:    Unwrapped phase and corrected phase.
+    """
+    unwrapped_phase = phase.get_unwrapped_phase()
+    _, corrected_phase = zernike_coeffs.process_surface_correction(['piston', 'tilt'])
+    return unwrapped_phase, corrected_phase
+
+
+def process_batch(context):
+    """
+    Process the unwrapped phase of the data set (batch mode).
+    Variables : wedge (optional, wedge factor).
+    :param context:     BatchContext of the input file.
+    """
+    data_set: DataSet = context.get_variable('dataset')
+    if data_set is None or not data_set.is_data_ready():
+        raise ValueError('No data set with images and masks (images and masks modules)')
+    phase = context.get_variable('phase')
+    if phase is None:
+        phase = PhaseModel(data_set)
+    phase.set_wedge_factor(float(context.get_variable('wedge', 1)))
+    phase.prepare_data()
+    zernike_coeffs = Zernike(phase)
+    process_surfaces(data_set, phase, zernike_coeffs)
+    unwrapped_phase, corrected_phase = process_corrected_surface(phase, zernike_coeffs)
+    context.variables['phase'] = phase
+    context.variables['phase_calculated'] = True
+    pv, rms = process_statistics_surface(unwrapped_phase)
+    context.add_result('pv_uncorrected', pv)
+    context.add_result('rms_uncorrected', rms)
+    pv, rms = process_statistics_surface(corrected_phase)
+    context.add_result('pv_corrected', pv)
+    context.add_result('rms_corrected', rms)
+    context.save_array('unwrapped_phase', unwrapped_phase)
+    context.save_array('corrected_phase', corrected_phase)
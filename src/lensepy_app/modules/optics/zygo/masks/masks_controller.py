@@ -6,6 +6,7 @@ from lensepy_app.widgets.image_display_widget import ImageDisplayWidget
 from lensepy_app.modules.optics.zygo.masks.masks_view import (
     MasksOptionsView, AddMaskView, MasksView)
 from lensepy.optics.zygo.dataset import DataSet
+from lensepy_app.modules.optics.zygo.masks.masks_models import reset_dataset_processes
 from lensepy_app import *
 
 
@@ -32,7 +33,6 @@ class ZygoMasksController(TemplateController):
         self.top_left.set_image_from_array(self.first_image)
         if self.data_set.has_mask():
             self.parent.variables['mask_loaded'] = True
-            self.parent.update_menu()
         self.data_set.reset_processes()
         # Signals
         self.bot_left.mask_added.connect(self.handle_mask_added)
@@ -61,12 +61,9 @@ class ZygoMasksController(TemplateController):
                 mask = dialog.mask.copy()
                 # Add mask to the data_set
                 self.data_set.add_mask(mask, type_m)
-                self.data_set.set_cropped_state(False)
-                self.data_set.set_analyzed_state(False)
-                self.data_set.set_wrapped_state(False)
-                self.data_set.set_unwrapped_state(False)
+                reset_dataset_processes(self.data_set)
                 self.parent.variables['mask_loaded'] = True
-                self.parent.update_menu()
+                self.parent.variables.notify('dataset')
 
                 # Refresh list
                 self.top_right.masks_list.update_display()
@@ -78,6 +75,5 @@ class ZygoMasksController(TemplateController):
             image_disp = self.first_image * mask
         else:
             self.parent.variables['mask_loaded'] = None
-            self.parent.update_menu()
             image_disp = self.first_image
         self.top_left.set_image_from_array(image_disp)
\ No newline at end of file
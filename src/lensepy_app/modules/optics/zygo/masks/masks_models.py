@@ -0,0 +1,32 @@
+from lensepy.optics.zygo.dataset import DataSet
+
+
+def reset_dataset_processes(data_set: DataSet):
+    """
+    Reset the processes of a data set after a change of its masks.
+    :param data_set:    Data set to update.
+    """
+    data_set.set_cropped_state(False)
+    data_set.set_analyzed_state(False)
+    data_set.set_wrapped_state(False)
+    data_set.set_unwrapped_state(False)
+
+
+def process_batch(context):
+    """
+    Check the masks of the data set (batch mode).
+    Variables : mask_file (optional, MAT file containing the masks to use).
+    :param context:     BatchContext of the input file.
+    """
+    data_set: DataSet = context.get_variable('dataset')
+    if data_set is None:
+        raise ValueError('No data set (images module)')
+    mask_file = context.get_variable('mask_file')
+    if mask_file is not None:
+        if not data_set.load_masks_from_file(mask_file):
+            raise ValueError(f'No masks in {mask_file}')
+        reset_dataset_processes(data_set)
+    if not data_set.has_mask():
+        raise ValueError('No mask in the data set (variable mask_file)')
+    context.variables['mask_loaded'] = True
+    context.add_result('masks', data_set.masks_sets.get_masks_number())
@@ -160,8 +160,9 @@ class HistogramWidget(QWidget):
                 chk.setEnabled(True)
 
     def set_image(self, img: np.ndarray, checked: bool = True, zoom:bool = False):
-        """Définit l'image (numpy array, 2D pour gris ou 3D pour RGB)."""
-        self.image = img.copy()
+        """Définit l'image (numpy array, 2D pour gris ou 3D pour RGB).
+        The image is not copied (shared frames are read-only)."""
+        self.image = img
         # Detect if RGB or Grayscale
         if img.ndim == 2:
             # Grayscale image
@@ -58,6 +58,7 @@ class ImageDisplayWidget(QWidget):
         self.parent = parent
         self.bits_depth = 8
         self.zoom = zoom
+        self.display_buffers = {}   # Conversion buffers of the displayed images, reused at each frame
         self.pixmap_item = None
         self.text_item = None
 
@@ -132,10 +133,17 @@ class ImageDisplayWidget(QWidget):
         pixels = np.ascontiguousarray(pixels)
         if pixels.ndim == 2:
             # Grayscale
-            if self.bits_depth > 8:
+            if self.bits_depth > 8 and np.issubdtype(pixels.dtype, np.integer):
+                # Shift to 8 bits in preallocated buffers (live images)
+                shifted = self._get_display_buffer('shifted', pixels.shape, pixels.dtype)
+                np.right_shift(pixels, self.bits_depth - 8, out=shifted)
+                pixels_8 = self._get_display_buffer('gray', pixels.shape, np.uint8)
+                np.copyto(pixels_8, shifted, casting='unsafe')
+                pixels = pixels_8
+            elif self.bits_depth > 8:
                 scale = 2 ** (self.bits_depth - 8)
                 pixels = (pixels / scale).astype(np.uint8)
-            else:
+            elif pixels.dtype != np.uint8:
                 pixels = np.nan_to_num(pixels, nan=0.0) # Force NaN to black level
                 pixels = pixels.astype(np.uint8)
             h, w = pixels.shape
@@ -144,7 +152,7 @@ class ImageDisplayWidget(QWidget):
         elif pixels.ndim == 3:
             h, w, c = pixels.shape
             if c == 3:
-                pixels = pixels.astype(np.uint8)
+                pixels = pixels.astype(np.uint8, copy=False)
                 return QImage(pixels.data, w, h, pixels.strides[0], QImage.Format.Format_RGB888)
             elif c == 4:    # Remove alpha
                 pixels = pixels[:, :, :3]
@@ -156,6 +164,21 @@ class ImageDisplayWidget(QWidget):
         else:
             raise ValueError(f"Unsupported image shape: {pixels.shape}")
 
+    def _get_display_buffer(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        """
+        Get a conversion buffer, allocated again only if the format of the images changed.
+        The QImage created from a buffer is copied in a pixmap before the next frame.
+        :param name:    Name of the buffer.
+        :param shape:   Shape of the buffer.
+        :param dtype:   Data type of the buffer.
+        :return:    Numpy array.
+        """
+        buffer = self.display_buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.display_buffers[name] = buffer
+        return buffer
+
     def _update_view_fit(self):
         """
         Adjust the view to the image size, without scrollbars,